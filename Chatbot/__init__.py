@@ -24,6 +24,9 @@ cache = Cache()
 scheduler = BackgroundScheduler()
 
 def create_app():
+    # Bind the package-level app first: routes and models do `from Chatbot import app`
+    # while create_app() is still running
+    global app
     app = Flask(__name__)
     
     # Enhanced Configuration
@@ -63,11 +66,13 @@ def create_app():
     login_manager.login_view = 'login'
     login_manager.login_message_category = 'info'
     mail.init_app(app)
-    socketio.init_app(app, cors_allowed_origins="*")
+    # A shared queue (e.g. redis://) lets any worker or the alert process push to any connection
+    socketio.init_app(app, cors_allowed_origins="*", message_queue=os.environ.get('SOCKETIO_MESSAGE_QUEUE'))
     cache.init_app(app)
     
-    # Import routes
+    # Import routes and Socket.IO handlers
     from Chatbot import routes
+    from Chatbot import sockets
     
     # Create database tables
     with app.app_context():
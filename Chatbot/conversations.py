@@ -0,0 +1,64 @@
+import os
+import math
+import threading
+from typing import Dict, List
+
+from sqlalchemy.exc import IntegrityError
+
+from Chatbot import db
+from Chatbot.models import ChatSession
+
+# Only the most recent turns (one user message plus the bot reply) are kept per user
+CHAT_HISTORY_TURNS = int(os.environ.get('CHAT_HISTORY_TURNS', '50'))
+CHAT_PAGE_SIZE = int(os.environ.get('CHAT_PAGE_SIZE', '20'))  # messages per rendered page
+
+# The transcript is one JSON column, so concurrent replies for a user must not interleave
+_TRANSCRIPT_LOCKS = [threading.Lock() for _ in range(64)]
+
+
+def web_session_id(user) -> str:
+    return f"web-{user.id}"
+
+
+def get_web_session(user, create: bool = False):
+    """The user's web ChatSession, created on first use when ``create`` is set"""
+    chat = ChatSession.query.filter_by(session_id=web_session_id(user)).first()
+    if chat is None and create:
+        chat = ChatSession(user_id=user.id, session_id=web_session_id(user), channel='web',
+                           language=getattr(user, 'preferred_language', None) or 'en')
+        db.session.add(chat)
+    return chat
+
+
+def record_turn(user, message: str, response: str, intent: str = None, confidence: float = None):
+    """Append one exchange to the user's transcript, dropping turns beyond CHAT_HISTORY_TURNS"""
+    max_messages = CHAT_HISTORY_TURNS * 2
+    with _TRANSCRIPT_LOCKS[user.id % len(_TRANSCRIPT_LOCKS)]:
+        for attempt in range(2):
+            chat = get_web_session(user, create=True)
+            chat.add_message('user', message, max_messages=max_messages)
+            chat.add_message('bot', response, intent=intent, confidence=confidence, max_messages=max_messages)
+            try:
+                db.session.commit()
+                return chat
+            except IntegrityError:
+                # Another worker created the session first; append to that one instead
+                db.session.rollback()
+                if attempt:
+                    raise
+
+
+def get_transcript_page(user, page: int = None, page_size: int = None) -> Dict:
+    """One page of the user's transcript; the last page (newest messages) by default"""
+    page_size = page_size or CHAT_PAGE_SIZE
+    chat = get_web_session(user)
+    messages: List[Dict] = chat.get_messages_list() if chat else []
+    pages = max(1, math.ceil(len(messages) / page_size))
+    page = pages if page is None else min(max(page, 1), pages)
+    start = (page - 1) * page_size
+    return {
+        'messages': messages[start:start + page_size],
+        'page': page,
+        'pages': pages,
+        'total': len(messages)
+    }
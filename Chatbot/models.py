@@ -108,7 +108,7 @@ class VaccinationRecord(db.Model):
     dose_number = db.Column(db.Integer, nullable=False, default=1)
     
     # Scheduling
-    due_date = db.Column(db.Date, nullable=True)
+    due_date = db.Column(db.Date, nullable=True, index=True)
     administered_date = db.Column(db.Date, nullable=True)
     next_due_date = db.Column(db.Date, nullable=True)
     
@@ -153,7 +153,7 @@ class ChatSession(db.Model):
     user_satisfaction = db.Column(db.Integer, nullable=True)  # 1-5 rating
     feedback_text = db.Column(db.Text, nullable=True)
     
-    def add_message(self, sender, message, intent=None, confidence=None):
+    def add_message(self, sender, message, intent=None, confidence=None, max_messages=None):
         message_data = {
             'timestamp': datetime.utcnow().isoformat(),
             'sender': sender,  # 'user' or 'bot'
@@ -166,6 +166,8 @@ class ChatSession(db.Model):
         except:
             messages_list = []
         messages_list.append(message_data)
+        if max_messages:
+            messages_list = messages_list[-max_messages:]
         self.messages = json.dumps(messages_list)
     
     def get_messages_list(self):
@@ -199,7 +201,7 @@ class HealthAlert(db.Model):
     delivered_count = db.Column(db.Integer, default=0)
     failed_count = db.Column(db.Integer, default=0)
     
-    status = db.Column(db.String(20), default='pending')  # pending, sent, cancelled
+    status = db.Column(db.String(20), default='pending')  # pending, queued, sent, cancelled
     created_at = db.Column(db.DateTime, default=datetime.utcnow)
     
     def __repr__(self):
@@ -1,10 +1,14 @@
 import os
+import time
 import secrets
 from PIL import Image
-from flask import render_template, url_for, flash, redirect, request, abort, jsonify
+from flask import (render_template, url_for, flash, redirect, request, abort, jsonify, Response,
+                   stream_with_context)
 from Chatbot import app, db, bcrypt, mail
 from Chatbot.forms import (RegistrationForm, LoginForm)
 from Chatbot.models import User
+from Chatbot.conversations import record_turn, get_transcript_page
+from Chatbot.sockets import chat_connections, get_socket_stats
 from flask_login import login_user, current_user, logout_user, login_required
 from flask_mail import Message
 from datetime import datetime
@@ -16,6 +20,8 @@ try:
     from translation_service import translation_service
     from whatsapp_sms_handler import WhatsAppHandler, SMSHandler
     from health_data_service import health_data_service
+    from outbox import MessageOutbox, outbox_enabled
+    from twilio_transport import get_transport_stats
     ENHANCED_FEATURES = True
 except ImportError:
     # Fallback to original main.py
@@ -26,8 +32,15 @@ except ImportError:
 if ENHANCED_FEATURES:
     whatsapp_handler = WhatsAppHandler()
     sms_handler = SMSHandler()
+    # Read-only view of the shared outbox; dispatching runs in the alert worker
+    message_outbox = MessageOutbox() if outbox_enabled() else None
+    # Reload the cache snapshot and prefetch the hottest keys without delaying startup
+    health_data_service.start_snapshots()
+    if os.environ.get('HEALTH_WARMUP_ON_START', 'true').lower() in ['true', 'on', '1']:
+        health_data_service.start_warmup()
 
-arr = [0]
+# Upper bound on states/pincodes accepted by the bulk health-data endpoints
+BULK_QUERY_MAX_KEYS = int(os.environ.get('HEALTH_BULK_MAX_KEYS', '500'))
 
 @app.route("/")
 @app.route("/home")
@@ -75,11 +88,8 @@ def logout():
 @app.route('/chatbot', methods=['GET'])
 @login_required
 def bot():
-    length = len(arr)
     message = request.args.get('msg')
     if message is not None:
-        arr.append(message)
-        arr.append(1)
         # Use enhanced chatbot if available
         if ENHANCED_FEATURES:
             user_phone = getattr(current_user, 'phone_number', None)
@@ -92,11 +102,34 @@ def bot():
         else:
             # Fallback to original chatbot
             response = main.callthis(message)
-        arr.append(response)
-        arr.append(0)
-        length = len(arr)
-        print(arr)
-    return render_template('bot.html', arr=arr, length=length)
+        record_turn(current_user, message, response)
+    transcript = get_transcript_page(current_user, request.args.get('page', type=int))
+    return render_template('bot.html', **transcript)
+
+def set_preferred_language(user, language, phone_number=None):
+    """Save a reply language ('auto' clears it) and update the sticky sender cache"""
+    if language != 'auto' and language not in translation_service.SUPPORTED_LANGUAGES:
+        return False
+    phone_number = phone_number or (user.phone_number if user else None)
+    if user:
+        user.preferred_language = None if language == 'auto' else language
+        db.session.commit()
+    if phone_number:
+        if language == 'auto':
+            translation_service.sender_languages.forget(phone_number)
+        else:
+            translation_service.sender_languages.set_language(phone_number, language)
+    return True
+
+@app.route('/api/profile/language', methods=['POST'])
+@login_required
+def update_preferred_language():
+    if not ENHANCED_FEATURES:
+        return jsonify({'error': 'Enhanced features not available'}), 501
+    language = ((request.json or {}).get('language') or '').strip().lower()
+    if not set_preferred_language(current_user, language):
+        return jsonify({'error': f'Unsupported language: {language}'}), 400
+    return jsonify({'preferred_language': current_user.preferred_language})
 
 # API endpoints for health data and translation (for web clients or integrations)
 @app.route('/api/health-data/covid-stats')
@@ -125,6 +158,57 @@ def get_vaccination_centers():
     except Exception as e:
         return jsonify({'error': str(e)}), 500
 
+@app.route('/api/health-data/covid-stats/bulk')
+def get_covid_stats_bulk():
+    if not ENHANCED_FEATURES:
+        return jsonify({'error': 'Enhanced features not available'}), 501
+    states = [s.strip() for s in request.args.get('states', '').split(',') if s.strip()]
+    if not states:
+        return jsonify({'error': 'States are required'}), 400
+    if len(states) > BULK_QUERY_MAX_KEYS:
+        return jsonify({'error': f'At most {BULK_QUERY_MAX_KEYS} states per request'}), 400
+    try:
+        data = health_data_service.get_covid_statistics_many(states, request.args.get('district'))
+        return jsonify(data)
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
+
+@app.route('/api/health-data/vaccination-centers/bulk')
+def get_vaccination_centers_bulk():
+    if not ENHANCED_FEATURES:
+        return jsonify({'error': 'Enhanced features not available'}), 501
+    pincodes = [p.strip() for p in request.args.get('pincodes', '').split(',') if p.strip()]
+    if not pincodes:
+        return jsonify({'error': 'Pincodes are required'}), 400
+    if len(pincodes) > BULK_QUERY_MAX_KEYS:
+        return jsonify({'error': f'At most {BULK_QUERY_MAX_KEYS} pincodes per request'}), 400
+    try:
+        data = health_data_service.get_vaccination_centers_many(pincodes, request.args.get('date'))
+        return jsonify(data)
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
+
+@app.route('/api/health-data/nearest-centers')
+def get_nearest_centers():
+    if not ENHANCED_FEATURES:
+        return jsonify({'error': 'Enhanced features not available'}), 501
+    pincode = request.args.get('pincode')
+    if not pincode:
+        return jsonify({'error': 'Pincode is required'}), 400
+    k = request.args.get('k', 5, type=int)
+    if k < 1:
+        return jsonify({'error': 'k must be at least 1'}), 400
+    try:
+        data = health_data_service.get_nearest_vaccination_centers(
+            pincode,
+            k=k,
+            min_capacity=request.args.get('min_capacity', 1, type=int),
+            max_km=request.args.get('radius_km', 50.0, type=float),
+            date=request.args.get('date'))
+        return jsonify(data)
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
+
 @app.route('/api/translate', methods=['POST'])
 def translate_text():
     if not ENHANCED_FEATURES:
@@ -154,6 +238,22 @@ def get_supported_languages():
     except Exception as e:
         return jsonify({'error': str(e)}), 500
 
+@app.route('/api/metrics')
+def get_metrics():
+    if not ENHANCED_FEATURES:
+        return jsonify({'error': 'Enhanced features not available'}), 501
+    try:
+        return jsonify({
+            'translation': translation_service.get_metrics(),
+            'outbox': message_outbox.get_stats() if message_outbox else None,
+            'messaging': get_transport_stats(),
+            'health_data': health_data_service.get_cache_stats(),
+            'websocket': get_socket_stats(),
+            'timestamp': datetime.now().isoformat()
+        })
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
+
 @app.route('/api/chat/enhanced', methods=['POST'])
 def enhanced_chat():
     if not ENHANCED_FEATURES:
@@ -165,6 +265,7 @@ def enhanced_chat():
     if not message:
         return jsonify({'error': 'Message is required'}), 400
     try:
+        started = time.perf_counter()
         user_name = current_user.username if current_user.is_authenticated else 'User'
         response = enhanced_chatbot.get_response(
             message, 
@@ -176,6 +277,8 @@ def enhanced_chat():
         if language != 'en':
             response = translation_service.translate_healthcare_response(
                 response, language, message)
+        # Compared with the /chat Socket.IO replies in /api/metrics
+        chat_connections.observe('http', time.perf_counter() - started)
         return jsonify({
             'response': response,
             'language': language,
@@ -184,6 +287,48 @@ def enhanced_chat():
     except Exception as e:
         return jsonify({'error': str(e)}), 500
 
+def _sse(event, data):
+    return f"event: {event}\ndata: {json.dumps(data, ensure_ascii=False)}\n\n"
+
+@app.route('/api/chat/stream', methods=['GET', 'POST'])
+def stream_chat():
+    """Server-Sent Events version of /api/chat/enhanced
+
+    Sends ``intent`` as soon as the message is classified, then one ``section``
+    event per part of the reply (translated section by section) and ``done``.
+    GET takes ``message``/``language`` query parameters so EventSource can be used.
+    """
+    if not ENHANCED_FEATURES:
+        return jsonify({'error': 'Enhanced features not available'}), 501
+    data = request.json if request.method == 'POST' else request.args
+    message = (data or {}).get('message', '')
+    language = (data or {}).get('language', 'en')
+    user_phone = (data or {}).get('user_phone')
+    if not message:
+        return jsonify({'error': 'Message is required'}), 400
+    user_name = current_user.username if current_user.is_authenticated else 'User'
+
+    def generate():
+        try:
+            first = True
+            for kind, payload in enhanced_chatbot.iter_response_sections(
+                    message, user_phone=user_phone, user_name=user_name, language=language):
+                if kind == 'intent':
+                    yield _sse('intent', payload)
+                    continue
+                if language != 'en':
+                    # The first section carries the localized "Health Assistant" heading
+                    payload = (translation_service.translate_healthcare_response(payload, language, message)
+                               if first else translation_service.translate_text(payload, language))
+                first = False
+                yield _sse('section', {'type': kind, 'text': payload, 'language': language})
+            yield _sse('done', {'timestamp': datetime.now().isoformat()})
+        except Exception as e:
+            yield _sse('error', {'error': str(e)})
+
+    return Response(stream_with_context(generate()), mimetype='text/event-stream',
+                    headers={'Cache-Control': 'no-cache', 'X-Accel-Buffering': 'no'})
+
 # WhatsApp webhook
 @app.route('/webhook/whatsapp', methods=['POST'])
 def whatsapp_webhook():
@@ -204,13 +349,27 @@ def whatsapp_webhook():
 📋 Vaccination schedules  
 🏥 Find nearby hospitals
 💊 Medicine information
-🌍 Languages: Send 'hi', 'te', 'ta' etc.
+🌍 Languages: Send 'LANG hi', 'LANG te' etc. (LANG AUTO to detect)
 ❓ Help: Type HELP
 
 Example: "I have fever and cough"'''
             resp.message(help_text)
             return str(resp)
-        detected_lang = translation_service.detect_language(incoming_msg)
+        if incoming_msg.upper().startswith('LANG '):
+            language = incoming_msg[5:].strip().lower()
+            user = User.query.filter_by(phone_number=sender_number).first()
+            if set_preferred_language(user, language, sender_number):
+                resp.message(f"🌍 Language set to {language.upper()}" if language != 'auto'
+                             else "🌍 Language will be detected from your messages")
+            else:
+                resp.message("Unsupported language. Send HELP for options.")
+            return str(resp)
+        def load_preferred_language():
+            user = User.query.filter_by(phone_number=sender_number).first()
+            return user.preferred_language if user else None
+
+        detected_lang = translation_service.resolve_sender_language(
+            sender_number, incoming_msg, load_preferred_language)
         chatbot_response = enhanced_chatbot.get_response(
             incoming_msg, 
             user_phone=sender_number,
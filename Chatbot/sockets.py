@@ -0,0 +1,224 @@
+import os
+import time
+import threading
+from collections import OrderedDict, deque
+from typing import Dict, Optional
+
+from flask import request, current_app
+from flask_login import current_user
+from flask_socketio import join_room, disconnect, emit
+
+from Chatbot import socketio
+from Chatbot.models import User
+from Chatbot.conversations import record_turn
+from rate_limiter import TokenBucket
+from chat_push import CHAT_NAMESPACE, phone_room, user_room
+
+try:
+    from enhanced_chatbot import enhanced_chatbot
+    from translation_service import translation_service
+    ENHANCED_FEATURES = True
+except ImportError:
+    import main
+    ENHANCED_FEATURES = False
+
+# Per-user limits: sustained messages/second, burst, and replies being generated at once
+SOCKET_MESSAGE_RATE = float(os.environ.get('SOCKET_MESSAGE_RATE', '1'))
+SOCKET_MESSAGE_BURST = float(os.environ.get('SOCKET_MESSAGE_BURST', '5'))
+SOCKET_MAX_PENDING = int(os.environ.get('SOCKET_MAX_PENDING', '2'))
+
+
+class ChatConnections:
+    """Live /chat connections in this worker plus reply latency per channel
+
+    Each user keeps one connection: a new one from the same user replaces the
+    old. The TokenBucket belongs to the user, not the connection, and outlives
+    disconnects so reconnecting does not refill it; once a user has been gone
+    long enough for it to refill anyway (``burst / rate`` seconds) it is dropped.
+    At most ``max_pending``
+    replies may be in flight before further messages are refused with
+    ``busy`` so a slow client cannot pile up work.
+    """
+
+    def __init__(self, rate: float, burst: float, max_pending: int, latency_window: int = 1000):
+        self.rate = rate
+        self.burst = burst
+        self.max_pending = max_pending
+        self._connections: Dict[str, Dict] = {}
+        self._by_user: Dict[int, str] = {}
+        self._buckets: Dict[int, TokenBucket] = {}
+        self._idle: "OrderedDict[int, float]" = OrderedDict()  # user_id -> last disconnect, oldest first
+        self.bucket_ttl = burst / rate if rate > 0 else 0
+        self._latencies = {'websocket': deque(maxlen=latency_window), 'http': deque(maxlen=latency_window)}
+        self._lock = threading.Lock()
+        self._counters = {'connected': 0, 'rejected': 0, 'replaced': 0, 'peak_connections': 0,
+                          'messages': 0, 'rate_limited': 0, 'busy': 0, 'errors': 0, 'alerts_pushed': 0}
+
+    def count(self, name: str, amount: int = 1):
+        with self._lock:
+            self._counters[name] += amount
+
+    def add(self, sid: str, user_id: int) -> Optional[str]:
+        """Register ``sid`` for ``user_id``; returns the sid it replaces, if any"""
+        with self._lock:
+            previous = self._by_user.get(user_id)
+            self._by_user[user_id] = sid
+            self._idle.pop(user_id, None)
+            self._evict_idle()
+            bucket = self._buckets.get(user_id)
+            if bucket is None:
+                bucket = self._buckets[user_id] = TokenBucket(self.rate, self.burst)
+            self._connections[sid] = {'user_id': user_id, 'pending': 0, 'connected_at': time.time(),
+                                      'bucket': bucket}
+            self._counters['connected'] += 1
+            self._counters['peak_connections'] = max(self._counters['peak_connections'], len(self._connections))
+            if previous:
+                self._counters['replaced'] += 1
+            return previous
+
+    def remove(self, sid: str):
+        with self._lock:
+            connection = self._connections.pop(sid, None)
+            if connection and self._by_user.get(connection['user_id']) == sid:
+                del self._by_user[connection['user_id']]
+                self._idle[connection['user_id']] = time.monotonic()
+            self._evict_idle()
+
+    def _evict_idle(self):
+        # Called with the lock held
+        cutoff = time.monotonic() - self.bucket_ttl
+        while self._idle:
+            user_id, released_at = next(iter(self._idle.items()))
+            if released_at > cutoff:
+                break
+            del self._idle[user_id]
+            self._buckets.pop(user_id, None)
+
+    def admit(self, sid: str) -> Optional[str]:
+        """None when a message may be processed, else the reason it was refused"""
+        with self._lock:
+            connection = self._connections.get(sid)
+            if connection is None:
+                return 'not_connected'
+            if not connection['bucket'].try_acquire():
+                self._counters['rate_limited'] += 1
+                return 'rate_limited'
+            if connection['pending'] >= self.max_pending:
+                self._counters['busy'] += 1
+                return 'busy'
+            connection['pending'] += 1
+            self._counters['messages'] += 1
+            return None
+
+    def release(self, sid: str):
+        with self._lock:
+            connection = self._connections.get(sid)
+            if connection:
+                connection['pending'] -= 1
+
+    def observe(self, channel: str, seconds: float):
+        with self._lock:
+            self._latencies[channel].append(seconds)
+
+    @staticmethod
+    def _summary(values) -> Optional[Dict]:
+        if not values:
+            return None
+        ordered = sorted(values)
+        pick = lambda fraction: round(ordered[min(len(ordered) - 1, int(fraction * len(ordered)))] * 1000, 1)
+        return {'samples': len(ordered), 'avg_ms': round(sum(ordered) / len(ordered) * 1000, 1),
+                'p50_ms': pick(0.50), 'p99_ms': pick(0.99)}
+
+    def get_stats(self) -> Dict:
+        with self._lock:
+            counters = dict(self._counters)
+            latencies = {channel: list(values) for channel, values in self._latencies.items()}
+            connections = len(self._connections)
+            buckets = len(self._buckets)
+        return dict(counters, connections=connections, buckets=buckets, worker_pid=os.getpid(),
+                    limits={'rate': self.rate, 'burst': self.burst, 'max_pending': self.max_pending},
+                    reply_latency={channel: self._summary(values) for channel, values in latencies.items()})
+
+
+chat_connections = ChatConnections(SOCKET_MESSAGE_RATE, SOCKET_MESSAGE_BURST, SOCKET_MAX_PENDING)
+
+
+@socketio.on('connect', namespace=CHAT_NAMESPACE)
+def chat_connect(auth=None):
+    if not current_user.is_authenticated:
+        chat_connections.count('rejected')
+        return False
+    previous = chat_connections.add(request.sid, current_user.id)
+    if previous:
+        disconnect(sid=previous, namespace=CHAT_NAMESPACE)
+    join_room(user_room(current_user.id))
+    if current_user.phone_number:
+        # Alert workers address recipients by phone number (see chat_push)
+        join_room(phone_room(current_user.phone_number))
+    emit('ready', {'user': current_user.username})
+
+
+@socketio.on('disconnect', namespace=CHAT_NAMESPACE)
+def chat_disconnect():
+    chat_connections.remove(request.sid)
+
+
+@socketio.on('message', namespace=CHAT_NAMESPACE)
+def chat_message(data):
+    message = (data or {}).get('message', '') if isinstance(data, dict) else str(data or '')
+    if not message:
+        emit('chat_error', {'error': 'Message is required'})
+        return
+    refused = chat_connections.admit(request.sid)
+    if refused == 'rate_limited':
+        emit('chat_error', {'error': refused, 'retry_after': round(1 / SOCKET_MESSAGE_RATE, 2)})
+        return
+    if refused:
+        emit('chat_error', {'error': refused})
+        return
+    data = data if isinstance(data, dict) else {}
+    language = data.get('language') or current_user.preferred_language or 'en'
+    user_phone = data.get('user_phone') or current_user.phone_number
+    # Reply off the socket's receive loop so the connection keeps reading while the bot works
+    socketio.start_background_task(_reply, current_app._get_current_object(), request.sid, current_user.id,
+                                   current_user.username, user_phone, message, language, time.perf_counter())
+
+
+def _reply(app, sid: str, user_id: int, user_name: str, user_phone: Optional[str], message: str,
+           language: str, started: float):
+    try:
+        if ENHANCED_FEATURES:
+            response = enhanced_chatbot.get_response(message, user_phone=user_phone, user_name=user_name,
+                                                     language=language)
+            if language != 'en':
+                response = translation_service.translate_healthcare_response(response, language, message)
+        else:
+            response = main.callthis(message)
+        elapsed = time.perf_counter() - started
+        chat_connections.observe('websocket', elapsed)
+        socketio.emit('reply', {'message': message, 'response': response, 'language': language,
+                                'latency_ms': round(elapsed * 1000, 1)}, to=sid, namespace=CHAT_NAMESPACE)
+        with app.app_context():
+            user = User.query.get(user_id)
+            if user:
+                record_turn(user, message, response)
+    except Exception as e:
+        chat_connections.count('errors')
+        socketio.emit('chat_error', {'error': str(e)}, to=sid, namespace=CHAT_NAMESPACE)
+    finally:
+        chat_connections.release(sid)
+
+
+def notify_phone(phone_number: str, alert: Dict):
+    """Push an alert to the chat connection of the account with ``phone_number``, if open
+
+    This is the in-process counterpart of ``chat_push.build_chat_notifier`` and
+    can be handed to ``SimpleAlertScheduler(chat_notifier=...)`` when the
+    scheduler runs inside the web worker.
+    """
+    socketio.emit('alert', alert, to=phone_room(phone_number), namespace=CHAT_NAMESPACE)
+    chat_connections.count('alerts_pushed')
+
+
+def get_socket_stats() -> Dict:
+    return chat_connections.get_stats()
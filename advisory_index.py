@@ -0,0 +1,141 @@
+import os
+import time
+import logging
+import threading
+from datetime import datetime, timedelta
+from typing import Dict
+
+from shared_redis import get_redis_client
+from app_db import load_app_db
+
+
+class SentAdvisoryIndex:
+    """O(1) record of advisory IDs that were already broadcast
+
+    A local dict of advisory_id -> expiry answers repeat lookups without I/O. The
+    authoritative copy lives where every worker process can see it and where it
+    survives restarts:
+
+    * Redis (``SET key NX EX ttl``) when REDIS_URL is reachable, otherwise
+    * the ``HealthAlert`` table, claiming ``advisory:<id>`` through its unique
+      ``alert_id`` column.
+
+    ``claim`` is atomic in both backends, so two workers polling the same feed
+    cannot both broadcast an advisory.
+    """
+
+    KEY_PREFIX = 'advisory:'
+
+    def __init__(self, ttl_seconds: int = None, backend: str = None):
+        self.ttl_seconds = ttl_seconds or int(os.environ.get('ADVISORY_DEDUP_TTL', str(30 * 24 * 3600)))
+        self._local: Dict[str, float] = {}
+        self._lock = threading.Lock()
+        self._redis = None
+        self._db = None
+        backend = backend or os.environ.get('ADVISORY_DEDUP_BACKEND') or None
+
+        if backend in (None, 'redis'):
+            self._redis = get_redis_client()
+        if self._redis is None and backend in (None, 'db'):
+            self._db = load_app_db('HealthAlert')
+
+        self.backend = 'redis' if self._redis is not None else 'db' if self._db else 'memory'
+        if backend not in (None, self.backend):
+            logging.warning(f"Advisory dedup backend '{backend}' is unavailable; using '{self.backend}'")
+        if self.backend == 'memory':
+            logging.warning("Advisory dedup index is in-memory only; restarts may re-broadcast")
+
+    def _key(self, advisory_id: str) -> str:
+        return f"{self.KEY_PREFIX}{advisory_id}"
+
+    def _remember(self, advisory_id: str):
+        now = time.time()
+        with self._lock:
+            self._local[advisory_id] = now + self.ttl_seconds
+            if len(self._local) > 10000:
+                self._local = {k: v for k, v in self._local.items() if v > now}
+
+    def _seen_locally(self, advisory_id: str) -> bool:
+        with self._lock:
+            expires_at = self._local.get(advisory_id)
+            if expires_at is None:
+                return False
+            if expires_at <= time.time():
+                del self._local[advisory_id]
+                return False
+            return True
+
+    def claim(self, advisory_id: str, title: str = '', message: str = '', urgency: str = 'medium') -> bool:
+        """Mark ``advisory_id`` as sent; returns False if it was already claimed and not expired"""
+        if not advisory_id or self._seen_locally(advisory_id):
+            return False
+
+        if self._redis is not None:
+            claimed = bool(self._redis.set(self._key(advisory_id), int(time.time()), nx=True, ex=self.ttl_seconds))
+        elif self._db:
+            claimed = self._claim_db(advisory_id, title, message, urgency)
+        else:
+            claimed = True
+
+        # Either way the ID is now known to be sent; skip the backend next time
+        self._remember(advisory_id)
+        return claimed
+
+    def _claim_db(self, advisory_id, title, message, urgency) -> bool:
+        from sqlalchemy.exc import IntegrityError
+        app, db, HealthAlert = self._db
+        now = datetime.utcnow()
+        expiry = now + timedelta(seconds=self.ttl_seconds)
+        with app.app_context():
+            db.session.add(HealthAlert(
+                alert_id=self._key(advisory_id),
+                alert_type='health_advisory',
+                title=(title or 'Health Update')[:200],
+                message=message or '',
+                urgency=urgency,
+                expiry_time=expiry,
+                status='pending'
+            ))
+            try:
+                db.session.commit()
+                return True
+            except IntegrityError:
+                db.session.rollback()
+            # Re-claim an expired row in place; the WHERE clause keeps this atomic
+            updated = HealthAlert.query.filter(
+                HealthAlert.alert_id == self._key(advisory_id),
+                HealthAlert.expiry_time < now
+            ).update({'expiry_time': expiry, 'status': 'pending', 'sent_time': None},
+                     synchronize_session=False)
+            db.session.commit()
+            return updated == 1
+
+    def mark_sent(self, advisory_id: str, sent_count: int = 0, failed_count: int = 0, queued_count: int = 0):
+        """Record the broadcast outcome; ``queued_count`` messages were handed to the outbox"""
+        if not self._db:
+            return
+        app, db, HealthAlert = self._db
+        with app.app_context():
+            HealthAlert.query.filter_by(alert_id=self._key(advisory_id)).update({
+                'status': 'queued' if queued_count else 'sent',
+                'sent_time': datetime.utcnow(),
+                'target_user_count': sent_count + failed_count + queued_count,
+                'sent_count': sent_count,
+                'failed_count': failed_count
+            }, synchronize_session=False)
+            db.session.commit()
+
+    def release(self, advisory_id: str):
+        """Forget a claim so the advisory is retried (used when the broadcast failed)"""
+        with self._lock:
+            self._local.pop(advisory_id, None)
+        if self._redis is not None:
+            self._redis.delete(self._key(advisory_id))
+        elif self._db:
+            app, db, HealthAlert = self._db
+            with app.app_context():
+                HealthAlert.query.filter_by(alert_id=self._key(advisory_id), status='pending').delete()
+                db.session.commit()
+
+    def get_stats(self) -> Dict:
+        return {'backend': self.backend, 'local_entries': len(self._local), 'ttl_seconds': self.ttl_seconds}
@@ -0,0 +1,133 @@
+import os
+import time
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from typing import Callable, Dict, Iterable, List, Optional, Tuple
+
+from rate_limiter import TokenBucket
+
+# Provider throughput per channel (messages/second). Twilio's WhatsApp sender default
+# is 80 MPS; SMS throughput depends on the number type, so size it to your sender.
+DEFAULT_RATE_LIMITS = {
+    'whatsapp': float(os.environ.get('WHATSAPP_RATE_PER_SEC', '80')),
+    'sms': float(os.environ.get('SMS_RATE_PER_SEC', '10'))
+}
+
+# A send is (channel, callable, args); a task is (phone, [sends])
+Send = Tuple[str, Callable[..., Dict], tuple]
+Task = Tuple[str, List[Send]]
+
+
+class FanoutProgress:
+    """Live counters for a running fan-out"""
+
+    def __init__(self, total: Optional[int] = None):
+        self.total = total
+        self.completed = 0
+        self.succeeded = 0
+        self.failed = 0
+        self.channels: Dict[str, Dict[str, int]] = {}
+        self.started_at = time.time()
+        self.finished_at: Optional[float] = None
+        self._lock = threading.Lock()
+
+    def record(self, channel_results: Dict[str, Dict]) -> int:
+        """Count one finished recipient; returns the completed count including it"""
+        with self._lock:
+            self.completed += 1
+            ok = True
+            for channel, result in channel_results.items():
+                stats = self.channels.setdefault(channel, {'sent': 0, 'failed': 0})
+                if isinstance(result, dict) and result.get('success'):
+                    stats['sent'] += 1
+                else:
+                    stats['failed'] += 1
+                    ok = False
+            if ok:
+                self.succeeded += 1
+            else:
+                self.failed += 1
+            return self.completed
+
+    def snapshot(self) -> Dict:
+        with self._lock:
+            elapsed = (self.finished_at or time.time()) - self.started_at
+            rate = self.completed / elapsed if elapsed > 0 else 0.0
+            remaining = (self.total - self.completed) if self.total is not None else None
+            return {
+                'total': self.total,
+                'completed': self.completed,
+                'succeeded': self.succeeded,
+                'failed': self.failed,
+                'channels': {k: dict(v) for k, v in self.channels.items()},
+                'elapsed_seconds': round(elapsed, 3),
+                'recipients_per_second': round(rate, 2),
+                'eta_seconds': round(remaining / rate, 1) if remaining and rate else None,
+                'finished': self.finished_at is not None
+            }
+
+
+class FanoutEngine:
+    """Send messages to many recipients on a bounded worker pool
+
+    Each channel has its own token bucket so the pool never exceeds provider limits;
+    submissions are windowed so a 100k-recipient iterable is never materialised as
+    futures all at once. Results are returned per recipient in submission order.
+    """
+
+    def __init__(self, max_workers: int = None, rate_limits: Dict[str, float] = None,
+                 progress_interval: int = 500):
+        self.max_workers = max_workers or int(os.environ.get('ALERT_FANOUT_WORKERS', '16'))
+        self.rate_limits = dict(DEFAULT_RATE_LIMITS)
+        if rate_limits:
+            self.rate_limits.update(rate_limits)
+        self.buckets = {channel: TokenBucket(rate) for channel, rate in self.rate_limits.items()}
+        self.progress_interval = progress_interval
+
+    def _bucket(self, channel: str) -> Optional[TokenBucket]:
+        return self.buckets.get(channel)
+
+    def _run_task(self, task: Task) -> Dict:
+        phone, sends = task
+        result = {'phone': phone}
+        for channel, func, args in sends:
+            bucket = self._bucket(channel)
+            if bucket:
+                bucket.acquire()
+            try:
+                result[channel] = func(*args)
+            except Exception as e:
+                result[channel] = {"error": f"{channel} send error: {e}"}
+        return result
+
+    def run(self, tasks: Iterable[Task], total: Optional[int] = None,
+            progress_callback: Callable[[Dict], None] = None,
+            progress: FanoutProgress = None) -> Tuple[List[Dict], FanoutProgress]:
+        progress = progress or FanoutProgress(total)
+        results: Dict[int, Dict] = {}
+        window = threading.BoundedSemaphore(self.max_workers * 4)
+        results_lock = threading.Lock()
+
+        def on_done(index, future):
+            try:
+                outcome = future.result()
+            except Exception as e:
+                outcome = {'error': str(e)}
+            with results_lock:
+                results[index] = outcome
+            completed = progress.record({k: v for k, v in outcome.items() if k != 'phone'})
+            window.release()
+            # Each count is returned to exactly one thread, so every interval reports once
+            if progress_callback and completed % self.progress_interval == 0:
+                progress_callback(progress.snapshot())
+
+        with ThreadPoolExecutor(max_workers=self.max_workers, thread_name_prefix='alert-fanout') as pool:
+            for index, task in enumerate(tasks):
+                window.acquire()
+                future = pool.submit(self._run_task, task)
+                future.add_done_callback(lambda f, i=index: on_done(i, f))
+
+        progress.finished_at = time.time()
+        if progress_callback:
+            progress_callback(progress.snapshot())
+        return [results[i] for i in sorted(results)], progress
@@ -0,0 +1,102 @@
+import os
+import json
+import logging
+import threading
+from collections import deque
+from datetime import datetime, date
+from typing import Dict, Iterator, Optional
+
+
+class AlertHistory:
+    """Bounded record of sent alerts with constant-time statistics
+
+    Only a compact summary of the most recent ``max_entries`` alerts is kept in
+    memory. The full entry (message body and per-recipient results) is appended to
+    a JSON-lines log so nothing is lost, and per-day/per-type counters are updated
+    at record time so statistics never rescan history. Counters older than
+    ``retain_days`` are dropped, so memory stays flat regardless of uptime.
+    """
+
+    SUMMARY_FIELDS = ('type', 'title', 'urgency', 'phone', 'target_count', 'variants_rendered', 'advisory_id')
+
+    def __init__(self, max_entries: int = None, spill_path: str = None, retain_days: int = 30):
+        self.max_entries = max_entries or int(os.environ.get('ALERT_HISTORY_SIZE', '500'))
+        self.spill_path = spill_path if spill_path is not None else os.environ.get(
+            'ALERT_HISTORY_LOG', os.path.join('logs', 'alert_history.jsonl'))
+        self.retain_days = retain_days
+
+        self._recent = deque(maxlen=self.max_entries)
+        self._daily: Dict[date, Dict[str, int]] = {}
+        self.total = 0
+        self._lock = threading.Lock()
+        self._spill_lock = threading.Lock()
+
+    def append(self, entry: Dict) -> Dict:
+        """Record a sent alert; returns the in-memory summary"""
+        sent_at = entry.get('sent_at') or datetime.now()
+        summary = {field: entry[field] for field in self.SUMMARY_FIELDS if field in entry}
+        summary['sent_at'] = sent_at
+        summary.update(self._count_results(entry.get('results')))
+
+        with self._lock:
+            self._recent.append(summary)
+            self.total += 1
+            day = self._daily.setdefault(sent_at.date(), {})
+            day[summary.get('type', 'unknown')] = day.get(summary.get('type', 'unknown'), 0) + 1
+            if len(self._daily) > self.retain_days:
+                for old_day in sorted(self._daily)[:-self.retain_days]:
+                    del self._daily[old_day]
+
+        self._spill(entry, sent_at)
+        return summary
+
+    @staticmethod
+    def _count_results(results) -> Dict:
+        if isinstance(results, list):
+            delivered = sum(1 for r in results if isinstance(r, dict) and any(
+                isinstance(v, dict) and v.get('success') for v in r.values()))
+            return {'recipient_count': len(results), 'delivered_count': delivered,
+                    'failed_count': len(results) - delivered}
+        if isinstance(results, dict):
+            ok = any(isinstance(v, dict) and v.get('success') for v in results.values())
+            return {'recipient_count': 1, 'delivered_count': int(ok), 'failed_count': int(not ok)}
+        return {}
+
+    def _spill(self, entry: Dict, sent_at: datetime):
+        if not self.spill_path:
+            return
+        try:
+            record = dict(entry, sent_at=sent_at.isoformat())
+            line = json.dumps(record, default=str, ensure_ascii=False)
+            with self._spill_lock:
+                directory = os.path.dirname(self.spill_path)
+                if directory:
+                    os.makedirs(directory, exist_ok=True)
+                with open(self.spill_path, 'a', encoding='utf-8') as f:
+                    f.write(line + '\n')
+        except Exception as e:
+            logging.error(f"Alert history spill failed: {e}")
+
+    def count_on(self, day: date, alert_type: Optional[str] = None) -> int:
+        with self._lock:
+            counts = self._daily.get(day, {})
+            return counts.get(alert_type, 0) if alert_type else sum(counts.values())
+
+    def daily_counts(self) -> Dict[str, Dict[str, int]]:
+        with self._lock:
+            return {day.isoformat(): dict(counts) for day, counts in sorted(self._daily.items())}
+
+    def last(self) -> Optional[Dict]:
+        with self._lock:
+            return self._recent[-1] if self._recent else None
+
+    def __getitem__(self, index):
+        with self._lock:
+            return self._recent[index]
+
+    def __len__(self) -> int:
+        return len(self._recent)
+
+    def __iter__(self) -> Iterator[Dict]:
+        with self._lock:
+            return iter(list(self._recent))
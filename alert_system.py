@@ -1,8 +1,17 @@
 import os
-from datetime import datetime
-from threading import Thread
+from datetime import datetime, date, timedelta
 import time
-from typing import List, Dict
+import logging
+from typing import List, Dict, Callable
+
+from alert_fanout import FanoutEngine
+from advisory_index import SentAdvisoryIndex
+from alert_history import AlertHistory
+from outbox import MessageOutbox, outbox_enabled
+from subscriber_index import SubscriberSegmentIndex
+from job_scheduler import TimerScheduler
+from app_db import load_app_db
+from chat_push import build_chat_notifier, chat_push_enabled
 
 try:
     from whatsapp_sms_handler import WhatsAppHandler, SMSHandler
@@ -13,13 +22,21 @@ except ImportError:
     ENHANCED_FEATURES = False
     print("⚠️  Enhanced features not available for alert system")
 
+HEALTH_UPDATE_INTERVAL = int(os.environ.get('HEALTH_UPDATE_INTERVAL', '3600'))
+VACCINATION_REMINDER_LEAD_DAYS = int(os.environ.get('VACCINATION_REMINDER_LEAD_DAYS', '1'))
+VACCINATION_REMINDER_HOUR = int(os.environ.get('VACCINATION_REMINDER_HOUR', '9'))
+VACCINATION_REMINDER_BATCH_SIZE = int(os.environ.get('VACCINATION_REMINDER_BATCH_SIZE', '500'))
+
+
 class SimpleAlertScheduler:
     """Simplified alert scheduler for health notifications"""
 
-    def __init__(self):
+    def __init__(self, whatsapp_handler=None, sms_handler=None, fanout_engine: FanoutEngine = None,
+                 advisory_index: SentAdvisoryIndex = None, outbox: MessageOutbox = None,
+                 job_scheduler: TimerScheduler = None, chat_notifier: Callable[[str, Dict], None] = None):
         if ENHANCED_FEATURES:
-            self.whatsapp_handler = WhatsAppHandler()
-            self.sms_handler = SMSHandler()
+            self.whatsapp_handler = whatsapp_handler or WhatsAppHandler()
+            self.sms_handler = sms_handler or SMSHandler()
             self.translation_service = translation_service
             print("✅ Alert scheduler initialized with messaging support")
         else:
@@ -28,12 +45,31 @@ class SimpleAlertScheduler:
             self.translation_service = None
             print("⚠️  Alert scheduler initialized without messaging")
 
+        self.fanout_engine = fanout_engine or FanoutEngine()
+        self.outbox = outbox
+        if self.outbox is None and outbox_enabled():
+            # Dispatch shares the engine's channel buckets with direct fan-out
+            self.outbox = MessageOutbox(whatsapp_handler=self.whatsapp_handler, sms_handler=self.sms_handler,
+                                        fanout_engine=self.fanout_engine)
+        # notify(phone, alert) for recipients with an open web chat; opt-in via ALERT_CHAT_PUSH
+        self.chat_notifier = chat_notifier
+        if self.chat_notifier is None and chat_push_enabled():
+            self.chat_notifier = build_chat_notifier()
+        self.last_fanout = None
+        self.last_vaccination_run = None
+        self._advisory_index = advisory_index
+
         self.subscribers: Dict[str, Dict] = {}  # phone->preferences
-        self.alert_history: List[Dict] = []
+        self.segment_index = SubscriberSegmentIndex()
+        self.alert_history = AlertHistory()
         self.scheduler_running = False
-        self.scheduler_thread = None
 
-    def subscribe_user(self, phone_number: str, language: str = 'en', preferences: Dict = None):
+        self.job_scheduler = job_scheduler or TimerScheduler()
+        self.job_scheduler.register('health_updates', lambda payload: self._check_health_updates())
+        self.job_scheduler.register('vaccination_reminders', lambda payload: self.send_due_vaccination_reminders())
+
+    def subscribe_user(self, phone_number: str, language: str = 'en', preferences: Dict = None,
+                       state: str = None, district: str = None, pincode: str = None, age: int = None):
         if not preferences:
             preferences = {
                 'vaccination_reminders': True,
@@ -43,17 +79,56 @@ class SimpleAlertScheduler:
         self.subscribers[phone_number] = {
             'language': language,
             'subscribed_at': datetime.now(),
-            'preferences': preferences
+            'preferences': preferences,
+            'state': state,
+            'district': district,
+            'pincode': pincode,
+            'age': age
         }
+        self.segment_index.add(phone_number, language, preferences, state, district, pincode, age)
         print(f"✅ Subscribed {phone_number} to health alerts")
         return True
 
     def unsubscribe_user(self, phone_number: str):
         if phone_number in self.subscribers:
             del self.subscribers[phone_number]
+            self.segment_index.remove(phone_number)
             print(f"❌ Unsubscribed {phone_number} from health alerts")
         return True
 
+    def find_targets(self, preferences: List[str] = None, target_location: str = None,
+                     target_age_group: str = None, target_users: List[str] = None) -> Dict[str, List[str]]:
+        """Resolve broadcast recipients grouped by language
+
+        Without ``target_users`` the segment index answers the whole query by bitmap
+        intersection; an explicit list is filtered against the same criteria.
+        """
+        criteria = {
+            'preferences': preferences or [],
+            'location': target_location,
+            'age_group': target_age_group
+        }
+        if target_users is None:
+            by_language = {}
+            for language in self.segment_index.languages():
+                phones = self.segment_index.query(language=language, **criteria)
+                if phones:
+                    by_language[language] = phones
+            return by_language
+
+        matching = set(self.segment_index.query(**criteria)) if (target_location or target_age_group) else None
+        by_language: Dict[str, List[str]] = {}
+        for phone_number in target_users:
+            user_prefs = self.subscribers.get(phone_number)
+            if user_prefs is None:
+                continue
+            if matching is not None and phone_number not in matching:
+                continue
+            if not all(user_prefs.get('preferences', {}).get(name, True) for name in criteria['preferences']):
+                continue
+            by_language.setdefault(user_prefs.get('language', 'en'), []).append(phone_number)
+        return by_language
+
     def send_vaccination_reminder(self, phone_number: str, vaccine_name: str, 
                                 due_date: str, center_info: str = None):
         if not ENHANCED_FEATURES:
@@ -63,20 +138,14 @@ class SimpleAlertScheduler:
         user_prefs = self.subscribers.get(phone_number, {})
         language = user_prefs.get('language', 'en')
 
-        message = f"🏥 Vaccination Reminder\n\nYour {vaccine_name} is due on {due_date}."
-        if center_info:
-            message += f"\n\n📍 Center: {center_info}"
-
-        message += "\n\nBook appointment via CoWIN app or visit the center.\nReply STOP to unsubscribe."
-
-        if language != 'en' and self.translation_service:
-            message = self.translation_service.translate_healthcare_response(message, language)
+        message = self._render_for_language(
+            self._vaccination_message(vaccine_name, due_date, center_info), language)
 
         results = {}
         if self.whatsapp_handler:
             results['whatsapp'] = self.whatsapp_handler.send_message(phone_number, message)
         if self.sms_handler:
-            sms_message = f"VACCINATION: {vaccine_name} due {due_date}. Book via CoWIN. STOP to unsubscribe."
+            sms_message = self._vaccination_sms(vaccine_name, due_date)
             results['sms'] = self.sms_handler.send_sms(phone_number, sms_message)
 
         self.alert_history.append({
@@ -89,15 +158,86 @@ class SimpleAlertScheduler:
 
         return results
 
+    def send_vaccination_reminders(self, reminders: List[Dict],
+                                   progress_callback: Callable[[Dict], None] = None) -> List[Dict]:
+        """Bulk vaccination reminders
+
+        ``reminders`` are dicts with phone_number, vaccine_name, due_date and optional
+        center_info/language. Recipients are grouped by (language, message) so each
+        distinct reminder is rendered and translated once before dispatch. Results are
+        returned in the same order as ``reminders``.
+        """
+        if not ENHANCED_FEATURES:
+            print("⚠️  Cannot send alerts - messaging not configured")
+            return []
+
+        groups: Dict[tuple, List[tuple]] = {}
+        for index, reminder in enumerate(reminders):
+            phone_number = reminder['phone_number']
+            language = reminder.get('language') or self.subscribers.get(phone_number, {}).get('language', 'en')
+            key = (language, reminder['vaccine_name'], str(reminder['due_date']), reminder.get('center_info'))
+            groups.setdefault(key, []).append((index, phone_number))
+
+        rendered = {
+            key: self._render_for_language(self._vaccination_message(*key[1:]), key[0])
+            for key in groups
+        }
+        order = [index for members in groups.values() for index, _ in members]
+
+        def build_tasks():
+            for key, members in groups.items():
+                message = rendered[key]
+                sms_message = self._vaccination_sms(key[1], key[2])
+                for _, phone_number in members:
+                    sends = []
+                    if self.whatsapp_handler:
+                        sends.append(('whatsapp', self.whatsapp_handler.send_message, (phone_number, message)))
+                    if self.sms_handler:
+                        sends.append(('sms', self.sms_handler.send_sms, (phone_number, sms_message)))
+                    yield phone_number, sends
+
+        grouped_results = self._fan_out(build_tasks(), len(reminders), 'Vaccination reminders', progress_callback)
+        # Hand results back in the caller's order so they line up with ``reminders``
+        results = [None] * len(reminders)
+        for index, result in zip(order, grouped_results):
+            results[index] = result
+
+        self.alert_history.append({
+            'type': 'vaccination_reminder',
+            'target_count': len(reminders),
+            'variants_rendered': len(rendered),
+            'sent_at': datetime.now(),
+            'results': results
+        })
+
+        print(f"💉 Sent {len(results)} vaccination reminders ({len(rendered)} message variants)")
+        return results
+
+    def _vaccination_message(self, vaccine_name: str, due_date: str, center_info: str = None) -> str:
+        message = f"🏥 Vaccination Reminder\n\nYour {vaccine_name} is due on {due_date}."
+        if center_info:
+            message += f"\n\n📍 Center: {center_info}"
+
+        message += "\n\nBook appointment via CoWIN app or visit the center.\nReply STOP to unsubscribe."
+        return message
+
+    def _vaccination_sms(self, vaccine_name: str, due_date: str) -> str:
+        return f"VACCINATION: {vaccine_name} due {due_date}. Book via CoWIN. STOP to unsubscribe."
+
+    def _render_for_language(self, message: str, language: str) -> str:
+        if language != 'en' and self.translation_service:
+            return self.translation_service.translate_healthcare_response(message, language)
+        return message
+
     def send_health_advisory(self, advisory_title: str, advisory_message: str, 
-                           urgency: str = "medium", target_users: List[str] = None):
+                           urgency: str = "medium", target_users: List[str] = None,
+                           progress_callback: Callable[[Dict], None] = None,
+                           advisory_id: str = None, target_location: str = None,
+                           target_age_group: str = None, required_preferences: List[str] = None):
         if not ENHANCED_FEATURES:
             print("⚠️  Cannot send alerts - messaging not configured")
             return False
 
-        if not target_users:
-            target_users = list(self.subscribers.keys())
-
         urgency_emojis = {
             "low": "ℹ️",
             "medium": "📢",
@@ -108,36 +248,46 @@ class SimpleAlertScheduler:
 
         base_message = f"{emoji} Health Advisory: {advisory_title}\n\n{advisory_message}\n\nStay safe and follow health guidelines.\nReply STOP to unsubscribe."
 
-        results = []
-
-        for phone_number in target_users:
-            if phone_number not in self.subscribers:
-                continue
-
-            user_prefs = self.subscribers[phone_number]
-            if not user_prefs.get('preferences', {}).get('health_advisories', True):
-                continue
-
-            language = user_prefs.get('language', 'en')
-
-            message = base_message
-            if language != 'en' and self.translation_service:
-                message = self.translation_service.translate_healthcare_response(message, language)
-
-            user_results = {'phone': phone_number}
-            if self.whatsapp_handler:
-                user_results['whatsapp'] = self.whatsapp_handler.send_message(phone_number, message)
-            if urgency in ['high', 'critical'] and self.sms_handler:
-                sms_message = f"{urgency.upper()}: {advisory_title}. {advisory_message[:100]}... STOP to unsubscribe."
-                user_results['sms'] = self.sms_handler.send_sms(phone_number, sms_message)
-
-            results.append(user_results)
+        sms_message = f"{urgency.upper()}: {advisory_title}. {advisory_message[:100]}... STOP to unsubscribe."
+
+        # Group recipients by language so each variant is translated exactly once
+        by_language = self.find_targets(
+            required_preferences or ['health_advisories'], target_location, target_age_group,
+            target_users or None)
+
+        rendered = {language: self._render_for_language(base_message, language) for language in by_language}
+
+        def build_tasks():
+            for language, phones in by_language.items():
+                message = rendered[language]
+                for phone_number in phones:
+                    sends = []
+                    if self.whatsapp_handler:
+                        sends.append(('whatsapp', self.whatsapp_handler.send_message, (phone_number, message)))
+                    if urgency in ['high', 'critical'] and self.sms_handler:
+                        sends.append(('sms', self.sms_handler.send_sms, (phone_number, sms_message)))
+                    yield phone_number, sends
+
+        total = sum(len(phones) for phones in by_language.values())
+        results = self._fan_out(build_tasks(), total, advisory_title, progress_callback)
+        self._push_to_chat(by_language, rendered, {
+            'type': 'health_advisory',
+            'title': advisory_title,
+            'urgency': urgency,
+            'advisory_id': advisory_id,
+            'message': base_message,
+            'sent_at': datetime.now().isoformat()
+        })
 
         self.alert_history.append({
             'type': 'health_advisory',
             'title': advisory_title,
             'urgency': urgency,
-            'target_count': len(target_users),
+            'target_count': total,
+            'target_location': target_location,
+            'target_age_group': target_age_group,
+            'advisory_id': advisory_id,
+            'message': base_message,
             'sent_at': datetime.now(),
             'results': results
         })
@@ -145,18 +295,75 @@ class SimpleAlertScheduler:
         print(f"📢 Sent health advisory to {len(results)} users")
         return results
 
+    def _push_to_chat(self, by_language: Dict[str, List[str]], rendered: Dict[str, str], alert: Dict):
+        """Push an alert to targeted recipients with an open web chat
+
+        Only the subscribers the advisory was sent to are notified, each with the
+        variant in their own language. Does nothing unless a ``chat_notifier`` is set.
+        """
+        if not self.chat_notifier:
+            return
+        try:
+            for language, phones in by_language.items():
+                variant = dict(alert, message=rendered[language], language=language)
+                for phone_number in phones:
+                    self.chat_notifier(phone_number, variant)
+        except Exception as e:
+            logging.warning(f"Chat push for {alert.get('title')} failed: {e}")
+
+    def _fan_out(self, tasks, total: int, label: str, progress_callback: Callable[[Dict], None] = None) -> List[Dict]:
+        if self.outbox:
+            return self._enqueue(tasks, label)
+
+        def report(snapshot):
+            self.last_fanout = dict(snapshot, label=label)
+            if progress_callback:
+                progress_callback(snapshot)
+            elif not snapshot['finished']:
+                print(f"📤 {label}: {snapshot['completed']}/{snapshot['total']} recipients "
+                      f"({snapshot['recipients_per_second']}/s)")
+
+        results, _ = self.fanout_engine.run(tasks, total=total, progress_callback=report)
+        return results
+
+    def _enqueue(self, tasks, label: str, chunk_size: int = 1000) -> List[Dict]:
+        """Write sends to the durable outbox; dispatcher workers deliver them"""
+        self.outbox.start()
+        results = []
+        chunk = []
+
+        def flush():
+            ids = self.outbox.enqueue_many([(channel, args[0], args[1]) for _, channel, args in chunk])
+            for (result, channel, _), outbox_id in zip(chunk, ids):
+                result[channel] = {'queued': True, 'outbox_id': outbox_id}
+            chunk.clear()
+
+        for phone_number, sends in tasks:
+            result = {'phone': phone_number}
+            results.append(result)
+            for channel, _, args in sends:
+                chunk.append((result, channel, args))
+            if len(chunk) >= chunk_size:
+                flush()
+        if chunk:
+            flush()
+
+        self.last_fanout = {'label': label, 'queued_recipients': len(results), 'finished': True}
+        print(f"📥 {label}: queued {len(results)} recipients in outbox")
+        return results
+
     def send_outbreak_alert(self, disease_name: str, location: str, 
-                          prevention_measures: List[str], urgency: str = "high"):
+                          prevention_measures: List[str], urgency: str = "high",
+                          target_location: str = None, target_age_group: str = None):
         prevention_text = "\n".join([f"• {m}" for m in prevention_measures[:3]])
 
         message = f"🚨 Health Alert: {disease_name} Outbreak\n\n📍 Location: {location}\n\n🛡️ Prevention:\n{prevention_text}\n\nStay alert and follow health guidelines.\nSource: Health Department"
 
-        target_users = [
-            phone for phone, prefs in self.subscribers.items()
-            if prefs.get('preferences', {}).get('disease_outbreaks', True)
-        ]
-
-        return self.send_health_advisory(f"{disease_name} Outbreak", message, urgency, target_users)
+        return self.send_health_advisory(
+            f"{disease_name} Outbreak", message, urgency,
+            target_location=target_location,
+            target_age_group=target_age_group,
+            required_preferences=['disease_outbreaks', 'health_advisories'])
 
     def start_scheduler(self):
         if self.scheduler_running:
@@ -164,27 +371,106 @@ class SimpleAlertScheduler:
             return
 
         self.scheduler_running = True
-        self.scheduler_thread = Thread(target=self._scheduler_loop, daemon=True)
-        self.scheduler_thread.start()
+        self.job_scheduler.start()
+        # Persisted recurring jobs keep their next fire time across restarts
+        now = time.time()
+        self.job_scheduler.schedule('health_updates', 'health_updates', now,
+                                    interval=HEALTH_UPDATE_INTERVAL, replace=False)
+        # Due dates drive reminders through one sweep per day: every reminder fires at
+        # VACCINATION_REMINDER_HOUR on the day its record enters the lead window, and
+        # the sweep reads each record as it is then, so edited or cancelled records
+        # need no per-record timers to be moved or cancelled
+        first_run = datetime.now().replace(hour=VACCINATION_REMINDER_HOUR, minute=0, second=0, microsecond=0)
+        if first_run.timestamp() < now:
+            first_run += timedelta(days=1)
+        self.job_scheduler.schedule('vaccination_reminders', 'vaccination_reminders', first_run.timestamp(),
+                                    interval=24 * 3600, replace=False)
+        if self.outbox:
+            self.outbox.start()
         print("✅ Alert scheduler started")
 
     def stop_scheduler(self):
         self.scheduler_running = False
-        if self.scheduler_thread:
-            self.scheduler_thread.join(timeout=5)
+        self.job_scheduler.stop()
+        if self.outbox:
+            self.outbox.stop()
         print("🛑 Alert scheduler stopped")
 
-    def _scheduler_loop(self):
-        while self.scheduler_running:
-            try:
-                self._check_health_updates()
-                for _ in range(360):  # Sleep 10 sec intervals to allow stop
-                    if not self.scheduler_running:
-                        break
-                    time.sleep(10)
-            except Exception as e:
-                print(f"❌ Scheduler error: {e}")
-                time.sleep(60)
+    def send_due_vaccination_reminders(self, batch_size: int = None) -> Dict:
+        """Remind every scheduled VaccinationRecord due within the reminder window
+
+        Records are streamed in keyset-paginated batches (``id > last_id``) as plain
+        column tuples, so memory stays flat however many records are due. Each batch
+        is rendered once per (language, vaccine, date, center) and dispatched through
+        the fan-out engine or outbox; ``reminder_sent`` is then flipped for the
+        delivered records with a single UPDATE per batch.
+        """
+        loaded = load_app_db('VaccinationRecord', 'User')
+        if not loaded:
+            return {'processed': 0, 'reminded': 0, 'failed': 0}
+        app, db, VaccinationRecord, User = loaded
+        batch_size = batch_size or VACCINATION_REMINDER_BATCH_SIZE
+        today = date.today()
+        horizon = today + timedelta(days=VACCINATION_REMINDER_LEAD_DAYS)
+        stats = {'processed': 0, 'reminded': 0, 'failed': 0, 'batches': 0}
+        last_id = 0
+        started = time.time()
+
+        with app.app_context():
+            while True:
+                rows = db.session.query(
+                    VaccinationRecord.id, VaccinationRecord.vaccine_name, VaccinationRecord.due_date,
+                    VaccinationRecord.vaccination_center, User.phone_number, User.preferred_language
+                ).join(
+                    User, VaccinationRecord.patient_id == User.id
+                ).filter(
+                    VaccinationRecord.id > last_id,
+                    VaccinationRecord.status == 'scheduled',
+                    VaccinationRecord.reminder_sent.is_(False),
+                    VaccinationRecord.due_date >= today,
+                    VaccinationRecord.due_date <= horizon,
+                    User.phone_number.isnot(None)
+                ).order_by(VaccinationRecord.id).limit(batch_size).all()
+                if not rows:
+                    break
+                last_id = rows[-1].id
+
+                reminders = [{
+                    'phone_number': row.phone_number,
+                    'vaccine_name': row.vaccine_name,
+                    'due_date': row.due_date,
+                    'center_info': row.vaccination_center,
+                    'language': row.preferred_language or 'en'
+                } for row in rows]
+                results = self.send_vaccination_reminders(reminders)
+
+                delivered = [row.id for row, result in zip(rows, results) if result and any(
+                    isinstance(r, dict) and (r.get('success') or r.get('queued')) for r in result.values())]
+                if delivered:
+                    VaccinationRecord.query.filter(VaccinationRecord.id.in_(delivered)).update(
+                        {'reminder_sent': True}, synchronize_session=False)
+                db.session.commit()
+
+                stats['batches'] += 1
+                stats['processed'] += len(rows)
+                stats['reminded'] += len(delivered)
+                stats['failed'] += len(rows) - len(delivered)
+                if len(rows) < batch_size:
+                    break
+
+        stats['duration_seconds'] = round(time.time() - started, 2)
+        self.last_vaccination_run = dict(stats, finished_at=datetime.now().isoformat())
+        if stats['processed']:
+            print(f"💉 Vaccination reminder run: {stats['reminded']}/{stats['processed']} records reminded "
+                  f"in {stats['batches']} batches")
+        return stats
+
+    @property
+    def advisory_index(self) -> SentAdvisoryIndex:
+        # Built on first use: the DB backend imports the Flask app
+        if self._advisory_index is None:
+            self._advisory_index = SentAdvisoryIndex()
+        return self._advisory_index
 
     def _check_health_updates(self):
         if not ENHANCED_FEATURES:
@@ -194,28 +480,40 @@ class SimpleAlertScheduler:
             if advisories and 'advisories' in advisories:
                 for advisory in advisories['advisories']:
                     advisory_id = advisory.get('id', '')
-                    already_sent = any(alert.get('advisory_id') == advisory_id for alert in self.alert_history)
-                    if not already_sent and advisory.get('severity') in ['high', 'critical']:
-                        self.send_health_advisory(
-                            advisory.get('title', 'Health Update'),
-                            advisory.get('description', ''),
-                            advisory.get('severity', 'medium')
-                        )
-                        if self.alert_history:
-                            self.alert_history[-1]['advisory_id'] = advisory_id
+                    if advisory.get('severity') not in ['high', 'critical']:
+                        continue
+                    title = advisory.get('title', 'Health Update')
+                    description = advisory.get('description', '')
+                    severity = advisory.get('severity', 'medium')
+                    if not self.advisory_index.claim(advisory_id, title, description, severity):
+                        continue
+                    try:
+                        results = self.send_health_advisory(title, description, severity,
+                                                            advisory_id=advisory_id)
+                    except Exception:
+                        self.advisory_index.release(advisory_id)
+                        raise
+                    outcomes = [r.get('whatsapp', {}) for r in results or []]
+                    sent = sum(1 for r in outcomes if r.get('success'))
+                    queued = sum(1 for r in outcomes if r.get('queued'))
+                    self.advisory_index.mark_sent(advisory_id, sent, len(outcomes) - sent - queued, queued)
         except Exception as e:
             print(f"❌ Health update check error: {e}")
 
     def get_statistics(self) -> Dict:
+        last_alert = self.alert_history.last()
         return {
             'total_subscribers': len(self.subscribers),
-            'alerts_sent_today': len([
-                alert for alert in self.alert_history
-                if alert['sent_at'].date() == datetime.now().date()
-            ]),
-            'total_alerts_sent': len(self.alert_history),
+            'segment_index': self.segment_index.get_stats(),
+            'alerts_sent_today': self.alert_history.count_on(datetime.now().date()),
+            'total_alerts_sent': self.alert_history.total,
             'scheduler_running': self.scheduler_running,
-            'last_check': self.alert_history[-1]['sent_at'].isoformat() if self.alert_history else None
+            'jobs': self.job_scheduler.get_stats(),
+            'last_check': last_alert['sent_at'].isoformat() if last_alert else None,
+            'last_fanout': self.last_fanout,
+            'last_vaccination_run': self.last_vaccination_run,
+            'advisory_dedup': self._advisory_index.get_stats() if self._advisory_index else None,
+            'outbox': self.outbox.get_stats() if self.outbox else None
         }
 
     def get_subscribers_list(self) -> List[Dict]:
@@ -0,0 +1,17 @@
+import logging
+from typing import Optional, Tuple
+
+
+def load_app_db(*model_names: str) -> Optional[Tuple]:
+    """Return (app, db, *models) from the Chatbot package, or None when it cannot load
+
+    Background services (alert worker, scheduler) run outside a request and import
+    the Flask app lazily so they still start in environments without the web stack.
+    """
+    try:
+        import Chatbot
+        from Chatbot import models
+        return (Chatbot.app, Chatbot.db) + tuple(getattr(models, name) for name in model_names)
+    except Exception as e:
+        logging.warning(f"Application database not available: {e}")
+        return None
@@ -0,0 +1,41 @@
+import os
+import logging
+from typing import Callable, Dict, Optional
+
+# Shared by the web workers (Chatbot.sockets) and the alert worker, which must not import the Flask app
+CHAT_NAMESPACE = '/chat'
+
+
+def user_room(user_id) -> str:
+    return f"user-{user_id}"
+
+
+def phone_room(phone_number: str) -> str:
+    return f"phone-{phone_number}"
+
+
+def chat_push_enabled() -> bool:
+    return os.environ.get('ALERT_CHAT_PUSH', 'false').lower() in ['true', 'on', '1']
+
+
+def build_chat_notifier(message_queue: str = None) -> Optional[Callable[[str, Dict], None]]:
+    """``notify(phone_number, alert)`` emitting to web chat through the Socket.IO message queue
+
+    A write-only ``SocketIO(message_queue=...)`` publishes to the queue the web
+    workers listen on, so the alert worker reaches users connected to any of
+    them without importing the Flask app. Returns None when no queue is configured.
+    """
+    url = message_queue or os.environ.get('SOCKETIO_MESSAGE_QUEUE')
+    if not url:
+        logging.warning("ALERT_CHAT_PUSH is on but SOCKETIO_MESSAGE_QUEUE is not set; chat push disabled")
+        return None
+    try:
+        from flask_socketio import SocketIO
+        emitter = SocketIO(message_queue=url)
+    except Exception as e:
+        logging.warning(f"Chat push unavailable: {e}")
+        return None
+
+    def notify(phone_number: str, alert: Dict):
+        emitter.emit('alert', alert, to=phone_room(phone_number), namespace=CHAT_NAMESPACE)
+    return notify
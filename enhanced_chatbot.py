@@ -2,7 +2,7 @@ import os
 import json
 import random
 from datetime import datetime
-from typing import Dict, Tuple
+from typing import Dict, Iterator, Tuple
 
 # Try to import advanced ML libraries, else fallback
 try:
@@ -188,6 +188,17 @@ class EnhancedChatBot:
             return "general_health", 0.5
 
     def get_response(self, user_input: str, user_phone: str=None, user_name: str="User", language: str="en") -> str:
+        sections = self.iter_response_sections(user_input, user_phone, user_name, language)
+        return "\n\n".join(text for kind, text in sections if kind != "intent")
+
+    def iter_response_sections(self, user_input: str, user_phone: str=None, user_name: str="User",
+                               language: str="en") -> Iterator[Tuple[str, object]]:
+        """Yield the reply piece by piece for streaming clients
+
+        The first item is ``("intent", {"intent", "confidence"})``, followed by the
+        ``"answer"`` text and, when they apply, ``"emergency"`` and ``"follow_up"``
+        sections. ``get_response`` joins the text sections with blank lines.
+        """
         if user_phone:
             if user_phone not in self.user_sessions:
                 self.user_sessions[user_phone] = {
@@ -203,19 +214,19 @@ class EnhancedChatBot:
             })
 
         predicted_intent, confidence = self.predict_intent(user_input)
-        response = self._get_intent_response(predicted_intent)
+        yield "intent", {"intent": predicted_intent, "confidence": round(float(confidence), 3)}
 
+        response = self._get_intent_response(predicted_intent)
         if user_name != "User":
             response = f"Hello {user_name}! {response}"
+        yield "answer", response
 
         if predicted_intent != "emergency" and self._contains_emergency_keywords(user_input):
-            response += "\n\n⚠️ **If this is a medical emergency, please call 108 immediately!**"
+            yield "emergency", "⚠️ **If this is a medical emergency, please call 108 immediately!**"
 
         follow_up = self._get_follow_up_suggestions(predicted_intent)
         if follow_up:
-            response += f"\n\n**You might also want to:**\n{follow_up}"
-
-        return response
+            yield "follow_up", f"**You might also want to:**\n{follow_up}"
 
     def get_sms_response(self, user_input: str, user_phone: str=None) -> str:
         predicted_intent, _ = self.predict_intent(user_input)
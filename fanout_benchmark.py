@@ -0,0 +1,250 @@
+"""Load test for alert fan-out against a local fake Twilio endpoint
+
+Starts a Twilio-compatible HTTP server on localhost with configurable latency and
+error rate, seeds synthetic subscribers into SimpleAlertScheduler and times a
+health advisory or outbreak broadcast end to end. Nothing is sent to real phones.
+
+    python fanout_benchmark.py --subscribers 20000 --latency 0.08 --error-rate 0.01
+"""
+import os
+import sys
+import json
+import time
+import uuid
+import random
+import argparse
+import threading
+import tracemalloc
+from contextlib import redirect_stdout
+from http.server import ThreadingHTTPServer, BaseHTTPRequestHandler
+from types import SimpleNamespace
+from urllib.parse import parse_qs
+
+try:
+    import resource
+except ImportError:  # Windows
+    resource = None
+
+# Measure direct fan-out: no durable outbox and no multi-megabyte history spill
+os.environ.setdefault('ALERT_OUTBOX_ENABLED', 'false')
+os.environ.setdefault('ALERT_HISTORY_LOG', '')
+
+from alert_fanout import FanoutEngine
+from alert_system import SimpleAlertScheduler
+from twilio_transport import FakeMessagingClient, TWILIO_AVAILABLE, build_messaging_client
+from whatsapp_sms_handler import WhatsAppHandler, SMSHandler
+
+LANGUAGES = ['en', 'hi', 'ta', 'te', 'bn', 'mr']
+STATES = ['Maharashtra', 'Karnataka', 'Tamil Nadu', 'West Bengal', 'Delhi', 'Kerala']
+
+
+class FakeTwilioServer(ThreadingHTTPServer):
+    """Answers POST /2010-04-01/Accounts/<sid>/Messages.json like the Twilio API"""
+
+    daemon_threads = True
+    request_queue_size = 256
+
+    def __init__(self, latency: float = 0.05, error_rate: float = 0.0, seed: int = None):
+        super().__init__(('127.0.0.1', 0), FakeTwilioRequestHandler)
+        self.latency = latency
+        self.error_rate = error_rate
+        self.received = 0
+        self.failed = 0
+        self._random = random.Random(seed)
+        self._lock = threading.Lock()
+        self._thread = None
+
+    @property
+    def base_url(self) -> str:
+        return f"http://127.0.0.1:{self.server_port}"
+
+    def start(self):
+        self._thread = threading.Thread(target=self.serve_forever, name='fake-twilio', daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self.shutdown()
+        self.server_close()
+
+
+class FakeTwilioRequestHandler(BaseHTTPRequestHandler):
+    protocol_version = 'HTTP/1.1'
+
+    def do_POST(self):
+        length = int(self.headers.get('Content-Length') or 0)
+        form = parse_qs(self.rfile.read(length).decode('utf-8'))
+        server = self.server
+        if server.latency:
+            time.sleep(server.latency)
+        with server._lock:
+            server.received += 1
+            failed = server._random.random() < server.error_rate
+            if failed:
+                server.failed += 1
+
+        if failed:
+            status, payload = 503, {'code': 20503, 'message': 'Service unavailable (fake)', 'status': 503}
+        else:
+            status, payload = 201, {
+                'sid': f"SM{uuid.uuid4().hex}",
+                'status': 'queued',
+                'to': form.get('To', [''])[0],
+                'from': form.get('From', [''])[0],
+                'body': form.get('Body', [''])[0]
+            }
+        body = json.dumps(payload).encode('utf-8')
+        self.send_response(status)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        pass
+
+
+class TimedMessages:
+    """Wraps ``client.messages`` and records the latency of every create() call"""
+
+    def __init__(self, messages):
+        self._messages = messages
+        self.latencies = []
+        self._lock = threading.Lock()
+
+    def create(self, **kwargs):
+        started = time.perf_counter()
+        try:
+            return self._messages.create(**kwargs)
+        finally:
+            elapsed = time.perf_counter() - started
+            with self._lock:
+                self.latencies.append(elapsed)
+
+
+def percentile(values, fraction: float):
+    if not values:
+        return None
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(round(fraction * (len(ordered) - 1))))]
+
+
+def peak_rss_mb():
+    if resource is None:
+        return None
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # ru_maxrss is KiB on Linux and bytes on macOS
+    return round(peak / (1024 * 1024) if sys.platform == 'darwin' else peak / 1024, 1)
+
+
+def build_client(backend: str, server: FakeTwilioServer, latency: float, error_rate: float, seed: int):
+    if backend == 'inprocess':
+        return FakeMessagingClient(latency=latency, error_rate=error_rate, seed=seed)
+    os.environ['TWILIO_API_BASE_URL'] = server.base_url
+    os.environ.setdefault('TWILIO_ACCOUNT_SID', 'AC' + '0' * 32)
+    os.environ.setdefault('TWILIO_AUTH_TOKEN', 'benchmark')
+    return build_messaging_client('twilio')
+
+
+def seed_subscribers(scheduler: SimpleAlertScheduler, count: int, seed: int):
+    rng = random.Random(seed)
+    for i in range(count):
+        scheduler.subscribe_user(
+            f"+9170{i:08d}",
+            language=rng.choice(LANGUAGES),
+            state=rng.choice(STATES),
+            pincode=f"{rng.randint(110001, 110099)}",
+            age=rng.randint(18, 85))
+
+
+def run_benchmark(subscribers: int = 10000, scenario: str = 'outbreak', latency: float = 0.05,
+                  error_rate: float = 0.0, workers: int = None, rate: float = 1000.0,
+                  backend: str = None, trace_memory: bool = False, seed: int = 42) -> dict:
+    backend = backend or ('http' if TWILIO_AVAILABLE else 'inprocess')
+    server = FakeTwilioServer(latency, error_rate, seed).start() if backend == 'http' else None
+    client = build_client(backend, server, latency, error_rate, seed)
+    if client is None:
+        raise RuntimeError(f"Could not build a messaging client for backend '{backend}'")
+    timed = TimedMessages(client.messages)
+    timed_client = SimpleNamespace(messages=timed)
+
+    if trace_memory:
+        tracemalloc.start()
+    with open(os.devnull, 'w') as devnull, redirect_stdout(devnull):
+        scheduler = SimpleAlertScheduler(
+            whatsapp_handler=WhatsAppHandler(client=timed_client),
+            sms_handler=SMSHandler(client=timed_client),
+            fanout_engine=FanoutEngine(max_workers=workers, rate_limits={'whatsapp': rate, 'sms': rate}))
+
+        seed_started = time.perf_counter()
+        seed_subscribers(scheduler, subscribers, seed)
+        seed_seconds = time.perf_counter() - seed_started
+
+        started = time.perf_counter()
+        if scenario == 'advisory':
+            results = scheduler.send_health_advisory(
+                'Heat Wave Advisory', 'Stay indoors between 12 and 4 PM and drink plenty of water.', 'high')
+        else:
+            results = scheduler.send_outbreak_alert(
+                'Dengue', 'Multiple districts',
+                ['Remove standing water', 'Use mosquito repellent', 'Seek care for high fever'])
+        wall_seconds = time.perf_counter() - started
+
+    traced_peak = None
+    if trace_memory:
+        traced_peak = tracemalloc.get_traced_memory()[1]
+        tracemalloc.stop()
+    if server:
+        server.stop()
+
+    latencies = timed.latencies
+    failed = sum(1 for r in results or [] for v in r.values() if isinstance(v, dict) and not v.get('success'))
+    return {
+        'scenario': scenario,
+        'backend': backend,
+        'subscribers': subscribers,
+        'recipients': len(results or []),
+        'messages_sent': len(latencies),
+        'messages_failed': failed,
+        'workers': scheduler.fanout_engine.max_workers,
+        'provider_latency_ms': round(latency * 1000, 1),
+        'error_rate': error_rate,
+        'seed_seconds': round(seed_seconds, 3),
+        'wall_seconds': round(wall_seconds, 3),
+        'messages_per_second': round(len(latencies) / wall_seconds, 1) if wall_seconds else None,
+        'send_latency_p50_ms': round(percentile(latencies, 0.50) * 1000, 2) if latencies else None,
+        'send_latency_p99_ms': round(percentile(latencies, 0.99) * 1000, 2) if latencies else None,
+        'tracemalloc_peak_mb': round(traced_peak / (1024 * 1024), 1) if traced_peak is not None else None,
+        'max_rss_mb': peak_rss_mb()
+    }
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.split('\n')[0])
+    parser.add_argument('--subscribers', type=int, default=10000)
+    parser.add_argument('--scenario', choices=['advisory', 'outbreak'], default='outbreak')
+    parser.add_argument('--latency', type=float, default=0.05, help='fake provider latency in seconds')
+    parser.add_argument('--error-rate', type=float, default=0.0, help='fraction of sends the provider rejects')
+    parser.add_argument('--workers', type=int, default=None, help='fan-out workers (ALERT_FANOUT_WORKERS)')
+    parser.add_argument('--rate', type=float, default=1000.0, help='per-channel messages/second limit')
+    parser.add_argument('--backend', choices=['http', 'inprocess'], default=None,
+                        help='http: pooled Twilio client against the fake server; inprocess: FakeMessagingClient')
+    parser.add_argument('--trace-memory', action='store_true', help='report tracemalloc peak (slower)')
+    parser.add_argument('--json', action='store_true', help='print the report as JSON')
+    args = parser.parse_args(argv)
+
+    report = run_benchmark(args.subscribers, args.scenario, args.latency, args.error_rate, args.workers,
+                           args.rate, args.backend, args.trace_memory)
+    if args.json:
+        print(json.dumps(report, indent=2))
+        return report
+
+    print(f"📊 Fan-out benchmark: {report['scenario']} to {report['recipients']} recipients ({report['backend']})")
+    for key, value in report.items():
+        if value is not None and key not in ('scenario', 'backend'):
+            print(f"   {key}: {value}")
+    return report
+
+
+if __name__ == "__main__":
+    main()
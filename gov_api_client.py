@@ -0,0 +1,142 @@
+import time
+import random
+import logging
+import threading
+from contextlib import contextmanager
+from typing import Dict, Optional
+
+import requests
+from requests.adapters import HTTPAdapter
+
+RETRY_STATUSES = {429, 500, 502, 503, 504}
+
+
+class GovernmentAPIError(Exception):
+    """Upstream request failed after all retries"""
+
+
+class GovernmentAPIClient:
+    """Shared HTTP client for the MOHFW and CoWIN APIs
+
+    One ``requests.Session`` per process keeps up to ``pool_size`` keep-alive
+    connections per host and asks for gzip responses. GET requests that fail with
+    a connection error, timeout or a 429/5xx status are retried up to
+    ``max_retries`` times with exponential backoff and full jitter, honouring
+    ``Retry-After`` when the server sends one. Inside ``deadline(at)`` every
+    attempt's timeouts are capped to the time left and no retry starts after
+    ``at``, so a caller that has given up does not keep a worker busy.
+    """
+
+    def __init__(self, headers: Dict[str, str] = None, pool_size: int = 10, connect_timeout: float = 3.0,
+                 read_timeout: float = 10.0, max_retries: int = 2, backoff: float = 0.5,
+                 max_backoff: float = 8.0):
+        self.timeout = (connect_timeout, read_timeout)
+        self.max_retries = max_retries
+        self.backoff = backoff
+        self.max_backoff = max_backoff
+
+        self.session = requests.Session()
+        self.session.headers.update(headers or {})
+        self.session.headers['Accept-Encoding'] = 'gzip, deflate'
+        adapter = HTTPAdapter(pool_connections=4, pool_maxsize=pool_size, max_retries=0)
+        self.session.mount('https://', adapter)
+        self.session.mount('http://', adapter)
+
+        self._deadline = threading.local()
+        self._lock = threading.Lock()
+        self._counters = {'requests': 0, 'retries': 0, 'failures': 0, 'conditional_requests': 0,
+                          'not_modified': 0, 'modified': 0, 'total_latency_ms': 0.0}
+
+    def _count(self, name: str, amount=1):
+        with self._lock:
+            self._counters[name] += amount
+
+    @contextmanager
+    def deadline(self, at: float):
+        """Bound every request made by this thread inside the block to finish by ``at`` (epoch seconds)"""
+        previous = getattr(self._deadline, 'at', None)
+        self._deadline.at = at if previous is None else min(at, previous)
+        try:
+            yield
+        finally:
+            self._deadline.at = previous
+
+    def _delay(self, attempt: int, response: Optional[requests.Response]) -> float:
+        retry_after = response.headers.get('Retry-After') if response is not None else None
+        if retry_after and retry_after.isdigit():
+            return min(self.max_backoff, float(retry_after))
+        return random.uniform(0, min(self.max_backoff, self.backoff * (2 ** attempt)))
+
+    def get(self, url: str, params: Dict = None, headers: Dict = None) -> requests.Response:
+        """GET with retries; returns the final response or raises GovernmentAPIError"""
+        last_error = None
+        deadline = getattr(self._deadline, 'at', None)
+        for attempt in range(self.max_retries + 1):
+            response = None
+            started = time.time()
+            timeout = self.timeout
+            if deadline is not None:
+                remaining = deadline - started
+                if remaining <= 0:
+                    last_error = last_error or 'deadline exceeded'
+                    break
+                timeout = (min(self.timeout[0], remaining), min(self.timeout[1], remaining))
+            try:
+                response = self.session.get(url, params=params, headers=headers, timeout=timeout)
+                if response.status_code not in RETRY_STATUSES:
+                    return response
+                last_error = f"HTTP {response.status_code}"
+            except (requests.ConnectionError, requests.Timeout) as e:
+                last_error = str(e)
+            finally:
+                self._count('requests')
+                self._count('total_latency_ms', (time.time() - started) * 1000)
+
+            if attempt < self.max_retries:
+                self._count('retries')
+                delay = self._delay(attempt, response)
+                if deadline is not None and time.time() + delay >= deadline:
+                    break
+                logging.info(f"Retrying {url} in {delay:.2f}s after {last_error}")
+                time.sleep(delay)
+
+        self._count('failures')
+        raise GovernmentAPIError(f"GET {url} failed after {attempt + 1} attempts: {last_error}")
+
+    def get_json(self, url: str, params: Dict = None, headers: Dict = None) -> Dict:
+        response = self.get(url, params=params, headers=headers)
+        if response.status_code >= 400:
+            self._count('failures')
+            raise GovernmentAPIError(f"GET {url} returned HTTP {response.status_code}")
+        return response.json()
+
+    def get_conditional(self, url: str, params: Dict = None, headers: Dict = None,
+                        validators: Dict = None) -> requests.Response:
+        """GET revalidating against stored ``{'etag', 'last_modified'}``; a 304 means unchanged"""
+        headers = dict(headers or {})
+        if validators:
+            if validators.get('etag'):
+                headers['If-None-Match'] = validators['etag']
+            if validators.get('last_modified'):
+                headers['If-Modified-Since'] = validators['last_modified']
+        response = self.get(url, params=params, headers=headers)
+        if validators:
+            self._count('conditional_requests')
+            self._count('not_modified' if response.status_code == 304 else 'modified')
+        if response.status_code != 304 and response.status_code >= 400:
+            self._count('failures')
+            raise GovernmentAPIError(f"GET {url} returned HTTP {response.status_code}")
+        return response
+
+    @staticmethod
+    def validators_of(response: requests.Response) -> Optional[Dict]:
+        validators = {'etag': response.headers.get('ETag'),
+                      'last_modified': response.headers.get('Last-Modified')}
+        return {k: v for k, v in validators.items() if v} or None
+
+    def get_stats(self) -> Dict:
+        with self._lock:
+            counters = dict(self._counters)
+        latency = counters.pop('total_latency_ms')
+        counters['avg_latency_ms'] = round(latency / counters['requests'], 1) if counters['requests'] else None
+        return counters
@@ -0,0 +1,182 @@
+"""Local stand-in for the MOHFW and CoWIN APIs
+
+Replays recorded JSON payloads (or the service's sample payloads) so the health
+data client can be exercised without touching government endpoints. Point the
+service at it with:
+
+    python gov_api_stub.py --port 8089 --recordings recordings.json
+    MOHFW_API_BASE_URL=http://127.0.0.1:8089/mohfw COWIN_API_BASE_URL=http://127.0.0.1:8089/cowin HEALTH_DATA_LIVE=true
+
+A recordings file maps request paths (e.g. ``/cowin/appointment/sessions/public/calendarByPin``)
+to a payload, or to ``{"by_query": {"pincode=400001": payload}, "default": payload}`` where a
+payload is chosen when every parameter in its key matches the request.
+"""
+import sys
+import json
+import time
+import hashlib
+import random
+import argparse
+import threading
+from email.utils import formatdate
+from http.server import ThreadingHTTPServer, BaseHTTPRequestHandler
+from typing import Dict
+from urllib.parse import urlsplit, parse_qs
+
+from health_data_service import (health_data_service, MOHFW_STATS_PATH, MOHFW_ADVISORIES_PATH,
+                                 COWIN_CALENDAR_BY_PIN_PATH)
+
+MOHFW_PREFIX = '/mohfw'
+COWIN_PREFIX = '/cowin'
+
+
+def sample_payload(path: str, query: Dict[str, str]):
+    """Payload generated from the service's sample data for a known route"""
+    samples = health_data_service
+    if path == MOHFW_PREFIX + MOHFW_STATS_PATH:
+        return samples.get_mock_covid_data(query.get('state'), query.get('district'))
+    if path == MOHFW_PREFIX + MOHFW_ADVISORIES_PATH:
+        return samples.get_mock_health_advisories()
+    if path == COWIN_PREFIX + COWIN_CALENDAR_BY_PIN_PATH:
+        return {'centers': samples.get_mock_vaccination_centers(query.get('pincode', '000000'))['centers']}
+    return None
+
+
+class GovernmentAPIStub(ThreadingHTTPServer):
+    """Threaded HTTP server replaying MOHFW/CoWIN payloads with optional latency and faults
+
+    ``fail_first`` makes the first N requests return 503, which exercises client
+    retries; ``error_rate`` fails a random fraction after that. Responses carry an
+    ETag (hash of the body) and a Last-Modified time, and conditional requests
+    that still match get an empty 304; ``set_recording`` changes a payload.
+    Sample payloads embed the current time, so each is generated once per path
+    and query and then replayed, keeping its ETag stable like a recording's.
+    """
+
+    daemon_threads = True
+
+    def __init__(self, port: int = 0, recordings: Dict = None, latency: float = 0.0,
+                 error_rate: float = 0.0, fail_first: int = 0, seed: int = None):
+        super().__init__(('127.0.0.1', port), GovernmentAPIStubHandler)
+        self.recordings = recordings or {}
+        self.latency = latency
+        self.error_rate = error_rate
+        self.fail_first = fail_first
+        self.requests = []
+        self.last_modified = formatdate(time.time(), usegmt=True)
+        self._samples: Dict = {}
+        self._random = random.Random(seed)
+        self._lock = threading.Lock()
+
+    @property
+    def base_url(self) -> str:
+        return f"http://127.0.0.1:{self.server_port}"
+
+    @classmethod
+    def from_file(cls, path: str, **kwargs) -> 'GovernmentAPIStub':
+        with open(path, encoding='utf-8') as f:
+            return cls(recordings=json.load(f), **kwargs)
+
+    def start(self) -> 'GovernmentAPIStub':
+        threading.Thread(target=self.serve_forever, name='gov-api-stub', daemon=True).start()
+        return self
+
+    def stop(self):
+        self.shutdown()
+        self.server_close()
+
+    def handle_error(self, request, client_address):
+        # Clients that hit their timeout hang up mid-response; that is expected here
+        if not isinstance(sys.exc_info()[1], ConnectionError):
+            super().handle_error(request, client_address)
+
+    def set_recording(self, path: str, payload):
+        with self._lock:
+            self.recordings[path] = payload
+            self.last_modified = formatdate(time.time(), usegmt=True)
+
+    def should_fail(self) -> bool:
+        with self._lock:
+            if self.fail_first > 0:
+                self.fail_first -= 1
+                return True
+            return self._random.random() < self.error_rate
+
+    def lookup(self, path: str, query: Dict[str, str]):
+        recorded = self.recordings.get(path)
+        if isinstance(recorded, dict) and 'by_query' in recorded:
+            for fragment, payload in recorded['by_query'].items():
+                expected = {k: v[0] for k, v in parse_qs(fragment).items()}
+                if all(query.get(k) == v for k, v in expected.items()):
+                    return payload
+            recorded = recorded.get('default')
+        if recorded is not None:
+            return recorded
+        key = (path, tuple(sorted(query.items())))
+        with self._lock:
+            if key not in self._samples:
+                self._samples[key] = sample_payload(path, query)
+            return self._samples[key]
+
+
+class GovernmentAPIStubHandler(BaseHTTPRequestHandler):
+    protocol_version = 'HTTP/1.1'
+
+    def do_GET(self):
+        server = self.server
+        parts = urlsplit(self.path)
+        query = {k: v[0] for k, v in parse_qs(parts.query).items()}
+        with server._lock:
+            server.requests.append({'path': parts.path, 'query': query, 'headers': dict(self.headers)})
+        if server.latency:
+            time.sleep(server.latency)
+
+        if server.should_fail():
+            self._send(503, {'error': 'Service unavailable (stub)'})
+            return
+        payload = server.lookup(parts.path, query)
+        if payload is None:
+            self._send(404, {'error': f'No recording for {parts.path}'})
+            return
+        body = json.dumps(payload, default=str, sort_keys=True).encode('utf-8')
+        etag = '"%s"' % hashlib.sha1(body).hexdigest()
+        if_none_match = self.headers.get('If-None-Match')
+        if (if_none_match == etag or
+                (if_none_match is None and self.headers.get('If-Modified-Since') == server.last_modified)):
+            self.send_response(304)
+            self.send_header('ETag', etag)
+            self.send_header('Content-Length', '0')
+            self.end_headers()
+            return
+        self._send(200, body=body, headers={'ETag': etag, 'Last-Modified': server.last_modified})
+
+    def _send(self, status: int, payload=None, body: bytes = None, headers=None):
+        if body is None:
+            body = json.dumps(payload, default=str).encode('utf-8')
+        self.send_response(status)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(body)))
+        for name, value in (headers or {}).items():
+            self.send_header(name, value)
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        pass
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description='Replay MOHFW/CoWIN payloads locally')
+    parser.add_argument('--port', type=int, default=8089)
+    parser.add_argument('--recordings', help='JSON file mapping request paths to payloads')
+    parser.add_argument('--latency', type=float, default=0.0)
+    parser.add_argument('--error-rate', type=float, default=0.0)
+    args = parser.parse_args()
+
+    options = dict(port=args.port, latency=args.latency, error_rate=args.error_rate)
+    stub = GovernmentAPIStub.from_file(args.recordings, **options) if args.recordings else GovernmentAPIStub(**options)
+    print(f"🧪 Government API stub listening on {stub.base_url} ({MOHFW_PREFIX}, {COWIN_PREFIX})")
+    try:
+        stub.serve_forever()
+    except KeyboardInterrupt:
+        stub.stop()
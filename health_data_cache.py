@@ -0,0 +1,524 @@
+import os
+import gzip
+import json
+import time
+import zlib
+import uuid
+import logging
+import threading
+from collections import OrderedDict
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+try:
+    import fcntl
+except ImportError:  # Windows: flushes are only serialised within one process
+    fcntl = None
+
+FRESH = 'fresh'
+REFRESH_AHEAD = 'refresh_ahead'
+STALE = 'stale'
+
+
+class NotModified(Exception):
+    """Raised by a fetch when the upstream copy still matches the cached validators"""
+
+
+class CacheEntry:
+    __slots__ = ('value', 'stored_at', 'expires_at', 'hits', 'validators')
+
+    def __init__(self, value: Any, stored_at: float, expires_at: float, validators: Dict = None):
+        self.value = value
+        self.stored_at = stored_at
+        self.expires_at = expires_at
+        self.hits = 0
+        self.validators = validators
+
+
+class TTLCache:
+    """Thread-safe LRU cache with per-key-family expiry
+
+    Entries expire ``ttl`` wall-clock seconds after they are stored; the TTL comes
+    from the longest matching key prefix in ``family_ttls`` (e.g. ``covid_stats``
+    vs ``vaccination_centers``) or ``default_ttl``. At most ``max_entries`` are
+    kept: inserting beyond that evicts the least recently used entry.
+
+    Expired entries are retained for ``max_stale`` more seconds so ``lookup`` can
+    serve them as ``STALE`` while the caller revalidates. Entries read at least
+    ``refresh_ahead_hits`` times are reported as ``REFRESH_AHEAD`` during the last
+    ``refresh_ahead_fraction`` of their TTL, so hot keys are renewed before expiry.
+    """
+
+    def __init__(self, max_entries: int = 5000, default_ttl: float = 3600,
+                 family_ttls: Dict[str, float] = None, max_stale: float = 0,
+                 refresh_ahead_fraction: float = 0.2, refresh_ahead_hits: int = 5):
+        self.max_entries = max_entries
+        self.default_ttl = default_ttl
+        self.family_ttls = dict(family_ttls or {})
+        self.max_stale = max_stale
+        self.refresh_ahead_fraction = refresh_ahead_fraction
+        self.refresh_ahead_hits = refresh_ahead_hits
+        self._entries: 'OrderedDict[str, CacheEntry]' = OrderedDict()
+        self._lock = threading.Lock()
+        self._counters = {'hits': 0, 'stale_hits': 0, 'misses': 0, 'expired': 0, 'evictions': 0, 'sets': 0}
+
+    def family_of(self, key: str) -> Optional[str]:
+        matches = [prefix for prefix in self.family_ttls if key.startswith(prefix)]
+        return max(matches, key=len) if matches else None
+
+    def ttl_for(self, key: str) -> float:
+        family = self.family_of(key)
+        return self.family_ttls[family] if family else self.default_ttl
+
+    def lookup(self, key: str, record: bool = True) -> Tuple[Any, Optional[str]]:
+        """Return (value, state) with state FRESH, REFRESH_AHEAD, STALE or None on a miss"""
+        now = time.time()
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and now >= entry.expires_at + self.max_stale:
+                del self._entries[key]
+                if record:
+                    self._counters['expired'] += 1
+                entry = None
+            if entry is None:
+                if record:
+                    self._counters['misses'] += 1
+                return None, None
+            self._entries.move_to_end(key)
+            if now >= entry.expires_at:
+                if record:
+                    self._counters['stale_hits'] += 1
+                return entry.value, STALE
+            if record:
+                entry.hits += 1
+                self._counters['hits'] += 1
+            ttl = entry.expires_at - entry.stored_at
+            if (entry.hits >= self.refresh_ahead_hits and
+                    entry.expires_at - now <= ttl * self.refresh_ahead_fraction):
+                return entry.value, REFRESH_AHEAD
+            return entry.value, FRESH
+
+    def get(self, key: str) -> Any:
+        """Fresh value for ``key`` or None"""
+        value, state = self.lookup(key)
+        return None if state in (None, STALE) else value
+
+    def peek(self, key: str) -> Optional[CacheEntry]:
+        """The entry for ``key``, fresh or stale, without touching counters or LRU order"""
+        with self._lock:
+            return self._entries.get(key)
+
+    def set(self, key: str, value: Any, ttl: float = None, stored_at: float = None, validators: Dict = None):
+        """Store ``value``; ``stored_at`` keeps the original age of entries loaded from elsewhere"""
+        stored_at = time.time() if stored_at is None else stored_at
+        ttl = self.ttl_for(key) if ttl is None else ttl
+        with self._lock:
+            self._entries[key] = CacheEntry(value, stored_at, stored_at + ttl, validators)
+            self._entries.move_to_end(key)
+            self._counters['sets'] += 1
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+                self._counters['evictions'] += 1
+
+    def delete(self, key: str):
+        with self._lock:
+            self._entries.pop(key, None)
+
+    def items(self) -> List[Tuple[str, CacheEntry]]:
+        """Snapshot of (key, entry) pairs, least recently used first"""
+        with self._lock:
+            return list(self._entries.items())
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+    def __contains__(self, key: str) -> bool:
+        with self._lock:
+            entry = self._entries.get(key)
+            return entry is not None and entry.expires_at > time.time()
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def get_stats(self) -> Dict:
+        with self._lock:
+            counters = dict(self._counters)
+            size = len(self._entries)
+        served = counters['hits'] + counters['stale_hits']
+        lookups = served + counters['misses']
+        return {
+            'entries': size,
+            'max_entries': self.max_entries,
+            'hit_rate': round(served / lookups, 3) if lookups else None,
+            'family_ttls': dict(self.family_ttls),
+            **counters
+        }
+
+
+class _Call:
+    __slots__ = ('event', 'value', 'error')
+
+    def __init__(self):
+        self.event = threading.Event()
+        self.value = None
+        self.error = None
+
+
+# Deletes the lock only if this process still owns it
+_RELEASE_SCRIPT = "if redis.call('get', KEYS[1]) == ARGV[1] then return redis.call('del', KEYS[1]) end return 0"
+
+
+class SingleFlight:
+    """Collapse concurrent loads of the same key into a single call
+
+    Within a process the first caller for a key runs ``func`` and every concurrent
+    caller waits (up to ``timeout`` seconds) for that result. With a Redis client,
+    the leader additionally takes a ``SET NX PX`` lock so only one process fetches;
+    the others poll for the JSON result the lock holder publishes for
+    ``result_ttl`` seconds. Redis errors degrade to per-process coalescing.
+    """
+
+    def __init__(self, timeout: float = 10.0, redis_client=None, lock_ttl: float = 15.0,
+                 result_ttl: float = 5.0, poll_interval: float = 0.05, namespace: str = 'healthdata'):
+        self.timeout = timeout
+        self.redis = redis_client
+        self.lock_ttl = lock_ttl
+        self.result_ttl = result_ttl
+        self.poll_interval = poll_interval
+        self.namespace = namespace
+        self._calls: Dict[str, _Call] = {}
+        self._lock = threading.Lock()
+        self._counters = {'leader_calls': 0, 'coalesced': 0, 'timeouts': 0,
+                          'remote_results': 0, 'redis_errors': 0}
+
+    def _count(self, name: str):
+        with self._lock:
+            self._counters[name] += 1
+
+    def do(self, key: str, func: Callable[[], Any]) -> Any:
+        with self._lock:
+            call = self._calls.get(key)
+            leader = call is None
+            if leader:
+                call = self._calls[key] = _Call()
+                self._counters['leader_calls'] += 1
+            else:
+                self._counters['coalesced'] += 1
+
+        if not leader:
+            if not call.event.wait(self.timeout):
+                self._count('timeouts')
+                raise TimeoutError(f"Timed out waiting for in-flight fetch of {key}")
+            if call.error is not None:
+                raise call.error
+            return call.value
+
+        try:
+            call.value = self._do_distributed(key, func) if self.redis else func()
+            return call.value
+        except Exception as e:
+            call.error = e
+            raise
+        finally:
+            with self._lock:
+                self._calls.pop(key, None)
+            call.event.set()
+
+    def _do_distributed(self, key: str, func: Callable[[], Any]) -> Any:
+        lock_key = f"{self.namespace}:lock:{key}"
+        result_key = f"{self.namespace}:result:{key}"
+        token = uuid.uuid4().hex
+        deadline = time.time() + self.timeout
+        while True:
+            try:
+                published = self.redis.get(result_key)
+                if published is not None:
+                    self._count('remote_results')
+                    return json.loads(published)
+                acquired = self.redis.set(lock_key, token, nx=True, px=int(self.lock_ttl * 1000))
+            except Exception as e:
+                self._count('redis_errors')
+                logging.warning(f"Single-flight Redis lock unavailable, fetching locally: {e}")
+                return func()
+
+            if acquired:
+                try:
+                    value = func()
+                    if value is not None:
+                        try:
+                            self.redis.set(result_key, json.dumps(value, default=str),
+                                           px=int(self.result_ttl * 1000))
+                        except Exception:
+                            self._count('redis_errors')
+                    return value
+                finally:
+                    try:
+                        self.redis.eval(_RELEASE_SCRIPT, 1, lock_key, token)
+                    except Exception:
+                        self._count('redis_errors')
+
+            if time.time() >= deadline:
+                self._count('timeouts')
+                raise TimeoutError(f"Timed out waiting for another process to fetch {key}")
+            time.sleep(self.poll_interval)
+
+    def get_stats(self) -> Dict:
+        with self._lock:
+            return dict(self._counters, in_flight=len(self._calls), distributed=self.redis is not None)
+
+
+class RedisCacheTier:
+    """Shared L2 cache in Redis for values that every worker process can reuse
+
+    Values are stored as zlib-compressed JSON together with their store and expiry
+    times, so a process that loads an entry sees the same freshness as the process
+    that fetched it. Redis expires each key ``retain_seconds`` after it is written
+    (TTL plus the stale window). Hit/miss counters are kept per process and also
+    accumulated in a Redis hash so the cross-process hit rate can be read from any
+    worker. Any Redis error is counted and treated as a miss.
+    """
+
+    def __init__(self, redis_client, namespace: str = 'healthdata:cache', stats_flush_interval: float = 5.0):
+        self.redis = redis_client
+        self.namespace = namespace
+        self.stats_key = f"{namespace}:stats"
+        self.stats_flush_interval = stats_flush_interval
+        self._lock = threading.Lock()
+        self._counters = {'hits': 0, 'misses': 0, 'writes': 0, 'errors': 0, 'bytes_written': 0}
+        self._pending = {}
+        self._last_flush = time.time()
+
+    def _count(self, name: str, amount: int = 1, shared: bool = False):
+        with self._lock:
+            self._counters[name] += amount
+            if shared:
+                self._pending[name] = self._pending.get(name, 0) + amount
+            due = self._pending and time.time() - self._last_flush >= self.stats_flush_interval
+            if due:
+                pending, self._pending = self._pending, {}
+                self._last_flush = time.time()
+        if due:
+            self._flush(pending)
+
+    def _flush(self, pending: Dict[str, int]):
+        try:
+            pipe = self.redis.pipeline(transaction=False)
+            for name, amount in pending.items():
+                pipe.hincrby(self.stats_key, name, amount)
+            pipe.execute()
+        except Exception as e:
+            logging.debug(f"Shared cache stats flush failed: {e}")
+
+    @staticmethod
+    def encode(value: Any, stored_at: float, expires_at: float, validators: Dict = None) -> bytes:
+        payload = {'v': value, 's': stored_at, 'e': expires_at}
+        if validators:
+            payload['h'] = validators
+        return zlib.compress(json.dumps(payload, separators=(',', ':'), default=str).encode('utf-8'), 6)
+
+    @staticmethod
+    def decode(blob: bytes) -> Tuple[Any, float, float, Optional[Dict]]:
+        payload = json.loads(zlib.decompress(blob))
+        return payload['v'], payload['s'], payload['e'], payload.get('h')
+
+    def get(self, key: str) -> Optional[Tuple[Any, float, float, Optional[Dict]]]:
+        """Return (value, stored_at, expires_at, validators) or None"""
+        try:
+            blob = self.redis.get(f"{self.namespace}:{key}")
+            if blob is None:
+                self._count('misses', shared=True)
+                return None
+            entry = self.decode(blob)
+        except Exception as e:
+            logging.warning(f"Shared cache read failed for {key}: {e}")
+            self._count('errors')
+            return None
+        self._count('hits', shared=True)
+        return entry
+
+    def set(self, key: str, value: Any, stored_at: float, expires_at: float, retain_seconds: float,
+            validators: Dict = None):
+        try:
+            blob = self.encode(value, stored_at, expires_at, validators)
+            self.redis.set(f"{self.namespace}:{key}", blob, px=max(1, int(retain_seconds * 1000)))
+        except Exception as e:
+            logging.warning(f"Shared cache write failed for {key}: {e}")
+            self._count('errors')
+            return
+        self._count('writes')
+        self._count('bytes_written', len(blob))
+
+    def get_stats(self) -> Dict:
+        with self._lock:
+            local = dict(self._counters)
+        lookups = local['hits'] + local['misses']
+        stats = {'process': dict(local, hit_rate=round(local['hits'] / lookups, 3) if lookups else None)}
+        try:
+            shared = {k.decode() if isinstance(k, bytes) else k: int(v)
+                      for k, v in self.redis.hgetall(self.stats_key).items()}
+            shared_lookups = shared.get('hits', 0) + shared.get('misses', 0)
+            stats['all_processes'] = dict(
+                shared, hit_rate=round(shared.get('hits', 0) / shared_lookups, 3) if shared_lookups else None)
+        except Exception as e:
+            stats['all_processes'] = {'error': str(e)}
+        return stats
+
+
+class AccessFrequencyLog:
+    """Request counts per cache key, persisted to a JSON file for startup warmup
+
+    Counts accumulate in memory and are merged into ``path`` at most every
+    ``flush_interval`` seconds on a background thread, so several processes can
+    share the file (each adds its own deltas). The read-merge-write runs under an
+    exclusive ``fcntl`` lock on ``<path>.lock`` so concurrent flushes cannot drop
+    each other's deltas, and the file is replaced atomically via a temporary file
+    and ``os.replace``, keeping the ``max_keys`` hottest keys. Stored counts are
+    multiplied by ``decay`` per ``decay_period`` seconds elapsed since the last
+    write, so yesterday's outbreak fades at the same rate however busy the
+    workers are.
+    """
+
+    def __init__(self, path: str, flush_interval: float = 60.0, max_keys: int = 1000, decay: float = 0.95,
+                 decay_period: float = 3600.0):
+        self.path = path
+        self.flush_interval = flush_interval
+        self.max_keys = max_keys
+        self.decay = decay
+        self.decay_period = decay_period
+        self._pending: Dict[str, int] = {}
+        self._lock = threading.Lock()
+        self._flush_lock = threading.Lock()
+        self._last_flush = time.time()
+
+    def record(self, key: str):
+        with self._lock:
+            self._pending[key] = self._pending.get(key, 0) + 1
+            due = time.time() - self._last_flush >= self.flush_interval
+            if due:
+                self._last_flush = time.time()
+        if due:
+            threading.Thread(target=self.flush, name='access-log-flush', daemon=True).start()
+
+    def _read_state(self) -> Dict:
+        try:
+            with open(self.path, encoding='utf-8') as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            return {}
+
+    def read(self) -> Dict[str, float]:
+        return self._read_state().get('counts', {})
+
+    def flush(self):
+        with self._lock:
+            pending, self._pending = self._pending, {}
+        if not pending or not self.path:
+            return
+        with self._flush_lock:
+            try:
+                directory = os.path.dirname(self.path)
+                if directory:
+                    os.makedirs(directory, exist_ok=True)
+                with open(f"{self.path}.lock", 'a') as lock_file:
+                    if fcntl:
+                        fcntl.flock(lock_file, fcntl.LOCK_EX)
+                    try:
+                        self._merge(pending)
+                    finally:
+                        if fcntl:
+                            fcntl.flock(lock_file, fcntl.LOCK_UN)
+            except Exception as e:
+                logging.warning(f"Access frequency log flush failed: {e}")
+
+    def _merge(self, pending: Dict[str, int]):
+        # Caller holds the file lock, so the state read here is the latest on disk
+        state = self._read_state()
+        now = time.time()
+        elapsed = max(0.0, now - state.get('updated_at', now))
+        factor = self.decay ** (elapsed / self.decay_period)
+        counts = {key: count * factor for key, count in state.get('counts', {}).items()}
+        for key, count in pending.items():
+            counts[key] = counts.get(key, 0) + count
+        hottest = dict(sorted(counts.items(), key=lambda item: item[1], reverse=True)[:self.max_keys])
+        tmp_path = f"{self.path}.{os.getpid()}.tmp"
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            json.dump({'updated_at': now, 'counts': hottest}, f)
+        os.replace(tmp_path, self.path)
+
+    def top(self, n: int) -> List[str]:
+        counts = self.read()
+        with self._lock:
+            for key, count in self._pending.items():
+                counts[key] = counts.get(key, 0) + count
+        return [key for key, _ in sorted(counts.items(), key=lambda item: item[1], reverse=True)[:n]]
+
+
+class CacheSnapshot:
+    """Gzipped JSON snapshot of a TTLCache so restarts do not begin cold
+
+    ``save`` writes every entry that is not past its stale window to ``path``
+    atomically (temporary file and ``os.replace``), least recently used first.
+    ``restore`` loads entries that are still fresh or within ``max_stale``
+    with their original ``stored_at``, so TTLs keep counting from the upstream
+    fetch, and never overwrites a key that was fetched since startup.
+    """
+
+    def __init__(self, path: str, interval: float = 300.0):
+        self.path = path
+        self.interval = interval
+        self.last_save: Optional[Dict] = None
+        self.last_restore: Optional[Dict] = None
+        self._lock = threading.Lock()
+
+    def save(self, cache: TTLCache) -> Dict:
+        started = time.time()
+        cutoff = started - cache.max_stale
+        entries = [[key, entry.value, entry.stored_at, entry.expires_at, entry.validators]
+                   for key, entry in cache.items() if entry.expires_at > cutoff]
+        with self._lock:
+            directory = os.path.dirname(self.path)
+            if directory:
+                os.makedirs(directory, exist_ok=True)
+            tmp_path = f"{self.path}.{os.getpid()}.tmp"
+            with gzip.open(tmp_path, 'wt', encoding='utf-8', compresslevel=6) as f:
+                json.dump({'saved_at': started, 'entries': entries}, f, default=str)
+            os.replace(tmp_path, self.path)
+            self.last_save = {
+                'entries': len(entries),
+                'bytes': os.path.getsize(self.path),
+                'seconds': round(time.time() - started, 3),
+                'saved_at': started
+            }
+        return self.last_save
+
+    def restore(self, cache: TTLCache) -> Dict:
+        started = time.time()
+        restored = expired = 0
+        try:
+            size = os.path.getsize(self.path)
+            with gzip.open(self.path, 'rt', encoding='utf-8') as f:
+                entries = json.load(f).get('entries', [])
+        except FileNotFoundError:
+            size, entries = 0, []
+        except (OSError, ValueError) as e:
+            logging.warning(f"Health cache snapshot {self.path} not restored: {e}")
+            size, entries = 0, []
+        now = time.time()
+        for key, value, stored_at, expires_at, validators in entries:
+            if now >= expires_at + cache.max_stale:
+                expired += 1
+            elif cache.peek(key) is None:
+                cache.set(key, value, ttl=expires_at - stored_at, stored_at=stored_at, validators=validators)
+                restored += 1
+        self.last_restore = {
+            'restored': restored,
+            'expired': expired,
+            'bytes': size,
+            'seconds': round(time.time() - started, 3),
+            'restored_at': started
+        }
+        return self.last_restore
+
+    def get_stats(self) -> Dict:
+        return {'path': self.path, 'interval': self.interval,
+                'last_save': self.last_save, 'last_restore': self.last_restore}
@@ -1,52 +1,214 @@
 import os
 import requests
 import json
+import time
+import logging
+import threading
+from concurrent.futures import ThreadPoolExecutor, wait
 from datetime import datetime, timedelta
-from typing import Optional, Dict
+from typing import Optional, Dict, Iterable
+
+from gov_api_client import GovernmentAPIClient
+from pincode_index import PincodeCoordinates, CenterSpatialIndex
+from health_data_cache import (TTLCache, SingleFlight, RedisCacheTier, AccessFrequencyLog, CacheSnapshot,
+                               NotModified, REFRESH_AHEAD, STALE)
+from shared_redis import get_redis_client
+
+# Vaccination slots change within minutes; case statistics are published a few times a day
+CACHE_FAMILY_TTLS = {
+    'covid_stats': float(os.environ.get('HEALTH_CACHE_TTL_COVID', '3600')),
+    'vaccination_centers': float(os.environ.get('HEALTH_CACHE_TTL_CENTERS', '300')),
+    'health_advisories': float(os.environ.get('HEALTH_CACHE_TTL_ADVISORIES', '900'))
+}
+
+MOHFW_STATS_PATH = '/covid-stats'
+MOHFW_ADVISORIES_PATH = '/advisories'
+COWIN_CALENDAR_BY_PIN_PATH = '/appointment/sessions/public/calendarByPin'
 
 class GovernmentHealthDataService:
     """Integrate with government health APIs and provide caching."""
 
     def __init__(self):
-        self.mohfw_base_url = "https://api.mohfw.gov.in/v1"
-        self.cowin_base_url = "https://cdn-api.co-vin.in/api/v2"
+        self.mohfw_base_url = os.environ.get('MOHFW_API_BASE_URL', "https://api.mohfw.gov.in/v1").rstrip('/')
+        self.cowin_base_url = os.environ.get('COWIN_API_BASE_URL', "https://cdn-api.co-vin.in/api/v2").rstrip('/')
+        # Sample payloads are served unless HEALTH_DATA_LIVE is on
+        self.live_data = os.environ.get('HEALTH_DATA_LIVE', 'false').lower() in ['true', 'on', '1']
         
         self.mohfw_api_key = os.environ.get('MOHFW_API_KEY')
         self.cowin_api_key = os.environ.get('COWIN_API_KEY')
         
-        self.cache = {}
-        self.cache_timeout = 3600  # seconds
+        self.cache_timeout = 3600  # seconds, for keys outside CACHE_FAMILY_TTLS
+        # Expired entries are still served for HEALTH_CACHE_MAX_STALE seconds while a refresh runs
+        self.cache = TTLCache(max_entries=int(os.environ.get('HEALTH_CACHE_MAX_ENTRIES', '5000')),
+                              default_ttl=self.cache_timeout, family_ttls=CACHE_FAMILY_TTLS,
+                              max_stale=float(os.environ.get('HEALTH_CACHE_MAX_STALE', '600')),
+                              refresh_ahead_hits=int(os.environ.get('HEALTH_CACHE_REFRESH_AHEAD_HITS', '5')))
+        # Optional L2 shared by every worker process; L1-only when Redis is absent
+        redis_client = None
+        if os.environ.get('HEALTH_CACHE_SHARED', 'true').lower() in ['true', 'on', '1']:
+            redis_client = get_redis_client()
+        self.shared_cache = RedisCacheTier(redis_client) if redis_client else None
+        # One upstream fetch per key at a time; across processes too when HEALTH_FETCH_REDIS_LOCK is on
+        use_redis_lock = os.environ.get('HEALTH_FETCH_REDIS_LOCK', 'false').lower() in ['true', 'on', '1']
+        self.single_flight = SingleFlight(timeout=float(os.environ.get('HEALTH_FETCH_TIMEOUT', '10')),
+                                          redis_client=get_redis_client() if use_redis_lock else None)
+        self._refresher = ThreadPoolExecutor(max_workers=int(os.environ.get('HEALTH_REFRESH_WORKERS', '2')),
+                                             thread_name_prefix='health-refresh')
+        self._refreshing = set()
+        self._refresh_lock = threading.Lock()
+        self.refresh_stats = {'stale_served': 0, 'refresh_ahead': 0, 'refreshed': 0, 'refresh_failed': 0,
+                              'ttl_extended': 0}
+        self._fetched_validators: Dict[str, Dict] = {}
+        self.access_log = AccessFrequencyLog(
+            os.environ.get('HEALTH_ACCESS_LOG', os.path.join('logs', 'health_access.json')))
+        self._warming = threading.local()
+        self.last_warmup = None
+        # Restarts restore the last snapshot instead of starting cold; '' disables snapshots
+        snapshot_path = os.environ.get('HEALTH_CACHE_SNAPSHOT', os.path.join('logs', 'health_cache.json.gz'))
+        self.snapshot = CacheSnapshot(
+            snapshot_path, interval=float(os.environ.get('HEALTH_CACHE_SNAPSHOT_INTERVAL', '300'))
+        ) if snapshot_path else None
+        # Bulk queries share one bounded pool so parallel dashboards cannot flood upstream
+        self.bulk_workers = int(os.environ.get('HEALTH_BULK_WORKERS', '8'))
+        self._bulk_pool = ThreadPoolExecutor(max_workers=self.bulk_workers, thread_name_prefix='health-bulk')
+        self.bulk_timeout = float(os.environ.get('HEALTH_BULK_TIMEOUT', '30'))
+        self.fetch_errors: Dict[str, str] = {}
+        self.pincode_coordinates = PincodeCoordinates.load()
+        self.center_index = CenterSpatialIndex()
+        self._indexed_listings: Dict[str, list] = {}
         
         self.headers = {
             'User-Agent': 'Healthcare-Chatbot/1.0',
             'Accept': 'application/json',
             'Content-Type': 'application/json'
         }
+        self.http = GovernmentAPIClient(
+            headers=self.headers,
+            pool_size=int(os.environ.get('GOV_API_POOL_SIZE', '10')),
+            connect_timeout=float(os.environ.get('GOV_API_CONNECT_TIMEOUT', '3')),
+            read_timeout=float(os.environ.get('GOV_API_READ_TIMEOUT', '10')),
+            max_retries=int(os.environ.get('GOV_API_MAX_RETRIES', '2')))
         
         print("✅ Government health data service initialized")
 
-    def get_cached_or_fetch(self, key: str, fetch_func, *args, **kwargs) -> Optional[Dict]:
-        if key in self.cache:
-            data, timestamp = self.cache[key]
-            if (datetime.now() - timestamp).seconds < self.cache_timeout:
+    def get_cached_or_fetch(self, key: str, fetch_func, *args, warm: tuple = None, **kwargs) -> Optional[Dict]:
+        """Cached value for ``key``, fetching it on a miss
+
+        ``warm`` is the (getter name, *arguments) call that rebuilds the key; it is
+        what the access log counts, so warmup never has to parse cache keys.
+        """
+        def fetch():
+            return fetch_func(*args, **kwargs)
+
+        if warm and not getattr(self._warming, 'active', False):
+            self.access_log.record(json.dumps(list(warm)))
+        data, state = self.cache.lookup(key)
+        if state is None and self.shared_cache and self._load_shared(key):
+            data, state = self.cache.lookup(key, record=False)
+        if state is not None:
+            if state == STALE:
+                print(f"📋 Serving stale data for {key} while refreshing")
+                self._refresh_in_background(key, fetch, 'stale_served')
+            elif state == REFRESH_AHEAD:
+                self._refresh_in_background(key, fetch, 'refresh_ahead')
+            else:
                 print(f"📋 Using cached data for {key}")
-                return data
+            return data
         try:
-            print(f"🔄 Fetching new data for {key}")
-            data = fetch_func(*args, **kwargs)
-            if data:
-                self.cache[key] = (data, datetime.now())
+            data = self.single_flight.do(key, lambda: self._fetch_and_store(key, fetch))
+            if data and key not in self.cache:
+                # Result published by another process's fetch
+                self.cache.set(key, data)
+            self.fetch_errors.pop(key, None)
             return data
         except Exception as e:
             print(f"❌ Data fetch error for {key}: {e}")
+            self.fetch_errors[key] = str(e)
             return None
 
+    def _fetch_and_store(self, key: str, fetch, force: bool = False) -> Optional[Dict]:
+        if not force:
+            # A fetch that finished just before this one became leader already filled the cache
+            data, state = self.cache.lookup(key, record=False)
+            if state is not None and state != STALE:
+                return data
+        print(f"🔄 Fetching new data for {key}")
+        try:
+            data = fetch()
+        except NotModified:
+            # Upstream unchanged: keep the cached payload and start a new TTL
+            entry = self.cache.peek(key)
+            if entry is None:
+                return None
+            self._store(key, entry.value, entry.validators)
+            with self._refresh_lock:
+                self.refresh_stats['ttl_extended'] += 1
+            return entry.value
+        if data:
+            self._store(key, data, self._fetched_validators.pop(key, None))
+        return data
+
+    def _store(self, key: str, data: Dict, validators: Dict = None):
+        stored_at = time.time()
+        ttl = self.cache.ttl_for(key)
+        self.cache.set(key, data, ttl=ttl, stored_at=stored_at, validators=validators)
+        if self.shared_cache:
+            self.shared_cache.set(key, data, stored_at, stored_at + ttl, ttl + self.cache.max_stale, validators)
+
+    def _load_shared(self, key: str) -> bool:
+        entry = self.shared_cache.get(key)
+        if entry is None:
+            return False
+        value, stored_at, expires_at, validators = entry
+        self.cache.set(key, value, ttl=expires_at - stored_at, stored_at=stored_at, validators=validators)
+        return True
+
+    def _get_json_revalidating(self, key: str, url: str, params: Dict = None, headers: Dict = None) -> Dict:
+        """Conditional GET using the ETag/Last-Modified stored with ``key``; raises NotModified on 304"""
+        entry = self.cache.peek(key)
+        response = self.http.get_conditional(url, params=params, headers=headers,
+                                             validators=entry.validators if entry else None)
+        if response.status_code == 304:
+            raise NotModified(key)
+        payload = response.json()
+        validators = self.http.validators_of(response)
+        if validators:
+            self._fetched_validators[key] = validators
+        return payload
+
+    def _refresh_in_background(self, key: str, fetch, reason: str):
+        with self._refresh_lock:
+            self.refresh_stats[reason] += 1
+            if key in self._refreshing:
+                return
+            self._refreshing.add(key)
+        self._refresher.submit(self._refresh, key, fetch)
+
+    def _refresh(self, key: str, fetch):
+        try:
+            data = self.single_flight.do(key, lambda: self._fetch_and_store(key, fetch, force=True))
+            outcome = 'refreshed' if data else 'refresh_failed'
+        except Exception as e:
+            logging.warning(f"Background refresh of {key} failed: {e}")
+            outcome = 'refresh_failed'
+        with self._refresh_lock:
+            self._refreshing.discard(key)
+            self.refresh_stats[outcome] += 1
+
+    @staticmethod
+    def _api_key_header(api_key: Optional[str]) -> Optional[Dict]:
+        return {'x-api-key': api_key} if api_key else None
+
     def get_covid_statistics(self, state: str = None, district: str = None) -> Optional[Dict]:
         key = f"covid_stats_{state}_{district}"
         def fetch():
-            # Mock data; replace with real API call to MOHFW with API key if available
-            return self.get_mock_covid_data(state, district)
-        return self.get_cached_or_fetch(key, fetch)
+            if not self.live_data:
+                return self.get_mock_covid_data(state, district)
+            payload = self._get_json_revalidating(key, f"{self.mohfw_base_url}{MOHFW_STATS_PATH}",
+                                                  params={'state': state, 'district': district},
+                                                  headers=self._api_key_header(self.mohfw_api_key))
+            return dict(payload, status='success')
+        return self.get_cached_or_fetch(key, fetch, warm=('covid_stats', state, district))
 
     def get_mock_covid_data(self, state: str = None, district: str = None) -> Dict:
         return {
@@ -69,15 +231,68 @@ class GovernmentHealthDataService:
             date = datetime.now().strftime("%d-%m-%Y")
         key = f"vaccination_centers_{pincode}_{date}"
         def fetch():
-            # Mock data; replace with real CoWIN API call
-            return self.get_mock_vaccination_centers(pincode)
-        return self.get_cached_or_fetch(key, fetch)
+            if not self.live_data:
+                data = self.get_mock_vaccination_centers(pincode)
+            else:
+                payload = self._get_json_revalidating(key, f"{self.cowin_base_url}{COWIN_CALENDAR_BY_PIN_PATH}",
+                                                      params={'pincode': pincode, 'date': date},
+                                                      headers=self._api_key_header(self.cowin_api_key))
+                data = {"centers": payload.get('centers', []), "status": "success", "message": "CoWIN calendar"}
+            self._index_centers(pincode, data.get('centers', []))
+            return data
+        # Listings are per date; warm the pincode for whatever day it is
+        data = self.get_cached_or_fetch(key, fetch, warm=('vaccination_centers', pincode))
+        # Listings restored from the snapshot or loaded from Redis never went through fetch()
+        if data:
+            self._index_centers(pincode, data.get('centers', []))
+        return data
+
+    def _index_centers(self, pincode: str, centers):
+        """Refresh the spatial index with the centers listed for ``pincode``
+
+        A listing already indexed for the pincode (the same cached object) is skipped,
+        so cache hits cost one identity check.
+        """
+        pincode = str(pincode)
+        if self._indexed_listings.get(pincode) is centers:
+            return
+        self._indexed_listings[pincode] = centers
+        entries = []
+        for center in centers:
+            lat, lon = center.get('lat'), center.get('long')
+            # CoWIN often reports whole-degree coordinates; fall back to the pincode location
+            if not (lat and lon and (float(lat) % 1 or float(lon) % 1)):
+                coordinates = self.pincode_coordinates.lookup(center.get('pincode') or pincode)
+                if not coordinates:
+                    continue
+                lat, lon = coordinates
+            capacity = sum(int(session.get('available_capacity') or 0) for session in center.get('sessions', []))
+            entries.append((center.get('center_id'), float(lat), float(lon), capacity, center))
+        self.center_index.replace_source(pincode, entries)
+
+    def get_nearest_vaccination_centers(self, pincode: str, k: int = 5, min_capacity: int = 1,
+                                        max_km: float = 50.0, date: str = None) -> Optional[Dict]:
+        """Nearest ``k`` known centers with free doses, even when ``pincode`` itself has none"""
+        coordinates = self.pincode_coordinates.lookup(pincode)
+        if not coordinates:
+            return {"centers": [], "status": "error", "message": f"Unknown pincode {pincode}"}
+        # Make sure the pincode's own listing is indexed
+        self.get_vaccination_centers(pincode, date)
+        lat, lon = coordinates
+        nearest = self.center_index.nearest(lat, lon, k=k, min_capacity=min_capacity, max_km=max_km)
+        return {
+            "pincode": pincode,
+            "centers": [dict(entry['data'], distance_km=round(distance, 2),
+                             available_capacity=entry['available_capacity']) for distance, entry in nearest],
+            "status": "success",
+            "message": f"{len(nearest)} centers within {max_km:g} km"
+        }
 
     def get_mock_vaccination_centers(self, pincode: str) -> Dict:
         return {
             "centers": [
                 {
-                    "center_id": 123456,
+                    "center_id": int(pincode) if str(pincode).isdigit() else 123456,
                     "name": f"Primary Health Center - {pincode}",
                     "address": f"Main Street, Pincode {pincode}",
                     "state_name": "Sample State",
@@ -100,8 +315,193 @@ class GovernmentHealthDataService:
             "message": "Sample vaccination centers data"
         }
 
+    def get_health_advisories(self) -> Optional[Dict]:
+        key = "health_advisories"
+        def fetch():
+            if not self.live_data:
+                return self.get_mock_health_advisories()
+            payload = self._get_json_revalidating(key, f"{self.mohfw_base_url}{MOHFW_ADVISORIES_PATH}",
+                                                  headers=self._api_key_header(self.mohfw_api_key))
+            return dict(payload, status='success')
+        return self.get_cached_or_fetch(key, fetch, warm=('health_advisories',))
+
+    def get_mock_health_advisories(self) -> Dict:
+        return {
+            "advisories": [
+                {
+                    "id": "mohfw-seasonal-flu",
+                    "title": "Seasonal Influenza Precautions",
+                    "description": "Wash hands often, cover coughs and get the annual flu vaccine.",
+                    "severity": "medium",
+                    "issued_at": datetime.now().strftime("%Y-%m-%d")
+                }
+            ],
+            "status": "success",
+            "message": "Sample health advisories"
+        }
+
+    def _fetch_many(self, calls: Dict[str, tuple], timeout: float = None) -> Dict:
+        """Run ``{name: (cache_key, getter)}`` on the bulk pool; keeps whatever succeeds
+
+        Every getter goes through the cache, so repeated names cost nothing and
+        concurrent callers share upstream fetches. Names that fail, return nothing
+        or miss the deadline are reported in ``errors`` instead of failing the batch.
+        A call keeps at most ``bulk_workers`` getters in flight, submits nothing
+        after its deadline, and its upstream requests stop retrying and time out
+        at that deadline, so a slow upstream cannot pile abandoned work onto the pool.
+        """
+        started = time.time()
+        deadline = started + (timeout or self.bulk_timeout)
+        slots = threading.BoundedSemaphore(self.bulk_workers)
+
+        def run(getter):
+            try:
+                with self.http.deadline(deadline):
+                    return getter()
+            finally:
+                slots.release()
+
+        futures = {}
+        for name, (key, getter) in calls.items():
+            if not slots.acquire(timeout=max(0.0, deadline - time.time())):
+                break
+            futures[self._bulk_pool.submit(run, getter)] = (name, key)
+        done, not_done = wait(futures, timeout=max(0.0, deadline - time.time()))
+        results, errors = {}, {}
+        for future in done:
+            name, key = futures[future]
+            try:
+                data = future.result()
+            except Exception as e:
+                data, errors[name] = None, str(e)
+            if data:
+                results[name] = data
+            elif name not in errors:
+                errors[name] = self.fetch_errors.get(key, 'No data returned')
+        for future in not_done:
+            future.cancel()
+            errors[futures[future][0]] = 'Timed out'
+        submitted = {name for name, _ in futures.values()}
+        for name in calls:
+            if name not in submitted:
+                errors[name] = 'Timed out'
+        if not errors:
+            status = 'success'
+        else:
+            status = 'partial' if results else 'error'
+        return {
+            "results": results,
+            "errors": errors,
+            "status": status,
+            "message": f"{len(results)}/{len(calls)} fetched in {time.time() - started:.2f}s"
+        }
+
+    def get_covid_statistics_many(self, states: Iterable[str], district: str = None,
+                                  timeout: float = None) -> Dict:
+        """COVID statistics for many states at once, keyed by state"""
+        calls = {state: (f"covid_stats_{state}_{district}",
+                         lambda state=state: self.get_covid_statistics(state, district))
+                 for state in states}
+        return self._fetch_many(calls, timeout)
+
+    def get_vaccination_centers_many(self, pincodes: Iterable[str], date: str = None,
+                                     timeout: float = None) -> Dict:
+        """Vaccination centers for many pincodes at once, keyed by pincode"""
+        date = date or datetime.now().strftime("%d-%m-%Y")
+        calls = {str(pincode): (f"vaccination_centers_{pincode}_{date}",
+                                lambda pincode=pincode: self.get_vaccination_centers(pincode, date))
+                 for pincode in pincodes}
+        return self._fetch_many(calls, timeout)
+
+    def _warm_call(self, warm_key: str):
+        try:
+            name, *args = json.loads(warm_key)
+        except (ValueError, TypeError):
+            return None  # entries written before calls were logged; they decay away
+        getter = {
+            'covid_stats': self.get_covid_statistics,
+            'vaccination_centers': self.get_vaccination_centers,
+            'health_advisories': self.get_health_advisories
+        }.get(name)
+        return (lambda: getter(*args)) if getter else None
+
+    def warmup(self, top_n: int = None, concurrency: int = None, time_budget: float = None) -> Dict:
+        """Prefetch the most requested keys from the access log
+
+        Runs at most ``concurrency`` fetches at a time and gives up on whatever has
+        not finished after ``time_budget`` seconds.
+        """
+        top_n = top_n or int(os.environ.get('HEALTH_WARMUP_KEYS', '50'))
+        concurrency = concurrency or int(os.environ.get('HEALTH_WARMUP_CONCURRENCY', '4'))
+        time_budget = time_budget or float(os.environ.get('HEALTH_WARMUP_SECONDS', '20'))
+        started = time.time()
+        calls = [call for call in (self._warm_call(key) for key in self.access_log.top(top_n)) if call]
+
+        def run(call):
+            self._warming.active = True
+            try:
+                return call() is not None
+            finally:
+                self._warming.active = False
+
+        executor = ThreadPoolExecutor(max_workers=concurrency, thread_name_prefix='health-warmup')
+        futures = [executor.submit(run, call) for call in calls]
+        done, not_done = wait(futures, timeout=time_budget)
+        executor.shutdown(wait=False, cancel_futures=True)
+
+        self.last_warmup = {
+            'keys': len(calls),
+            'warmed': sum(1 for f in done if not f.exception() and f.result()),
+            'failed': sum(1 for f in done if f.exception() or not f.result()),
+            'timed_out': len(not_done),
+            'seconds': round(time.time() - started, 2),
+            'finished_at': datetime.now().isoformat()
+        }
+        print(f"🔥 Health data warmup: {self.last_warmup['warmed']}/{len(calls)} keys "
+              f"in {self.last_warmup['seconds']}s")
+        return self.last_warmup
+
+    def start_warmup(self) -> threading.Thread:
+        """Run ``warmup`` on a background thread so startup never waits for it"""
+        thread = threading.Thread(target=self.warmup, name='health-warmup', daemon=True)
+        thread.start()
+        return thread
+
+    def start_snapshots(self) -> Optional[threading.Thread]:
+        """Restore the cache snapshot in the background, then re-save it every interval"""
+        if not self.snapshot:
+            return None
+
+        def run():
+            try:
+                restored = self.snapshot.restore(self.cache)
+                print(f"💾 Restored {restored['restored']} health data entries from snapshot "
+                      f"in {restored['seconds']}s")
+            except Exception as e:
+                logging.warning(f"Health cache snapshot restore failed: {e}")
+            while True:
+                time.sleep(self.snapshot.interval)
+                try:
+                    self.snapshot.save(self.cache)
+                except Exception as e:
+                    logging.warning(f"Health cache snapshot failed: {e}")
+
+        thread = threading.Thread(target=run, name='health-cache-snapshot', daemon=True)
+        thread.start()
+        return thread
+
+    def get_cache_stats(self) -> Dict:
+        with self._refresh_lock:
+            refresh = dict(self.refresh_stats, in_progress=len(self._refreshing))
+        return dict(self.cache.get_stats(), single_flight=self.single_flight.get_stats(), refresh=refresh,
+                    shared_cache=self.shared_cache.get_stats() if self.shared_cache else None,
+                    upstream=dict(self.http.get_stats(), live=self.live_data),
+                    center_index=dict(self.center_index.get_stats(), pincodes=len(self.pincode_coordinates)),
+                    warmup=self.last_warmup,
+                    snapshot=self.snapshot.get_stats() if self.snapshot else None)
+
     # Additional APIs with mocks can be added here such as:
-    # get_health_advisories, get_hospital_beds, get_medicine_info, etc.
+    # get_hospital_beds, get_medicine_info, etc.
 
 # Global instance
 health_data_service = GovernmentHealthDataService()
@@ -0,0 +1,221 @@
+import json
+import heapq
+import sqlite3
+import logging
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+from typing import Callable, Dict, List, Optional
+
+from outbox import ALERT_STATE_DB
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS scheduled_jobs (
+    job_id TEXT PRIMARY KEY,
+    job_type TEXT NOT NULL,
+    run_at REAL NOT NULL,
+    interval_seconds REAL,
+    payload TEXT NOT NULL DEFAULT '{}',
+    attempts INTEGER NOT NULL DEFAULT 0,
+    updated_at REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS ix_scheduled_jobs_run_at ON scheduled_jobs (run_at);
+"""
+
+
+class TimerScheduler:
+    """Persistent priority-queue job scheduler
+
+    Jobs are kept in a heap ordered by fire time and the timer thread sleeps exactly
+    until the earliest one (or until a new, earlier job is scheduled). Every job is
+    stored in the ``scheduled_jobs`` table of ``ALERT_STATE_DB`` so pending reminders
+    and recurring jobs survive restarts. Handlers run on a small worker pool so a
+    long broadcast does not delay the next timer; failed jobs are retried with
+    backoff up to ``max_attempts`` times.
+    """
+
+    def __init__(self, db_path: str = None, workers: int = 4, max_attempts: int = 3,
+                 retry_delay: float = 300.0):
+        self.db_path = db_path or ALERT_STATE_DB
+        self.max_attempts = max_attempts
+        self.retry_delay = retry_delay
+        self._handlers: Dict[str, Callable[[Dict], None]] = {}
+        self._jobs: Dict[str, Dict] = {}
+        self._heap: List = []
+        self._seq = 0
+        self._cond = threading.Condition()
+        self._running = False
+        self._thread: Optional[threading.Thread] = None
+        self._workers = workers
+        self._executor: Optional[ThreadPoolExecutor] = None
+        self._local = threading.local()
+        self.metrics = {'fired': 0, 'failed': 0, 'retried': 0}
+
+    def _conn(self) -> sqlite3.Connection:
+        conn = getattr(self._local, 'conn', None)
+        if conn is None:
+            conn = sqlite3.connect(self.db_path, timeout=30, isolation_level=None)
+            conn.row_factory = sqlite3.Row
+            conn.execute('PRAGMA journal_mode=WAL')
+            conn.executescript(SCHEMA)
+            self._local.conn = conn
+        return conn
+
+    def register(self, job_type: str, handler: Callable[[Dict], None]):
+        self._handlers[job_type] = handler
+
+    def schedule(self, job_id: str, job_type: str, run_at: float, payload: Dict = None,
+                 interval: float = None, replace: bool = True) -> bool:
+        """Add or move a job; with ``replace=False`` an existing job keeps its fire time"""
+        with self._cond:
+            if not replace and job_id in self._jobs:
+                return False
+            job = {
+                'job_id': job_id,
+                'job_type': job_type,
+                'run_at': float(run_at),
+                'interval': interval,
+                'payload': payload or {},
+                'attempts': 0
+            }
+            self._persist(job)
+            self._push(job)
+            self._cond.notify()
+            return True
+
+    def cancel(self, job_id: str):
+        with self._cond:
+            self._jobs.pop(job_id, None)
+            self._conn().execute('DELETE FROM scheduled_jobs WHERE job_id = ?', (job_id,))
+            self._cond.notify()
+
+    def has_job(self, job_id: str) -> bool:
+        with self._cond:
+            return job_id in self._jobs
+
+    def _push(self, job: Dict):
+        self._jobs[job['job_id']] = job
+        self._seq += 1
+        # Superseded heap entries are skipped lazily when popped
+        heapq.heappush(self._heap, (job['run_at'], self._seq, job['job_id'], job))
+
+    def _persist(self, job: Dict):
+        self._conn().execute(
+            'INSERT OR REPLACE INTO scheduled_jobs (job_id, job_type, run_at, interval_seconds, payload, '
+            'attempts, updated_at) VALUES (?, ?, ?, ?, ?, ?, ?)',
+            (job['job_id'], job['job_type'], job['run_at'], job['interval'],
+             json.dumps(job['payload'], default=str), job['attempts'], time.time()))
+
+    def _load(self):
+        rows = self._conn().execute('SELECT * FROM scheduled_jobs').fetchall()
+        with self._cond:
+            for row in rows:
+                self._push({
+                    'job_id': row['job_id'],
+                    'job_type': row['job_type'],
+                    'run_at': row['run_at'],
+                    'interval': row['interval_seconds'],
+                    'payload': json.loads(row['payload'] or '{}'),
+                    'attempts': row['attempts']
+                })
+        if rows:
+            print(f"📅 Restored {len(rows)} scheduled jobs")
+
+    def start(self):
+        if self._running:
+            return
+        self._load()
+        self._running = True
+        self._executor = ThreadPoolExecutor(max_workers=self._workers, thread_name_prefix='timer-job')
+        self._thread = threading.Thread(target=self._timer_loop, name='timer-scheduler', daemon=True)
+        self._thread.start()
+
+    def stop(self, timeout: float = 5):
+        with self._cond:
+            self._running = False
+            self._cond.notify()
+        if self._thread:
+            self._thread.join(timeout=timeout)
+        if self._executor:
+            self._executor.shutdown(wait=False)
+
+    def _timer_loop(self):
+        while True:
+            with self._cond:
+                job = None
+                while self._running:
+                    if not self._heap:
+                        self._cond.wait()
+                        continue
+                    run_at, _, job_id, candidate = self._heap[0]
+                    if self._jobs.get(job_id) is not candidate:
+                        heapq.heappop(self._heap)
+                        continue
+                    delay = run_at - time.time()
+                    if delay > 0:
+                        self._cond.wait(timeout=delay)
+                        continue
+                    heapq.heappop(self._heap)
+                    job = candidate
+                    self._advance(job)
+                    break
+                if not self._running:
+                    return
+            self._executor.submit(self._run, job)
+
+    def _advance(self, job: Dict):
+        # Called with the lock held: recurring jobs move to their next slot before running
+        if job['interval']:
+            next_job = dict(job, attempts=0)
+            next_job['run_at'] = job['run_at'] + job['interval']
+            now = time.time()
+            if next_job['run_at'] <= now:
+                missed = (now - job['run_at']) // job['interval'] + 1
+                next_job['run_at'] = job['run_at'] + missed * job['interval']
+            self._persist(next_job)
+            self._push(next_job)
+        else:
+            del self._jobs[job['job_id']]
+
+    def _run(self, job: Dict):
+        handler = self._handlers.get(job['job_type'])
+        try:
+            if handler is None:
+                raise RuntimeError(f"No handler registered for {job['job_type']}")
+            handler(job['payload'])
+            self.metrics['fired'] += 1
+            if not job['interval']:
+                with self._cond:
+                    if job['job_id'] not in self._jobs:
+                        self._conn().execute('DELETE FROM scheduled_jobs WHERE job_id = ?', (job['job_id'],))
+        except Exception as e:
+            self.metrics['failed'] += 1
+            logging.error(f"Scheduled job {job['job_id']} failed: {e}")
+            if not job['interval'] and job['attempts'] + 1 < self.max_attempts:
+                self.metrics['retried'] += 1
+                retry = dict(job, attempts=job['attempts'] + 1,
+                             run_at=time.time() + self.retry_delay * (2 ** job['attempts']))
+                with self._cond:
+                    if job['job_id'] not in self._jobs:
+                        self._persist(retry)
+                        self._push(retry)
+                        self._cond.notify()
+            elif not job['interval']:
+                with self._cond:
+                    if job['job_id'] not in self._jobs:
+                        self._conn().execute('DELETE FROM scheduled_jobs WHERE job_id = ?', (job['job_id'],))
+
+    def get_stats(self) -> Dict:
+        with self._cond:
+            upcoming = heapq.nsmallest(5, self._jobs.values(), key=lambda j: j['run_at'])
+            return {
+                'running': self._running,
+                'pending_jobs': len(self._jobs),
+                'next_jobs': [
+                    {'job_id': j['job_id'], 'job_type': j['job_type'],
+                     'run_at': datetime.fromtimestamp(j['run_at']).isoformat()}
+                    for j in upcoming
+                ],
+                'counters': dict(self.metrics)
+            }
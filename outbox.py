@@ -0,0 +1,309 @@
+import os
+import time
+import uuid
+import random
+import sqlite3
+import logging
+import threading
+from typing import Dict, Iterable, List, Tuple
+
+from alert_fanout import FanoutEngine
+
+ALERT_STATE_DB = os.environ.get('ALERT_STATE_DB', 'alert_state.db')
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS outbox (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    channel TEXT NOT NULL,
+    to_number TEXT NOT NULL,
+    body TEXT NOT NULL,
+    media_url TEXT,
+    status TEXT NOT NULL DEFAULT 'pending',
+    attempts INTEGER NOT NULL DEFAULT 0,
+    next_attempt_at REAL NOT NULL,
+    claim_token TEXT,
+    claimed_at REAL,
+    last_error TEXT,
+    message_sid TEXT,
+    created_at REAL NOT NULL,
+    updated_at REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS ix_outbox_ready ON outbox (status, next_attempt_at);
+CREATE INDEX IF NOT EXISTS ix_outbox_claim ON outbox (claim_token);
+CREATE INDEX IF NOT EXISTS ix_outbox_updated ON outbox (status, updated_at);
+"""
+
+
+class MessageOutbox:
+    """Durable queue for outbound WhatsApp/SMS messages
+
+    Producers insert rows into a SQLite table (shared by every process that points
+    at the same ``ALERT_STATE_DB``); dispatcher threads claim ready rows in batches,
+    send each batch concurrently through a ``FanoutEngine`` (so the per-channel
+    token buckets of direct fan-out apply, and are shared when the same engine is
+    passed in) and record the outcome. Failures are retried with exponential backoff and jitter,
+    and rows that exhaust ``max_attempts`` are moved to ``dead`` for inspection.
+    Claims left behind by a crashed process become ready again after
+    ``visibility_timeout`` seconds.
+
+    Delivery is at-least-once. The row id is the idempotency key: right before the
+    provider call a worker re-checks its claim token and restarts the row's
+    visibility window, and the message SID is written to the row as soon as the
+    provider accepts it. A reclaimed row that already has a SID is marked sent
+    instead of being sent again, and outcome updates only apply while the claim
+    token still matches, so a slow worker cannot overwrite a newer claimant's
+    result. A message can still go out twice if a process dies between the
+    provider accepting it and the SID being written.
+    """
+
+    def __init__(self, db_path: str = None, whatsapp_handler=None, sms_handler=None,
+                 workers: int = None, batch_size: int = 50, max_attempts: int = None,
+                 base_delay: float = 2.0, max_delay: float = 600.0,
+                 visibility_timeout: float = 300.0, rate_limits: Dict[str, float] = None,
+                 fanout_engine: FanoutEngine = None):
+        self.db_path = db_path or ALERT_STATE_DB
+        self.whatsapp_handler = whatsapp_handler
+        self.sms_handler = sms_handler
+        self.workers = workers or int(os.environ.get('OUTBOX_WORKERS', '4'))
+        self.batch_size = batch_size
+        self.max_attempts = max_attempts or int(os.environ.get('OUTBOX_MAX_ATTEMPTS', '6'))
+        self.base_delay = base_delay
+        self.max_delay = max_delay
+        self.visibility_timeout = visibility_timeout
+        self.retention_seconds = float(os.environ.get('OUTBOX_RETENTION_HOURS', '24')) * 3600
+
+        self.fanout_engine = fanout_engine or FanoutEngine(rate_limits=rate_limits)
+
+        self._local = threading.local()
+        self._schema_ready = False
+        self._schema_lock = threading.Lock()
+        self._threads: List[threading.Thread] = []
+        self._running = False
+        self._wakeup = threading.Event()
+        self._counters = {'enqueued': 0, 'sent': 0, 'retried': 0, 'dead_lettered': 0}
+        self._counter_lock = threading.Lock()
+
+    # -- storage -------------------------------------------------------------
+
+    def _conn(self) -> sqlite3.Connection:
+        conn = getattr(self._local, 'conn', None)
+        if conn is None:
+            conn = sqlite3.connect(self.db_path, timeout=30, isolation_level=None)
+            conn.row_factory = sqlite3.Row
+            conn.execute('PRAGMA journal_mode=WAL')
+            conn.execute('PRAGMA synchronous=NORMAL')
+            self._local.conn = conn
+        if not self._schema_ready:
+            with self._schema_lock:
+                if not self._schema_ready:
+                    conn.executescript(SCHEMA)
+                    self._schema_ready = True
+        return conn
+
+    def enqueue(self, channel: str, to_number: str, body: str, media_url: str = None) -> int:
+        return self.enqueue_many([(channel, to_number, body, media_url)])[0]
+
+    def enqueue_many(self, messages: Iterable[Tuple]) -> List[int]:
+        """Insert (channel, to_number, body[, media_url]) rows in one transaction"""
+        now = time.time()
+        rows = [(m[0], m[1], m[2], m[3] if len(m) > 3 else None, now, now, now) for m in messages]
+        if not rows:
+            return []
+        conn = self._conn()
+        conn.execute('BEGIN IMMEDIATE')
+        try:
+            # AUTOINCREMENT ids continue from sqlite_sequence, even after purges
+            seq = conn.execute("SELECT seq FROM sqlite_sequence WHERE name = 'outbox'").fetchone()
+            start = seq[0] if seq else 0
+            conn.executemany(
+                'INSERT INTO outbox (channel, to_number, body, media_url, next_attempt_at, created_at, updated_at) '
+                'VALUES (?, ?, ?, ?, ?, ?, ?)', rows)
+            conn.execute('COMMIT')
+        except Exception:
+            conn.execute('ROLLBACK')
+            raise
+        with self._counter_lock:
+            self._counters['enqueued'] += len(rows)
+        self._wakeup.set()
+        return list(range(start + 1, start + 1 + len(rows)))
+
+    def _claim_batch(self) -> List[sqlite3.Row]:
+        now = time.time()
+        token = uuid.uuid4().hex
+        conn = self._conn()
+        conn.execute('BEGIN IMMEDIATE')
+        try:
+            # Expired claims whose send already reached the provider only need closing
+            conn.execute(
+                "UPDATE outbox SET status = 'sent', claim_token = NULL, updated_at = ? "
+                "WHERE status = 'inflight' AND claimed_at < ? AND message_sid IS NOT NULL",
+                (now, now - self.visibility_timeout))
+            conn.execute(
+                "UPDATE outbox SET status = 'inflight', claim_token = ?, claimed_at = ?, updated_at = ? "
+                "WHERE id IN (SELECT id FROM outbox WHERE "
+                "(status = 'pending' AND next_attempt_at <= ?) OR (status = 'inflight' AND claimed_at < ?) "
+                "ORDER BY next_attempt_at LIMIT ?)",
+                (token, now, now, now, now - self.visibility_timeout, self.batch_size))
+            conn.execute('COMMIT')
+        except Exception:
+            conn.execute('ROLLBACK')
+            raise
+        return conn.execute('SELECT * FROM outbox WHERE claim_token = ?', (token,)).fetchall()
+
+    def _record_outcomes(self, outcomes: List[Tuple[sqlite3.Row, Dict]]):
+        now = time.time()
+        sent, retry, dead = [], [], []
+        for row, result in outcomes:
+            if result.get('claim_lost'):
+                continue
+            if result.get('success'):
+                sent.append((result.get('message_sid'), now, row['id'], row['claim_token']))
+                continue
+            attempts = row['attempts'] + 1
+            error = str(result.get('error', 'unknown error'))[:500]
+            if attempts >= self.max_attempts:
+                dead.append((attempts, error, now, row['id'], row['claim_token']))
+            else:
+                retry.append((attempts, now + self._backoff(attempts), error, now, row['id'], row['claim_token']))
+
+        # Rows reclaimed by another dispatcher no longer carry our token and are left alone
+        conn = self._conn()
+        conn.execute('BEGIN IMMEDIATE')
+        try:
+            sent_count = conn.executemany(
+                "UPDATE outbox SET status = 'sent', message_sid = ?, claim_token = NULL, "
+                "updated_at = ? WHERE id = ? AND claim_token = ?", sent).rowcount
+            retry_count = conn.executemany(
+                "UPDATE outbox SET status = 'pending', attempts = ?, next_attempt_at = ?, "
+                "last_error = ?, claim_token = NULL, updated_at = ? WHERE id = ? AND claim_token = ?", retry).rowcount
+            dead_count = conn.executemany(
+                "UPDATE outbox SET status = 'dead', attempts = ?, last_error = ?, "
+                "claim_token = NULL, updated_at = ? WHERE id = ? AND claim_token = ?", dead).rowcount
+            conn.execute('COMMIT')
+        except Exception:
+            conn.execute('ROLLBACK')
+            raise
+
+        with self._counter_lock:
+            self._counters['sent'] += max(sent_count, 0)
+            self._counters['retried'] += max(retry_count, 0)
+            self._counters['dead_lettered'] += max(dead_count, 0)
+        for row in dead:
+            logging.error(f"Outbox message {row[3]} dead-lettered after {row[0]} attempts: {row[1]}")
+
+    def _backoff(self, attempts: int) -> float:
+        delay = min(self.max_delay, self.base_delay * (2 ** (attempts - 1)))
+        return delay * (0.5 + random.random())
+
+    def purge_sent(self) -> int:
+        cutoff = time.time() - self.retention_seconds
+        cursor = self._conn().execute("DELETE FROM outbox WHERE status = 'sent' AND updated_at < ?", (cutoff,))
+        return cursor.rowcount
+
+    def requeue_dead(self, ids: List[int] = None) -> int:
+        """Move dead-lettered rows back to pending (all of them when ``ids`` is None)"""
+        query = "UPDATE outbox SET status = 'pending', attempts = 0, next_attempt_at = ? WHERE status = 'dead'"
+        params = [time.time()]
+        if ids:
+            query += f" AND id IN ({','.join('?' * len(ids))})"
+            params.extend(ids)
+        cursor = self._conn().execute(query, params)
+        self._wakeup.set()
+        return cursor.rowcount
+
+    # -- dispatch ------------------------------------------------------------
+
+    def _send(self, row: sqlite3.Row) -> Dict:
+        conn = self._conn()
+        # Confirm the claim is still ours and restart its visibility window just before sending
+        fenced = conn.execute(
+            "UPDATE outbox SET claimed_at = ? WHERE id = ? AND claim_token = ? AND message_sid IS NULL",
+            (time.time(), row['id'], row['claim_token'])).rowcount
+        if not fenced:
+            current = conn.execute('SELECT claim_token, message_sid FROM outbox WHERE id = ?', (row['id'],)).fetchone()
+            if current and current['claim_token'] == row['claim_token']:
+                # An earlier claimant delivered it after we reclaimed the row; just close it out
+                return {"success": True, "message_sid": current['message_sid']}
+            return {"claim_lost": True}
+        channel = row['channel']
+        if channel == 'whatsapp' and self.whatsapp_handler:
+            result = self.whatsapp_handler.send_message(row['to_number'], row['body'], row['media_url'])
+        elif channel == 'sms' and self.sms_handler:
+            result = self.sms_handler.send_sms(row['to_number'], row['body'])
+        else:
+            return {"error": f"No handler configured for channel {channel}"}
+        if result.get('success'):
+            # Recorded straight away so a reclaim of this row does not send it again
+            conn.execute("UPDATE outbox SET message_sid = ? WHERE id = ?",
+                         (result.get('message_sid') or f"outbox-{row['id']}", row['id']))
+        return result
+
+    def drain_once(self) -> int:
+        """Claim a batch and send it on the fan-out pool; returns the number of rows processed"""
+        rows = self._claim_batch()
+        if rows:
+            tasks = ((row['to_number'], [(row['channel'], self._send, (row,))]) for row in rows)
+            results, _ = self.fanout_engine.run(tasks, total=len(rows))
+            self._record_outcomes([(row, result.get(row['channel'], result)) for row, result in zip(rows, results)])
+        return len(rows)
+
+    def _worker_loop(self):
+        last_purge = time.time()
+        while self._running:
+            try:
+                if self.drain_once() == 0:
+                    self._wakeup.wait(timeout=1.0)
+                    self._wakeup.clear()
+                if time.time() - last_purge > 600:
+                    self.purge_sent()
+                    last_purge = time.time()
+            except Exception as e:
+                print(f"❌ Outbox dispatcher error: {e}")
+                time.sleep(1)
+
+    def start(self):
+        if self._running:
+            return
+        self._running = True
+        self._threads = [
+            threading.Thread(target=self._worker_loop, name=f"outbox-dispatcher-{i}", daemon=True)
+            for i in range(self.workers)
+        ]
+        for thread in self._threads:
+            thread.start()
+        print(f"✅ Outbox dispatcher started with {self.workers} workers")
+
+    def stop(self):
+        self._running = False
+        self._wakeup.set()
+        for thread in self._threads:
+            thread.join(timeout=5)
+        self._threads = []
+
+    # -- metrics -------------------------------------------------------------
+
+    def get_stats(self) -> Dict:
+        """Queue depth and drain rate across every process sharing the outbox"""
+        now = time.time()
+        conn = self._conn()
+        counts = dict(conn.execute('SELECT status, COUNT(*) FROM outbox GROUP BY status').fetchall())
+        oldest = conn.execute(
+            "SELECT MIN(created_at) FROM outbox WHERE status IN ('pending', 'inflight')").fetchone()[0]
+        recent = conn.execute("SELECT COUNT(*) FROM outbox WHERE status = 'sent' AND updated_at >= ?",
+                              (now - 60,)).fetchone()[0]
+        with self._counter_lock:
+            counters = dict(self._counters)
+        return {
+            'depth': counts.get('pending', 0),
+            'inflight': counts.get('inflight', 0),
+            'dead': counts.get('dead', 0),
+            'sent_retained': counts.get('sent', 0),
+            'oldest_pending_age_seconds': round(now - oldest, 1) if oldest else None,
+            'drain_rate_per_second': round(recent / 60.0, 2),
+            'dispatcher_running': self._running,
+            'counters': counters
+        }
+
+
+def outbox_enabled() -> bool:
+    return os.environ.get('ALERT_OUTBOX_ENABLED', 'false').lower() in ['true', 'on', '1']
@@ -0,0 +1,203 @@
+import os
+import csv
+import math
+import logging
+import threading
+from typing import Dict, Iterable, List, Optional, Tuple
+
+EARTH_RADIUS_KM = 6371.0
+
+# Head-post-office coordinates for major cities; load the full India Post
+# directory with PINCODE_COORDINATES_PATH (CSV with pincode, latitude, longitude)
+SEED_PINCODE_COORDINATES = {
+    '110001': (28.6328, 77.2197),  # New Delhi
+    '400001': (18.9388, 72.8354),  # Mumbai
+    '560001': (12.9716, 77.5946),  # Bengaluru
+    '600001': (13.0878, 80.2785),  # Chennai
+    '700001': (22.5726, 88.3639),  # Kolkata
+    '500001': (17.3850, 78.4867),  # Hyderabad
+    '411001': (18.5204, 73.8567),  # Pune
+    '380001': (23.0225, 72.5714),  # Ahmedabad
+    '302001': (26.9124, 75.7873),  # Jaipur
+    '226001': (26.8467, 80.9462),  # Lucknow
+    '800001': (25.5941, 85.1376),  # Patna
+    '682001': (9.9312, 76.2673),   # Kochi
+    '160017': (30.7333, 76.7794),  # Chandigarh
+    '751001': (20.2961, 85.8245),  # Bhubaneswar
+    '781001': (26.1445, 91.7362),  # Guwahati
+    '462001': (23.2599, 77.4126),  # Bhopal
+}
+
+
+def haversine_km(lat1: float, lon1: float, lat2: float, lon2: float) -> float:
+    phi1, phi2 = math.radians(lat1), math.radians(lat2)
+    dphi = phi2 - phi1
+    dlambda = math.radians(lon2 - lon1)
+    a = math.sin(dphi / 2) ** 2 + math.cos(phi1) * math.cos(phi2) * math.sin(dlambda / 2) ** 2
+    return 2 * EARTH_RADIUS_KM * math.asin(math.sqrt(a))
+
+
+class PincodeCoordinates:
+    """Pincode -> (lat, lon) table
+
+    Unknown pincodes resolve to the centroid of known pincodes sharing the longest
+    prefix (the first three digits identify the sorting district), so a lookup
+    still lands in the right area when only part of the directory is loaded.
+    """
+
+    def __init__(self, coordinates: Dict[str, Tuple[float, float]] = None):
+        self._coordinates: Dict[str, Tuple[float, float]] = dict(coordinates or {})
+        self._prefix_centroids: Dict[str, Tuple[float, float]] = {}
+        self._rebuild_prefixes()
+
+    @classmethod
+    def load(cls, path: str = None) -> 'PincodeCoordinates':
+        table = cls(SEED_PINCODE_COORDINATES)
+        path = path or os.environ.get('PINCODE_COORDINATES_PATH')
+        if path:
+            table.load_csv(path)
+        return table
+
+    def load_csv(self, path: str) -> int:
+        loaded = 0
+        try:
+            with open(path, newline='', encoding='utf-8') as f:
+                for row in csv.DictReader(f):
+                    row = {k.strip().lower(): v for k, v in row.items() if k}
+                    try:
+                        pincode = str(row['pincode']).strip()
+                        lat = float(row.get('latitude') or row.get('lat'))
+                        lon = float(row.get('longitude') or row.get('lon') or row.get('long'))
+                    except (KeyError, TypeError, ValueError):
+                        continue
+                    self._coordinates[pincode] = (lat, lon)
+                    loaded += 1
+        except OSError as e:
+            logging.warning(f"Pincode coordinates not loaded from {path}: {e}")
+        self._rebuild_prefixes()
+        print(f"📍 Loaded {loaded} pincode coordinates")
+        return loaded
+
+    def _rebuild_prefixes(self):
+        sums: Dict[str, List[float]] = {}
+        for pincode, (lat, lon) in self._coordinates.items():
+            for length in (2, 3, 4, 5):
+                total = sums.setdefault(pincode[:length], [0.0, 0.0, 0])
+                total[0] += lat
+                total[1] += lon
+                total[2] += 1
+        self._prefix_centroids = {prefix: (t[0] / t[2], t[1] / t[2]) for prefix, t in sums.items()}
+
+    def lookup(self, pincode: str) -> Optional[Tuple[float, float]]:
+        pincode = str(pincode or '').strip()
+        if pincode in self._coordinates:
+            return self._coordinates[pincode]
+        for length in (5, 4, 3, 2):
+            centroid = self._prefix_centroids.get(pincode[:length])
+            if centroid:
+                return centroid
+        return None
+
+    def __len__(self) -> int:
+        return len(self._coordinates)
+
+
+class CenterSpatialIndex:
+    """Grid index over vaccination centers for nearest-with-capacity queries
+
+    Centers are bucketed into ``cell_degrees`` lat/lon cells. A query scans rings
+    of cells outwards from the origin and stops once the next ring cannot hold a
+    closer center than the k-th found, so cost depends on local density rather
+    than the total number of centers. Centers are upserted per source pincode:
+    refreshing a pincode's listing replaces the centers it previously supplied.
+    """
+
+    def __init__(self, cell_degrees: float = 0.1):
+        self.cell_degrees = cell_degrees
+        self._cells: Dict[Tuple[int, int], Dict[str, Dict]] = {}
+        self._centers: Dict[str, Dict] = {}
+        self._by_source: Dict[str, set] = {}
+        self._lock = threading.RLock()
+
+    def _cell(self, lat: float, lon: float) -> Tuple[int, int]:
+        return int(math.floor(lat / self.cell_degrees)), int(math.floor(lon / self.cell_degrees))
+
+    def upsert(self, center_id: str, lat: float, lon: float, available_capacity: int, data: Dict,
+               source: str = None):
+        center_id = str(center_id)
+        with self._lock:
+            self._remove(center_id)
+            entry = {'center_id': center_id, 'lat': lat, 'lon': lon,
+                     'available_capacity': available_capacity, 'data': data, 'source': source}
+            self._centers[center_id] = entry
+            self._cells.setdefault(self._cell(lat, lon), {})[center_id] = entry
+            if source:
+                self._by_source.setdefault(source, set()).add(center_id)
+
+    def _remove(self, center_id: str):
+        entry = self._centers.pop(center_id, None)
+        if entry is None:
+            return
+        cell = self._cell(entry['lat'], entry['lon'])
+        bucket = self._cells.get(cell)
+        if bucket is not None:
+            bucket.pop(center_id, None)
+            if not bucket:
+                del self._cells[cell]
+        if entry['source'] in self._by_source:
+            self._by_source[entry['source']].discard(center_id)
+
+    def replace_source(self, source: str, centers: Iterable[Tuple[str, float, float, int, Dict]]):
+        """Replace every center previously indexed from ``source`` (e.g. a pincode listing)"""
+        with self._lock:
+            for center_id in list(self._by_source.get(source, ())):
+                self._remove(center_id)
+            for center_id, lat, lon, capacity, data in centers:
+                self.upsert(center_id, lat, lon, capacity, data, source=source)
+
+    def nearest(self, lat: float, lon: float, k: int = 5, min_capacity: int = 1,
+                max_km: float = 50.0) -> List[Tuple[float, Dict]]:
+        """Up to ``k`` (distance_km, entry) pairs within ``max_km`` having ``min_capacity`` doses"""
+        if k < 1:
+            return []
+        origin = self._cell(lat, lon)
+        # A cell is at least this many km wide (longitude cells shrink towards the poles)
+        cell_km = self.cell_degrees * 111.0 * max(math.cos(math.radians(min(abs(lat), 89.0))), 0.01)
+        max_ring = int(math.ceil(max_km / cell_km)) + 1
+        found: List[Tuple[float, Dict]] = []
+        with self._lock:
+            for ring in range(max_ring + 1):
+                for cell in self._ring_cells(origin, ring):
+                    for entry in self._cells.get(cell, {}).values():
+                        if entry['available_capacity'] < min_capacity:
+                            continue
+                        distance = haversine_km(lat, lon, entry['lat'], entry['lon'])
+                        if distance <= max_km:
+                            found.append((distance, entry))
+                if len(found) >= k:
+                    found.sort(key=lambda item: item[0])
+                    # Anything in ring + 1 is at least ring * cell_km away
+                    if found[k - 1][0] <= ring * cell_km:
+                        break
+        found.sort(key=lambda item: item[0])
+        return found[:k]
+
+    @staticmethod
+    def _ring_cells(origin: Tuple[int, int], ring: int):
+        row, col = origin
+        if ring == 0:
+            yield origin
+            return
+        for dc in range(-ring, ring + 1):
+            yield row - ring, col + dc
+            yield row + ring, col + dc
+        for dr in range(-ring + 1, ring):
+            yield row + dr, col - ring
+            yield row + dr, col + ring
+
+    def __len__(self) -> int:
+        return len(self._centers)
+
+    def get_stats(self) -> Dict:
+        with self._lock:
+            return {'centers': len(self._centers), 'cells': len(self._cells), 'sources': len(self._by_source)}
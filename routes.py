@@ -5,13 +5,12 @@ from flask import render_template, url_for, flash, redirect, request, abort
 from Chatbot import app, db, bcrypt, mail
 from Chatbot.forms import (RegistrationForm, LoginForm)
 from Chatbot.models import User
+from Chatbot.conversations import record_turn, get_transcript_page
 from flask_login import login_user, current_user, logout_user, login_required
 from flask_mail import Message
 from datetime import datetime
 import main
 
-arr = [0]
-
 # @app.route("/")
 # @app.route("/home")
 # def home():
@@ -67,17 +66,12 @@ def logout():
 @app.route('/chatbot',methods=['GET'])
 @login_required
 def bot():
-    length=len(arr)
     message=request.args.get('msg')
     if message!=None:
-        arr.append(message)
-        arr.append(1)
         response = main.callthis(message)
-        arr.append(response)
-        arr.append(0)
-    length=len(arr)
-    print(arr)
-    return render_template('bot.html',arr=arr,length=length)
+        record_turn(current_user, message, response)
+    transcript = get_transcript_page(current_user, request.args.get('page', type=int))
+    return render_template('bot.html', **transcript)
 
 def send_reset_email(user):
     token = user.get_reset_token()
@@ -0,0 +1,39 @@
+import os
+import logging
+import threading
+
+try:
+    import redis
+    REDIS_AVAILABLE = True
+except ImportError:
+    REDIS_AVAILABLE = False
+
+_client = None
+_checked = False
+_lock = threading.Lock()
+
+
+def get_redis_client():
+    """Return a process-wide Redis client for REDIS_URL, or None when Redis is unavailable
+
+    The connection is probed once; callers fall back to in-process state when this
+    returns None, the same way the app factories treat ``app.redis``.
+    """
+    global _client, _checked
+    if _checked:
+        return _client
+    with _lock:
+        if _checked:
+            return _client
+        url = os.environ.get('REDIS_URL')
+        if REDIS_AVAILABLE and url:
+            try:
+                client = redis.from_url(url, socket_timeout=2, socket_connect_timeout=2)
+                client.ping()
+                _client = client
+                print("✅ Shared Redis connected")
+            except Exception as e:
+                logging.warning(f"Redis not available, using in-process state: {e}")
+                _client = None
+        _checked = True
+        return _client
@@ -0,0 +1,236 @@
+import re
+import threading
+from typing import Dict, Iterable, List, Optional, Set, Tuple, Union
+
+# Age bands used for targeting; HealthAlert.target_age_group values such as
+# "18-44", "45+" or "60+" resolve to the union of the bands they overlap
+AGE_BANDS = [(0, 17, '0-17'), (18, 44, '18-44'), (45, 59, '45-59'), (60, 150, '60+')]
+
+DEFAULT_PREFERENCES = ('vaccination_reminders', 'disease_outbreaks', 'health_advisories')
+
+
+def age_band(age: Optional[int]) -> Optional[str]:
+    if age is None:
+        return None
+    for low, high, label in AGE_BANDS:
+        if low <= age <= high:
+            return label
+    return None
+
+
+def bands_for_age_group(age_group: str) -> List[str]:
+    """Map "18-44", "45+", "60" or "all" onto the overlapping AGE_BANDS labels"""
+    text = (age_group or '').strip().lower()
+    if not text or text in ('all', 'any'):
+        return [label for _, _, label in AGE_BANDS]
+    match = re.fullmatch(r'(\d+)\s*(?:-\s*(\d+)|(\+))?', text)
+    if not match:
+        return []
+    low = int(match.group(1))
+    if match.group(2):
+        high = int(match.group(2))
+    elif match.group(3):
+        high = 150
+    else:
+        high = low
+    return [label for band_low, band_high, label in AGE_BANDS if band_low <= high and low <= band_high]
+
+
+class SubscriberSegmentIndex:
+    """In-memory bitmap index over subscribers for targeted broadcasts
+
+    Every subscriber gets a dense integer ID; each segment (language, enabled
+    preference, state, district, pincode, age band) is a set of those IDs. Sparse
+    segments such as a single pincode stay as Python sets and are promoted to a
+    ``bytearray`` bitmap once they are large and cover more than 1/``DENSE_RATIO``
+    of the ID space. A targeting query ANDs the per-dimension bitmaps (ORing the values
+    within a dimension) using Python big-int bitwise operations, so composite
+    queries over millions of subscribers cost a few large-integer ops plus
+    decoding the matching IDs.
+    """
+
+    DENSE_RATIO = 64
+    MIN_DENSE_SIZE = 1024
+
+    def __init__(self):
+        self._ids: Dict[str, int] = {}
+        self._phones: List[Optional[str]] = []
+        self._free_ids: List[int] = []
+        self._segments: Dict[Tuple[str, str], Union[Set[int], bytearray]] = {}
+        self._memberships: Dict[int, List[Tuple[str, str]]] = {}
+        self._lock = threading.RLock()
+
+    @staticmethod
+    def _normalize(value) -> str:
+        return str(value).strip().lower()
+
+    @staticmethod
+    def _set_bit(bitmap: bytearray, subscriber_id: int):
+        byte_index = subscriber_id >> 3
+        if byte_index >= len(bitmap):
+            bitmap.extend(bytes(byte_index - len(bitmap) + 1 + len(bitmap) // 2))
+        bitmap[byte_index] |= 1 << (subscriber_id & 7)
+
+    def _add_member(self, key: Tuple[str, str], subscriber_id: int):
+        segment = self._segments.get(key)
+        if segment is None:
+            segment = self._segments[key] = set()
+        if isinstance(segment, set):
+            segment.add(subscriber_id)
+            if len(segment) >= self.MIN_DENSE_SIZE and len(segment) * self.DENSE_RATIO > len(self._phones):
+                bitmap = bytearray()
+                for member in segment:
+                    self._set_bit(bitmap, member)
+                self._segments[key] = bitmap
+        else:
+            self._set_bit(segment, subscriber_id)
+
+    def _remove_member(self, key: Tuple[str, str], subscriber_id: int):
+        segment = self._segments.get(key)
+        if isinstance(segment, set):
+            segment.discard(subscriber_id)
+        elif segment is not None and (subscriber_id >> 3) < len(segment):
+            segment[subscriber_id >> 3] &= ~(1 << (subscriber_id & 7)) & 0xFF
+
+    def add(self, phone_number: str, language: str = 'en', preferences: Dict = None,
+            state: str = None, district: str = None, pincode: str = None, age: int = None):
+        """Insert or re-index a subscriber"""
+        preferences = preferences or {}
+        keys = [('all', ''), ('language', self._normalize(language or 'en'))]
+        for name in set(DEFAULT_PREFERENCES) | set(preferences):
+            if preferences.get(name, True):
+                keys.append(('pref', name))
+        if state:
+            keys.append(('state', self._normalize(state)))
+        if district:
+            keys.append(('district', self._normalize(district)))
+        if pincode:
+            keys.append(('pincode', self._normalize(pincode)))
+        band = age_band(age)
+        if band:
+            keys.append(('age', band))
+
+        with self._lock:
+            if phone_number in self._ids:
+                self.remove(phone_number)
+            if self._free_ids:
+                subscriber_id = self._free_ids.pop()
+                self._phones[subscriber_id] = phone_number
+            else:
+                subscriber_id = len(self._phones)
+                self._phones.append(phone_number)
+            self._ids[phone_number] = subscriber_id
+            self._memberships[subscriber_id] = keys
+            for key in keys:
+                self._add_member(key, subscriber_id)
+
+    def remove(self, phone_number: str):
+        with self._lock:
+            subscriber_id = self._ids.pop(phone_number, None)
+            if subscriber_id is None:
+                return
+            for key in self._memberships.pop(subscriber_id, []):
+                self._remove_member(key, subscriber_id)
+            self._phones[subscriber_id] = None
+            self._free_ids.append(subscriber_id)
+
+    def _bitmap_int(self, key: Tuple[str, str]) -> int:
+        segment = self._segments.get(key)
+        if not segment:
+            return 0
+        if isinstance(segment, set):
+            bitmap = bytearray((max(segment) >> 3) + 1)
+            for member in segment:
+                bitmap[member >> 3] |= 1 << (member & 7)
+            segment = bitmap
+        return int.from_bytes(segment, 'little')
+
+    def _union(self, keys: Iterable[Tuple[str, str]]) -> int:
+        result = 0
+        for key in keys:
+            result |= self._bitmap_int(key)
+        return result
+
+    def _match(self, language=None, preferences: Iterable[str] = None, state=None, district=None,
+               pincode=None, age_group: str = None, location: str = None) -> int:
+        result = self._bitmap_int(('all', ''))
+        if language:
+            languages = [language] if isinstance(language, str) else language
+            result &= self._union(('language', self._normalize(l)) for l in languages)
+        for name in preferences or ():
+            result &= self._bitmap_int(('pref', name))
+        if state:
+            result &= self._bitmap_int(('state', self._normalize(state)))
+        if district:
+            result &= self._bitmap_int(('district', self._normalize(district)))
+        if pincode:
+            result &= self._bitmap_int(('pincode', self._normalize(pincode)))
+        if location:
+            result &= self._location_bitmap(location)
+        if age_group:
+            result &= self._union(('age', band) for band in bands_for_age_group(age_group))
+        return result
+
+    def _location_bitmap(self, location: str) -> int:
+        """Resolve a free-form HealthAlert.target_location
+
+        Accepts a pincode, a state or district name, or several of them separated by
+        commas/slashes ("Maharashtra/Pune"); parts are ANDed, names within a part
+        match either a state or a district.
+        """
+        result = -1
+        for part in re.split(r'[,/]', location):
+            value = self._normalize(part)
+            if not value:
+                continue
+            if value.isdigit():
+                part_bitmap = self._bitmap_int(('pincode', value))
+            else:
+                part_bitmap = self._bitmap_int(('state', value)) | self._bitmap_int(('district', value))
+            result &= part_bitmap
+        return 0 if result == -1 else result
+
+    def _decode(self, bitmap: int) -> List[str]:
+        phones = []
+        if bitmap <= 0:
+            return phones
+        data = bitmap.to_bytes((bitmap.bit_length() + 7) // 8, 'little')
+        for byte_index, byte in enumerate(data):
+            if not byte:
+                continue
+            base = byte_index << 3
+            for bit in range(8):
+                if byte >> bit & 1:
+                    phones.append(self._phones[base + bit])
+        return phones
+
+    def query(self, **criteria) -> List[str]:
+        """Phones matching every given criterion (see ``_match`` for the keywords)"""
+        with self._lock:
+            return self._decode(self._match(**criteria))
+
+    def count(self, **criteria) -> int:
+        with self._lock:
+            return bin(self._match(**criteria)).count('1')
+
+    def languages(self) -> List[str]:
+        with self._lock:
+            return [value for (dimension, value), segment in self._segments.items()
+                    if dimension == 'language' and self._nonempty(segment)]
+
+    @staticmethod
+    def _nonempty(segment: Union[Set[int], bytearray]) -> bool:
+        # A set holding only ID 0 is falsy under any(); bitmaps are non-empty when any byte is set
+        return len(segment) > 0 if isinstance(segment, set) else any(segment)
+
+    def __len__(self) -> int:
+        return len(self._ids)
+
+    def get_stats(self) -> Dict:
+        with self._lock:
+            return {
+                'subscribers': len(self._ids),
+                'segments': len(self._segments),
+                'dense_segments': sum(1 for s in self._segments.values() if isinstance(s, bytearray)),
+                'bitmap_bytes': sum(len(s) for s in self._segments.values() if isinstance(s, bytearray))
+            }
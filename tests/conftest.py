@@ -0,0 +1,15 @@
+import os
+import sys
+import tempfile
+
+# Modules live at the repository root
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+# The health-data module builds a service on import; keep its files and Redis out of tests
+os.environ.setdefault('HEALTH_CACHE_SNAPSHOT', '')
+os.environ.setdefault('HEALTH_CACHE_SHARED', 'false')
+_scratch = tempfile.mkdtemp()
+os.environ.setdefault('HEALTH_ACCESS_LOG', os.path.join(_scratch, 'health_access.json'))
+# Route tests import the Flask app; give it a throwaway database and no warmup thread
+os.environ.setdefault('DATABASE_URL', 'sqlite:///' + os.path.join(_scratch, 'app.db'))
+os.environ.setdefault('HEALTH_WARMUP_ON_START', 'false')
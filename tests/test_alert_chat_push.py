@@ -0,0 +1,44 @@
+from alert_system import SimpleAlertScheduler
+from alert_fanout import FanoutEngine
+from job_scheduler import TimerScheduler
+
+
+class RecordingHandler:
+    def send_message(self, to_number, message, media_url=None):
+        return {'success': True, 'message_sid': 'SM1', 'status': 'queued'}
+
+    send_sms = send_message
+
+
+class PrefixTranslator:
+    def translate_healthcare_response(self, text, language, original=None):
+        return f'[{language}] {text}'
+
+
+def make_scheduler(tmp_path, notifier=None):
+    scheduler = SimpleAlertScheduler(
+        whatsapp_handler=RecordingHandler(), sms_handler=RecordingHandler(),
+        fanout_engine=FanoutEngine(max_workers=2, rate_limits={'whatsapp': 10000, 'sms': 10000}),
+        job_scheduler=TimerScheduler(db_path=str(tmp_path / 'state.db')), chat_notifier=notifier)
+    scheduler.translation_service = PrefixTranslator()
+    scheduler.subscribe_user('+911', 'en')
+    scheduler.subscribe_user('+912', 'hi')
+    scheduler.subscribe_user('+913', 'hi', preferences={'health_advisories': False})
+    return scheduler
+
+
+def test_chat_push_is_off_unless_opted_in(tmp_path, monkeypatch):
+    monkeypatch.delenv('ALERT_CHAT_PUSH', raising=False)
+    assert make_scheduler(tmp_path).chat_notifier is None
+
+
+def test_critical_advisory_reaches_only_targeted_subscribers_in_their_language(tmp_path):
+    pushed = []
+    scheduler = make_scheduler(tmp_path, lambda phone, alert: pushed.append((phone, alert)))
+
+    scheduler.send_health_advisory('Heatwave', 'Stay indoors', urgency='critical')
+
+    assert sorted(phone for phone, _ in pushed) == ['+911', '+912']
+    by_phone = dict(pushed)
+    assert by_phone['+911']['language'] == 'en' and by_phone['+911']['message'].startswith('🚨')
+    assert by_phone['+912']['language'] == 'hi' and by_phone['+912']['message'].startswith('[hi] ')
@@ -0,0 +1,80 @@
+import threading
+import time
+
+from alert_fanout import FanoutEngine
+from twilio_transport import FakeMessagingClient
+
+
+class ConcurrencyProbe:
+    """Wraps FakeMessagingClient sends and records how many ran at once"""
+
+    def __init__(self, client):
+        self.client = client
+        self.active = 0
+        self.peak = 0
+        self._lock = threading.Lock()
+
+    def send(self, phone, body):
+        with self._lock:
+            self.active += 1
+            self.peak = max(self.peak, self.active)
+        try:
+            message = self.client.messages.create(body=body, to=phone)
+            return {'success': True, 'sid': message.sid}
+        finally:
+            with self._lock:
+                self.active -= 1
+
+
+def tasks_for(probe, count, channel='whatsapp'):
+    return [(f'+91{i:010d}', [(channel, probe.send, (f'+91{i:010d}', 'Advisory'))]) for i in range(count)]
+
+
+def test_results_keep_submission_order_and_pool_bound():
+    probe = ConcurrencyProbe(FakeMessagingClient(latency=0.01, seed=1))
+    engine = FanoutEngine(max_workers=4, rate_limits={'whatsapp': 10000})
+
+    results, progress = engine.run(tasks_for(probe, 60), total=60)
+
+    assert [r['phone'] for r in results] == [f'+91{i:010d}' for i in range(60)]
+    assert all(r['whatsapp']['success'] for r in results)
+    assert probe.peak <= 4
+    assert progress.succeeded == 60
+
+
+def test_channel_rate_limit_is_honoured():
+    probe = ConcurrencyProbe(FakeMessagingClient())
+    engine = FanoutEngine(max_workers=8, rate_limits={'sms': 20})
+
+    started = time.monotonic()
+    engine.run(tasks_for(probe, 30, channel='sms'), total=30)
+
+    # A full bucket covers the first 20 sends; the other 10 wait for refills at 20/s
+    assert time.monotonic() - started >= 0.45
+
+
+def test_failed_sends_are_collected_per_recipient():
+    probe = ConcurrencyProbe(FakeMessagingClient(error_rate=1.0))
+    engine = FanoutEngine(max_workers=2, rate_limits={'whatsapp': 10000})
+
+    results, progress = engine.run(tasks_for(probe, 5), total=5)
+
+    assert all('error' in r['whatsapp'] for r in results)
+    assert progress.failed == 5
+
+
+def test_progress_reported_once_per_interval():
+    probe = ConcurrencyProbe(FakeMessagingClient())
+    engine = FanoutEngine(max_workers=8, rate_limits={'whatsapp': 10000}, progress_interval=5)
+    snapshots = []
+    lock = threading.Lock()
+
+    def collect(snapshot):
+        with lock:
+            snapshots.append(snapshot)
+
+    for _ in range(5):
+        snapshots.clear()
+        engine.run(tasks_for(probe, 50), total=50, progress_callback=collect)
+        assert len([s for s in snapshots if not s['finished']]) == 10
+        assert snapshots[-1]['finished'] and snapshots[-1]['completed'] == 50
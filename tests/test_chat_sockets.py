@@ -0,0 +1,27 @@
+import time
+
+from Chatbot.sockets import ChatConnections
+
+
+def test_bucket_survives_a_quick_reconnect():
+    connections = ChatConnections(rate=1, burst=2, max_pending=2)
+    connections.add('a', 7)
+    assert connections.admit('a') is None
+    connections.release('a')
+    connections.remove('a')
+
+    connections.add('b', 7)
+    assert connections.admit('b') is None
+    connections.release('b')
+    assert connections.admit('b') == 'rate_limited'
+
+
+def test_idle_buckets_are_evicted_after_they_would_have_refilled():
+    connections = ChatConnections(rate=100, burst=2, max_pending=2)
+    for user_id in range(50):
+        connections.add(f'sid-{user_id}', user_id)
+        connections.remove(f'sid-{user_id}')
+    time.sleep(0.05)
+
+    connections.add('live', 99)
+    assert connections.get_stats()['buckets'] == 1
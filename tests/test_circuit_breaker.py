@@ -0,0 +1,102 @@
+import threading
+import time
+
+import pytest
+
+from translation_service import CircuitBreaker, CircuitOpenError, TranslationService
+
+
+class StubTranslateClient:
+    """Stands in for google.cloud.translate: fails, hangs or answers on demand"""
+
+    def __init__(self):
+        self.mode = 'ok'
+        self.calls = 0
+        self.release = threading.Event()
+
+    def translate(self, text, target_language=None, source_language=None):
+        self.calls += 1
+        if self.mode == 'fail':
+            raise RuntimeError('upstream error')
+        if self.mode == 'hang':
+            self.release.wait(5)
+        return {'translatedText': f'[{target_language}] {text}'}
+
+
+def make_service(client, **breaker):
+    service = TranslationService(google_client=client)
+    service.google_breaker = CircuitBreaker('stub', **dict(
+        dict(call_timeout=0.2, failure_threshold=2, reset_timeout=0.1, max_concurrency=4), **breaker))
+    return service
+
+
+def test_breaker_opens_then_half_opens_and_closes():
+    client = StubTranslateClient()
+    service = make_service(client)
+    breaker = service.google_breaker
+
+    client.mode = 'fail'
+    for _ in range(2):
+        service.translate_text('fever', 'hi')
+    assert breaker.state == CircuitBreaker.OPEN
+
+    # While open the client is not called and the local fallback answers
+    calls = client.calls
+    assert service.translate_text('fever', 'hi') != '[hi] fever'
+    assert client.calls == calls
+
+    time.sleep(0.15)
+    client.mode = 'ok'
+    assert service.translate_text('fever', 'hi') == '[hi] fever'
+    assert breaker.state == CircuitBreaker.CLOSED
+    assert [t['to'] for t in breaker.transitions] == ['open', 'half_open', 'closed']
+
+
+def test_timeouts_count_as_failures():
+    client = StubTranslateClient()
+    service = make_service(client, failure_threshold=1)
+    client.mode = 'hang'
+
+    started = time.monotonic()
+    service.translate_text('fever', 'hi')
+    client.release.set()
+
+    assert time.monotonic() - started < 1
+    assert service.google_breaker.metrics['timeouts'] == 1
+    assert service.google_breaker.state == CircuitBreaker.OPEN
+
+
+def test_half_open_admits_a_single_trial():
+    breaker = CircuitBreaker('stub', failure_threshold=1, reset_timeout=0.05)
+    with pytest.raises(RuntimeError):
+        breaker.call(lambda: (_ for _ in ()).throw(RuntimeError('down')))
+    time.sleep(0.1)
+
+    trial = breaker.allow()
+    assert trial[1] and breaker.state == CircuitBreaker.HALF_OPEN
+    with pytest.raises(CircuitOpenError):
+        breaker.allow()
+    breaker._record_success(trial, 0.01)
+    assert breaker.state == CircuitBreaker.CLOSED
+
+
+def test_outcomes_from_an_earlier_generation_are_ignored():
+    breaker = CircuitBreaker('stub', failure_threshold=1, reset_timeout=0.05)
+    stale = breaker.allow()
+    with pytest.raises(RuntimeError):
+        breaker.call(lambda: (_ for _ in ()).throw(RuntimeError('down')))
+    assert breaker.state == CircuitBreaker.OPEN
+
+    # A call that started while closed cannot close the open circuit
+    breaker._record_success(stale, 0.01)
+    assert breaker.state == CircuitBreaker.OPEN
+
+    time.sleep(0.1)
+    trial = breaker.allow()
+    # ...nor free the half-open trial slot
+    breaker._record_failure(stale, 0.01)
+    assert breaker.state == CircuitBreaker.HALF_OPEN
+    with pytest.raises(CircuitOpenError):
+        breaker.allow()
+    breaker._record_success(trial, 0.01)
+    assert breaker.state == CircuitBreaker.CLOSED
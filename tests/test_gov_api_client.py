@@ -0,0 +1,74 @@
+import time
+
+import pytest
+
+from gov_api_client import GovernmentAPIClient, GovernmentAPIError
+from gov_api_stub import GovernmentAPIStub
+from health_data_service import MOHFW_STATS_PATH
+
+
+@pytest.fixture
+def stub():
+    server = GovernmentAPIStub().start()
+    yield server
+    server.stop()
+
+
+def stats_url(stub):
+    return stub.base_url + '/mohfw' + MOHFW_STATS_PATH
+
+
+def test_retries_server_errors_then_succeeds(stub):
+    stub.fail_first = 2
+    client = GovernmentAPIClient(max_retries=2, backoff=0.01)
+
+    payload = client.get_json(stats_url(stub), params={'state': 'Kerala'})
+
+    assert payload['data']['state'] == 'Kerala'
+    assert len(stub.requests) == 3
+    assert client.get_stats()['retries'] == 2
+
+
+def test_gives_up_after_max_retries(stub):
+    stub.fail_first = 5
+    client = GovernmentAPIClient(max_retries=1, backoff=0.01)
+
+    with pytest.raises(GovernmentAPIError):
+        client.get_json(stats_url(stub))
+    assert len(stub.requests) == 2
+    assert client.get_stats()['failures'] == 1
+
+
+def test_read_timeout_is_retried_and_bounded(stub):
+    stub.latency = 0.5
+    client = GovernmentAPIClient(read_timeout=0.1, max_retries=1, backoff=0.01)
+
+    started = time.monotonic()
+    with pytest.raises(GovernmentAPIError):
+        client.get_json(stats_url(stub))
+    assert time.monotonic() - started < 0.5
+    assert client.get_stats()['requests'] == 2
+
+
+def test_deadline_caps_retries(stub):
+    stub.fail_first = 10
+    client = GovernmentAPIClient(max_retries=5, backoff=0.2, max_backoff=0.2)
+
+    started = time.monotonic()
+    with client.deadline(time.time() + 0.15):
+        with pytest.raises(GovernmentAPIError):
+            client.get_json(stats_url(stub))
+    assert time.monotonic() - started < 0.3
+    assert len(stub.requests) < 6
+
+
+def test_conditional_get_returns_304_for_matching_validators(stub):
+    client = GovernmentAPIClient()
+    first = client.get_conditional(stats_url(stub))
+    validators = client.validators_of(first)
+
+    second = client.get_conditional(stats_url(stub), validators=validators)
+
+    assert second.status_code == 304
+    assert stub.requests[-1]['headers']['If-None-Match'] == validators['etag']
+    assert client.get_stats()['not_modified'] == 1
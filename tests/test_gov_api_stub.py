@@ -0,0 +1,69 @@
+import time
+
+import requests
+
+from gov_api_client import GovernmentAPIClient
+from gov_api_stub import GovernmentAPIStub
+from health_data_service import (GovernmentHealthDataService, COWIN_CALENDAR_BY_PIN_PATH,
+                                 MOHFW_STATS_PATH)
+
+
+def test_sample_payload_etag_is_stable_across_requests():
+    stub = GovernmentAPIStub().start()
+    try:
+        url = stub.base_url + '/mohfw' + MOHFW_STATS_PATH
+        first = requests.get(url, params={'state': 'Kerala'})
+        time.sleep(0.01)
+        second = requests.get(url, params={'state': 'Kerala'})
+        other = requests.get(url, params={'state': 'Delhi'})
+        revalidated = requests.get(url, params={'state': 'Kerala'},
+                                   headers={'If-None-Match': first.headers['ETag']})
+
+        assert first.headers['ETag'] == second.headers['ETag']
+        assert other.headers['ETag'] != first.headers['ETag']
+        assert revalidated.status_code == 304
+    finally:
+        stub.stop()
+
+
+def test_changed_recording_gets_a_new_etag():
+    stub = GovernmentAPIStub().start()
+    try:
+        path = '/cowin' + COWIN_CALENDAR_BY_PIN_PATH
+        before = requests.get(stub.base_url + path).headers['ETag']
+        stub.set_recording(path, {'centers': []})
+        response = requests.get(stub.base_url + path, headers={'If-None-Match': before})
+
+        assert response.status_code == 200
+        assert response.json() == {'centers': []}
+    finally:
+        stub.stop()
+
+
+def test_expired_entry_is_revalidated_and_only_its_ttl_extended():
+    stub = GovernmentAPIStub().start()
+    try:
+        service = GovernmentHealthDataService()
+        service.live_data = True
+        service.cowin_base_url = stub.base_url + '/cowin'
+        service.http = GovernmentAPIClient(backoff=0.01)
+
+        first = service.get_vaccination_centers('400001', '19-10-2026')
+        key = 'vaccination_centers_400001_19-10-2026'
+        entry = service.cache.peek(key)
+        assert entry.validators['etag']
+        entry.expires_at = time.time() - 1
+
+        # The stale copy is served while a conditional refresh runs in the background
+        assert service.get_vaccination_centers('400001', '19-10-2026') is first
+        deadline = time.time() + 2
+        while service.refresh_stats['ttl_extended'] == 0 and time.time() < deadline:
+            time.sleep(0.01)
+
+        assert service.refresh_stats['ttl_extended'] == 1
+        assert stub.requests[-1]['headers']['If-None-Match'] == entry.validators['etag']
+        assert service.http.get_stats()['not_modified'] == 1
+        assert service.cache.peek(key).expires_at > time.time()
+        assert service.cache.peek(key).value is first
+    finally:
+        stub.stop()
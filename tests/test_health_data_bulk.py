@@ -0,0 +1,46 @@
+import time
+
+from gov_api_client import GovernmentAPIClient
+from gov_api_stub import GovernmentAPIStub
+from health_data_service import GovernmentHealthDataService
+
+
+def live_service(stub, workers=2):
+    service = GovernmentHealthDataService()
+    service.live_data = True
+    service.cowin_base_url = stub.base_url + '/cowin'
+    service.mohfw_base_url = stub.base_url + '/mohfw'
+    service.http = GovernmentAPIClient(read_timeout=5, max_retries=2, backoff=0.01)
+    service.bulk_workers = workers
+    return service
+
+
+def test_bulk_timeout_stops_submitting_and_frees_the_pool():
+    stub = GovernmentAPIStub(latency=1.0).start()
+    try:
+        service = live_service(stub)
+        pincodes = [str(400001 + i) for i in range(10)]
+
+        started = time.monotonic()
+        result = service.get_vaccination_centers_many(pincodes, timeout=0.3)
+        assert time.monotonic() - started < 0.6
+        assert result['status'] == 'error'
+        assert set(result['errors']) == set(pincodes)
+
+        # Only the first window reached upstream, and its requests gave up at the deadline
+        time.sleep(0.3)
+        assert len(stub.requests) == 2
+        assert service._bulk_pool._work_queue.qsize() == 0
+    finally:
+        stub.stop()
+
+
+def test_bulk_fetch_returns_every_key_within_the_deadline():
+    stub = GovernmentAPIStub().start()
+    try:
+        service = live_service(stub, workers=4)
+        result = service.get_vaccination_centers_many(['400001', '560001', '110001'], timeout=5)
+        assert result['status'] == 'success'
+        assert sorted(result['results']) == ['110001', '400001', '560001']
+    finally:
+        stub.stop()
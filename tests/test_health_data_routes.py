@@ -0,0 +1,21 @@
+import pytest
+
+from Chatbot import app
+
+
+@pytest.fixture
+def client():
+    return app.test_client()
+
+
+@pytest.mark.parametrize('k', ['0', '-2'])
+def test_nearest_centers_rejects_k_below_one(client, k):
+    response = client.get(f'/api/health-data/nearest-centers?pincode=400001&k={k}')
+    assert response.status_code == 400
+    assert response.get_json()['error'] == 'k must be at least 1'
+
+
+def test_nearest_centers_returns_the_pincode_listing(client):
+    response = client.get('/api/health-data/nearest-centers?pincode=400001&k=2')
+    assert response.status_code == 200
+    assert response.get_json()['status'] == 'success'
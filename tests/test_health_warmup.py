@@ -0,0 +1,26 @@
+from health_data_cache import AccessFrequencyLog
+from health_data_service import GovernmentHealthDataService
+
+
+def test_warmup_replays_names_containing_underscores(tmp_path):
+    service = GovernmentHealthDataService()
+    service.access_log = AccessFrequencyLog(str(tmp_path / 'access.json'))
+    service.get_covid_statistics('Dadra_and_Nagar_Haveli', 'North_Goa')
+    service.get_vaccination_centers('400001')
+    service.access_log.flush()
+
+    fresh = GovernmentHealthDataService()
+    fresh.access_log = AccessFrequencyLog(str(tmp_path / 'access.json'))
+    calls = []
+    fresh.get_covid_statistics = lambda *args: calls.append(('covid_stats',) + args) or {}
+    fresh.get_vaccination_centers = lambda *args: calls.append(('vaccination_centers',) + args) or {}
+    fresh.warmup(top_n=10, concurrency=1, time_budget=5)
+
+    assert sorted(calls) == [('covid_stats', 'Dadra_and_Nagar_Haveli', 'North_Goa'),
+                             ('vaccination_centers', '400001')]
+
+
+def test_unparseable_access_log_keys_are_skipped():
+    service = GovernmentHealthDataService()
+    assert service._warm_call('covid_stats_Kerala_None') is None
+    assert service._warm_call('["unknown"]') is None
@@ -0,0 +1,49 @@
+import time
+
+from outbox import MessageOutbox
+
+
+class RecordingHandler:
+    def __init__(self):
+        self.sent = []
+
+    def send_message(self, to_number, message, media_url=None):
+        self.sent.append(to_number)
+        return {'success': True, 'message_sid': f'SM{len(self.sent)}', 'status': 'queued'}
+
+
+def outboxes(tmp_path, handler):
+    path = str(tmp_path / 'state.db')
+    return [MessageOutbox(db_path=path, whatsapp_handler=handler, visibility_timeout=0.05) for _ in range(2)]
+
+
+def test_stale_claim_neither_sends_nor_overwrites_the_new_claim(tmp_path):
+    handler = RecordingHandler()
+    first, second = outboxes(tmp_path, handler)
+    first.enqueue('whatsapp', '+911', 'Advisory')
+
+    stale = first._claim_batch()
+    time.sleep(0.1)
+    fresh = second._claim_batch()
+    assert len(fresh) == 1
+
+    first._record_outcomes([(row, first._send(row)) for row in stale])
+    second._record_outcomes([(row, second._send(row)) for row in fresh])
+
+    assert handler.sent == ['+911']
+    assert second.get_stats()['counters']['sent'] == 1
+    assert first.get_stats()['counters']['sent'] == 0
+
+
+def test_reclaimed_row_with_recorded_sid_is_not_resent(tmp_path):
+    handler = RecordingHandler()
+    first, second = outboxes(tmp_path, handler)
+    first.enqueue('whatsapp', '+912', 'Advisory')
+
+    row = first._claim_batch()[0]
+    first._send(row)  # delivered, but the worker stalls before recording the outcome
+    time.sleep(0.1)
+
+    assert second._claim_batch() == []
+    assert handler.sent == ['+912']
+    assert second.get_stats()['sent_retained'] == 1
@@ -0,0 +1,22 @@
+from pincode_index import CenterSpatialIndex
+
+
+def make_index():
+    index = CenterSpatialIndex()
+    index.replace_source('400001', [
+        ('1', 18.94, 72.83, 10, {'name': 'Fort'}),
+        ('2', 19.07, 72.88, 0, {'name': 'Kurla'}),
+        ('3', 19.10, 72.85, 5, {'name': 'Andheri'}),
+    ])
+    return index
+
+
+def test_nearest_orders_by_distance_and_skips_empty_centers():
+    nearest = make_index().nearest(18.93, 72.83, k=5)
+    assert [entry['data']['name'] for _, entry in nearest] == ['Fort', 'Andheri']
+
+
+def test_nearest_with_non_positive_k_returns_nothing():
+    index = make_index()
+    assert index.nearest(18.93, 72.83, k=0) == []
+    assert index.nearest(18.93, 72.83, k=-3) == []
@@ -0,0 +1,19 @@
+from subscriber_index import SubscriberSegmentIndex
+
+
+def test_language_whose_only_subscriber_has_id_zero_is_listed():
+    index = SubscriberSegmentIndex()
+    index.add('+910000000000', 'hi', None, 'Delhi', None, '110001', 30)
+    index.add('+910000000001', 'en', None, 'Delhi', None, '110001', 30)
+
+    assert sorted(index.languages()) == ['en', 'hi']
+    assert index.query(language='hi') == ['+910000000000']
+
+
+def test_language_dropped_once_its_subscribers_are_removed():
+    index = SubscriberSegmentIndex()
+    index.add('+910000000000', 'hi', None, None, None, None, None)
+    index.add('+910000000001', 'en', None, None, None, None, None)
+    index.remove('+910000000000')
+
+    assert index.languages() == ['en']
@@ -1,9 +1,14 @@
 import os
+import time
 import logging
-from typing import Optional, Dict
+import threading
+from collections import deque, OrderedDict
+from concurrent.futures import ThreadPoolExecutor, TimeoutError as FutureTimeoutError
+from datetime import datetime
+from typing import Optional, Dict, Callable, Any, Tuple
 
 try:
-    from langdetect import detect, DetectorFactory
+    from langdetect import detect, detect_langs, DetectorFactory
     from langdetect.lang_detect_exception import LangDetectException
     LANGDETECT_AVAILABLE = True
     DetectorFactory.seed = 0  # for consistent detection
@@ -18,6 +23,379 @@ except ImportError:
     GOOGLE_TRANSLATE_AVAILABLE = False
     print("⚠️  Google Cloud Translation not available. Using local fallback.")
 
+class CircuitOpenError(Exception):
+    """Raised when a guarded call is rejected without reaching the remote service"""
+
+
+class CircuitBreaker:
+    """Circuit breaker with per-call deadline and bounded concurrency for remote calls
+
+    Calls run on a small thread pool so a hung client cannot block the caller past
+    ``call_timeout``. Consecutive failures (errors, timeouts and calls slower than
+    ``slow_call_threshold``) trip the breaker open; after ``reset_timeout`` one trial
+    call is let through (half-open) and its outcome closes or re-opens the circuit.
+
+    ``allow`` hands out a ticket naming the breaker generation (bumped on every
+    transition) and whether the call is the half-open trial. Only the trial's own
+    outcome frees the trial slot or closes the circuit, and outcomes of calls that
+    started in an earlier generation are counted but never change the state.
+    """
+
+    CLOSED = 'closed'
+    OPEN = 'open'
+    HALF_OPEN = 'half_open'
+
+    def __init__(self, name: str, call_timeout: float = 3.0, max_concurrency: int = 4,
+                 failure_threshold: int = 5, reset_timeout: float = 30.0,
+                 slow_call_threshold: float = None):
+        self.name = name
+        self.call_timeout = call_timeout
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self.slow_call_threshold = slow_call_threshold or call_timeout * 0.8
+
+        self._executor = ThreadPoolExecutor(max_workers=max_concurrency,
+                                            thread_name_prefix=f"{name}-call")
+        self._slots = threading.BoundedSemaphore(max_concurrency)
+        self._lock = threading.Lock()
+
+        self.state = self.CLOSED
+        self._consecutive_failures = 0
+        self._opened_at = 0.0
+        self._trial_in_flight = False
+        self._generation = 0
+
+        self.metrics = {
+            'calls': 0,
+            'successes': 0,
+            'failures': 0,
+            'timeouts': 0,
+            'slow_calls': 0,
+            'rejected_open': 0,
+            'rejected_saturated': 0,
+        }
+        self.transitions = deque(maxlen=50)
+        self._latencies = deque(maxlen=500)
+
+    def call(self, func: Callable, *args, **kwargs) -> Any:
+        """Run ``func`` under the breaker; raises CircuitOpenError, TimeoutError or the call's error"""
+        ticket = self.allow()
+
+        if not self._slots.acquire(blocking=False):
+            with self._lock:
+                self.metrics['rejected_saturated'] += 1
+                self._release_trial(ticket)
+            raise CircuitOpenError(f"{self.name}: concurrency limit reached")
+
+        def run():
+            try:
+                return func(*args, **kwargs)
+            finally:
+                self._slots.release()
+
+        started = time.monotonic()
+        try:
+            future = self._executor.submit(run)
+        except Exception:
+            self._slots.release()
+            raise
+        try:
+            result = future.result(timeout=self.call_timeout)
+        except FutureTimeoutError:
+            self._record_failure(ticket, time.monotonic() - started, timeout=True)
+            raise TimeoutError(f"{self.name}: call exceeded {self.call_timeout}s")
+        except Exception:
+            self._record_failure(ticket, time.monotonic() - started)
+            raise
+
+        elapsed = time.monotonic() - started
+        if elapsed >= self.slow_call_threshold:
+            self._record_failure(ticket, elapsed, slow=True)
+        else:
+            self._record_success(ticket, elapsed)
+        return result
+
+    def allow(self) -> Tuple[int, bool]:
+        """Admit a call or raise CircuitOpenError; returns the (generation, is_trial) ticket"""
+        with self._lock:
+            if self.state == self.OPEN:
+                if time.monotonic() - self._opened_at < self.reset_timeout:
+                    self.metrics['rejected_open'] += 1
+                    raise CircuitOpenError(f"{self.name}: circuit open")
+                self._transition(self.HALF_OPEN)
+            if self.state == self.HALF_OPEN:
+                if self._trial_in_flight:
+                    self.metrics['rejected_open'] += 1
+                    raise CircuitOpenError(f"{self.name}: trial call in progress")
+                self._trial_in_flight = True
+                self.metrics['calls'] += 1
+                return self._generation, True
+            self.metrics['calls'] += 1
+            return self._generation, False
+
+    def _release_trial(self, ticket: Tuple[int, bool]):
+        # Called with the lock held
+        generation, trial = ticket
+        if trial and generation == self._generation:
+            self._trial_in_flight = False
+
+    def _record_success(self, ticket: Tuple[int, bool], elapsed: float):
+        with self._lock:
+            self._latencies.append(elapsed)
+            self.metrics['successes'] += 1
+            if ticket[0] != self._generation:
+                return
+            self._consecutive_failures = 0
+            self._release_trial(ticket)
+            if ticket[1]:
+                self._transition(self.CLOSED)
+
+    def _record_failure(self, ticket: Tuple[int, bool], elapsed: float, timeout: bool = False,
+                        slow: bool = False):
+        with self._lock:
+            self._latencies.append(elapsed)
+            self.metrics['failures'] += 1
+            if timeout:
+                self.metrics['timeouts'] += 1
+            if slow:
+                self.metrics['slow_calls'] += 1
+            if ticket[0] != self._generation:
+                return
+            self._consecutive_failures += 1
+            self._release_trial(ticket)
+            if ticket[1] or self._consecutive_failures >= self.failure_threshold:
+                self._opened_at = time.monotonic()
+                self._transition(self.OPEN)
+
+    def _transition(self, new_state: str):
+        self.transitions.append({
+            'from': self.state,
+            'to': new_state,
+            'at': datetime.now().isoformat()
+        })
+        logging.warning(f"{self.name} circuit {self.state} -> {new_state}")
+        self.state = new_state
+        self._generation += 1
+        if new_state != self.HALF_OPEN:
+            self._trial_in_flight = False
+
+    def get_metrics(self) -> Dict:
+        with self._lock:
+            latencies = sorted(self._latencies)
+            metrics = dict(self.metrics)
+            transitions = list(self.transitions)
+
+        def percentile(p):
+            if not latencies:
+                return None
+            return round(latencies[min(len(latencies) - 1, int(p * len(latencies)))] * 1000, 2)
+
+        return {
+            'state': self.state,
+            'consecutive_failures': self._consecutive_failures,
+            'call_timeout_s': self.call_timeout,
+            'counters': metrics,
+            'latency_ms': {
+                'samples': len(latencies),
+                'p50': percentile(0.50),
+                'p95': percentile(0.95),
+                'p99': percentile(0.99),
+                'max': round(latencies[-1] * 1000, 2) if latencies else None
+            },
+            'transitions': transitions
+        }
+
+
+# Unicode blocks of the scripts used by supported languages; a script that maps to a
+# single language identifies it without running the detector
+SCRIPT_RANGES = [
+    (0x0900, 0x097F, 'devanagari'),
+    (0x0980, 0x09FF, 'bengali'),
+    (0x0A00, 0x0A7F, 'gurmukhi'),
+    (0x0A80, 0x0AFF, 'gujarati'),
+    (0x0B00, 0x0B7F, 'oriya'),
+    (0x0B80, 0x0BFF, 'tamil'),
+    (0x0C00, 0x0C7F, 'telugu'),
+    (0x0C80, 0x0CFF, 'kannada'),
+    (0x0D00, 0x0D7F, 'malayalam'),
+    (0x0600, 0x06FF, 'arabic'),
+]
+
+SCRIPT_LANGUAGES = {
+    'latin': ('en',),
+    'devanagari': ('hi', 'mr'),
+    'bengali': ('bn', 'as'),
+    'gurmukhi': ('pa',),
+    'gujarati': ('gu',),
+    'oriya': ('or',),
+    'tamil': ('ta',),
+    'telugu': ('te',),
+    'kannada': ('kn',),
+    'malayalam': ('ml',),
+    'arabic': ('ur',),
+}
+
+
+def dominant_script(text: str) -> Optional[str]:
+    """Return the script most letters of ``text`` are written in, or None for no letters"""
+    counts = {}
+    for char in text:
+        code = ord(char)
+        if code < 0x0250:
+            if char.isalpha():
+                counts['latin'] = counts.get('latin', 0) + 1
+            continue
+        for start, end, script in SCRIPT_RANGES:
+            if start <= code <= end:
+                counts[script] = counts.get(script, 0) + 1
+                break
+    if not counts:
+        return None
+    return max(counts, key=counts.get)
+
+
+class SenderLanguageCache:
+    """Sticky per-sender reply language
+
+    Each sender keeps a resolved language with a confidence and its source (profile,
+    detection or script). A language only becomes sticky once its confidence reaches
+    ``sticky_confidence``: sticky languages are answered without running detection
+    for messages in their script, and short follow-ups such as "ok" never flip them.
+    Until then every message is detected again and a more confident result replaces
+    the cached one, so a cold "ok" cannot pin English.
+    """
+
+    def __init__(self, service, max_senders: int = 50000, ttl_seconds: int = 7 * 24 * 3600,
+                 min_detect_chars: int = 12, switch_confidence: float = 0.85,
+                 sticky_confidence: float = 0.6):
+        self.service = service
+        self.max_senders = max_senders
+        self.ttl_seconds = ttl_seconds
+        self.min_detect_chars = min_detect_chars
+        self.switch_confidence = switch_confidence
+        self.sticky_confidence = sticky_confidence
+
+        self._entries: 'OrderedDict[str, Dict]' = OrderedDict()
+        self._lock = threading.Lock()
+        self.metrics = {'hits': 0, 'misses': 0, 'detections': 0, 'switches': 0, 'evictions': 0}
+
+    def resolve(self, sender_id: str, text: str,
+                preferred_language_loader: Callable[[], Optional[str]] = None) -> str:
+        """Return the reply language for ``sender_id``, detecting only when needed"""
+        entry = self._get(sender_id)
+        if entry is None:
+            self._count('misses')
+            return self._resolve_cold(sender_id, text, preferred_language_loader)
+
+        self._count('hits')
+        return self._resolve_cached(sender_id, entry, text)
+
+    def _resolve_cached(self, sender_id: str, entry: Dict, text: str) -> str:
+        sticky = entry['confidence'] >= self.sticky_confidence
+        script = dominant_script(text or '')
+        if script is None or (sticky and entry['language'] in SCRIPT_LANGUAGES.get(script, ())):
+            return entry['language']
+
+        candidates = SCRIPT_LANGUAGES.get(script, ())
+        if len(candidates) == 1 and script != 'latin':
+            # Script alone identifies the language (e.g. Tamil, Telugu)
+            if candidates[0] != entry['language'] or not sticky:
+                self._switch(sender_id, candidates[0], 0.95, 'script')
+            return candidates[0]
+
+        if sticky and len(text.strip()) < self.min_detect_chars:
+            return entry['language']
+
+        detected, confidence = self._detect(text)
+        if sticky:
+            if detected != entry['language'] and confidence >= self.switch_confidence:
+                self._switch(sender_id, detected, confidence, 'detection')
+                return detected
+        elif confidence > entry['confidence']:
+            # Tentative language: any more confident detection replaces it
+            if detected != entry['language']:
+                self._switch(sender_id, detected, confidence, 'detection')
+            else:
+                self._put(sender_id, detected, confidence, 'detection')
+            return detected
+        return entry['language']
+
+    def set_language(self, sender_id: str, language: str, source: str = 'profile', confidence: float = 1.0):
+        if language not in self.service.SUPPORTED_LANGUAGES:
+            return
+        self._put(sender_id, language, confidence, source)
+
+    def forget(self, sender_id: str):
+        with self._lock:
+            self._entries.pop(sender_id, None)
+
+    def _resolve_cold(self, sender_id, text, preferred_language_loader) -> str:
+        preferred = None
+        if preferred_language_loader:
+            try:
+                preferred = preferred_language_loader()
+            except Exception as e:
+                logging.error(f"Preferred language lookup failed for {sender_id}: {e}")
+
+        if preferred in self.service.SUPPORTED_LANGUAGES:
+            entry = self._put(sender_id, preferred, 0.9, 'profile')
+            # A profile language still yields to a clearly different script
+            return self._resolve_cached(sender_id, entry, text)
+
+        detected, confidence = self._detect(text)
+        self._put(sender_id, detected, confidence, 'detection')
+        return detected
+
+    def _count(self, name: str):
+        with self._lock:
+            self.metrics[name] += 1
+
+    def _detect(self, text: str) -> Tuple[str, float]:
+        self._count('detections')
+        return self.service.detect_language_with_confidence(text)
+
+    def _switch(self, sender_id, language, confidence, source):
+        self._count('switches')
+        self._put(sender_id, language, confidence, source)
+
+    def _get(self, sender_id: str) -> Optional[Dict]:
+        with self._lock:
+            entry = self._entries.get(sender_id)
+            if entry is None:
+                return None
+            if time.time() - entry['updated_at'] > self.ttl_seconds:
+                del self._entries[sender_id]
+                return None
+            self._entries.move_to_end(sender_id)
+            return entry
+
+    def _put(self, sender_id, language, confidence, source):
+        entry = {
+            'language': language,
+            'confidence': confidence,
+            'source': source,
+            'updated_at': time.time()
+        }
+        with self._lock:
+            self._entries[sender_id] = entry
+            self._entries.move_to_end(sender_id)
+            while len(self._entries) > self.max_senders:
+                self._entries.popitem(last=False)
+                self.metrics['evictions'] += 1
+        return entry
+
+    def get_metrics(self) -> Dict:
+        with self._lock:
+            counters = dict(self.metrics)
+            senders = len(self._entries)
+        lookups = counters['hits'] + counters['misses']
+        return {
+            'senders': senders,
+            'counters': counters,
+            'detection_rate': round(counters['detections'] / lookups, 3) if lookups else None
+        }
+
+
 class TranslationService:
     """Enhanced translation service supporting multiple Indian languages"""
 
@@ -47,15 +425,25 @@ class TranslationService:
         # Add other key healthcare translations as needed
     }
 
-    def __init__(self):
-        self.google_client = None
-        if GOOGLE_TRANSLATE_AVAILABLE and os.environ.get('GOOGLE_APPLICATION_CREDENTIALS'):
+    def __init__(self, google_client=None):
+        self.google_client = google_client
+        if self.google_client is None and GOOGLE_TRANSLATE_AVAILABLE and os.environ.get('GOOGLE_APPLICATION_CREDENTIALS'):
             try:
                 self.google_client = translate.Client()
                 print("✅ Google Translate initialized")
             except Exception as e:
                 print(f"⚠️  Google Translate initialization failed: {e}")
 
+        self.google_breaker = CircuitBreaker(
+            'google_translate',
+            call_timeout=float(os.environ.get('TRANSLATE_TIMEOUT', '3.0')),
+            max_concurrency=int(os.environ.get('TRANSLATE_MAX_CONCURRENCY', '8')),
+            failure_threshold=int(os.environ.get('TRANSLATE_BREAKER_FAILURES', '5')),
+            reset_timeout=float(os.environ.get('TRANSLATE_BREAKER_RESET', '30')),
+            slow_call_threshold=float(os.environ['TRANSLATE_SLOW_CALL']) if os.environ.get('TRANSLATE_SLOW_CALL') else None
+        )
+        self.sender_languages = SenderLanguageCache(self)
+
         print(f"✅ Translation service initialized for {len(self.SUPPORTED_LANGUAGES)} languages")
 
     def detect_language(self, text: str) -> Optional[str]:
@@ -74,7 +462,7 @@ class TranslationService:
 
         if self.google_client:
             try:
-                result = self.google_client.detect_language(text)
+                result = self.google_breaker.call(self.google_client.detect_language, text)
                 detected = result['language']
                 if detected in self.SUPPORTED_LANGUAGES:
                     return detected
@@ -83,6 +471,35 @@ class TranslationService:
 
         return 'en'
 
+    def detect_language_with_confidence(self, text: str) -> Tuple[str, float]:
+        """Detect language and return (language, probability); falls back to detect_language"""
+        if not text or len(text.strip()) < 3:
+            return 'en', 0.0
+
+        if LANGDETECT_AVAILABLE:
+            try:
+                for candidate in detect_langs(text):
+                    if candidate.lang in self.SUPPORTED_LANGUAGES:
+                        return candidate.lang, candidate.prob
+                return 'en', 0.0
+            except LangDetectException:
+                pass
+
+        script = dominant_script(text)
+        candidates = SCRIPT_LANGUAGES.get(script, ())
+        if candidates and script != 'latin':
+            return candidates[0], 0.95 if len(candidates) == 1 else 0.7
+
+        detected = self.detect_language(text)
+        return detected, 0.5
+
+    def resolve_sender_language(self, sender_id: str, text: str,
+                                preferred_language_loader: Callable[[], Optional[str]] = None) -> str:
+        """Sticky reply language for a messaging sender (see SenderLanguageCache)"""
+        if not sender_id:
+            return self.detect_language(text)
+        return self.sender_languages.resolve(sender_id, text, preferred_language_loader)
+
     def translate_text(self, text: str, target_language: str = 'en', source_language: str = None) -> str:
         if not text or target_language == 'en':
             return text
@@ -93,12 +510,15 @@ class TranslationService:
 
         if self.google_client:
             try:
-                result = self.google_client.translate(
+                result = self.google_breaker.call(
+                    self.google_client.translate,
                     text,
                     target_language=target_language,
                     source_language=source_language
                 )
                 return result['translatedText']
+            except CircuitOpenError as e:
+                logging.info(f"Google Translate skipped, using local fallback: {e}")
             except Exception as e:
                 print(f"⚠️  Google Translate error: {e}")
 
@@ -139,6 +559,13 @@ class TranslationService:
             'healthcare_terms_available': len(self.HEALTHCARE_TRANSLATIONS)
         }
 
+    def get_metrics(self) -> Dict:
+        return {
+            'google_translate_enabled': self.google_client is not None,
+            'google_breaker': self.google_breaker.get_metrics(),
+            'sender_languages': self.sender_languages.get_metrics()
+        }
+
 # Global instance
 translation_service = TranslationService()
 
@@ -155,4 +582,22 @@ if __name__ == "__main__":
         detected = translation_service.detect_language(text)
         translated = translation_service.translate_text(text, lang)
         print(f"'{text}' -> {lang}: '{translated}'")
-    print("✅ Translation test completed")
\ No newline at end of file
+    print("✅ Translation test completed")
+
+    print("🔧 Testing circuit breaker with a slow stub client...")
+
+    class SlowStubClient:
+        def translate(self, text, target_language='en', source_language=None):
+            time.sleep(0.2)
+            return {'translatedText': text.upper()}
+
+        def detect_language(self, text):
+            return {'language': 'en'}
+
+    os.environ.setdefault('TRANSLATE_TIMEOUT', '0.05')
+    os.environ.setdefault('TRANSLATE_BREAKER_FAILURES', '2')
+    stub_service = TranslationService(google_client=SlowStubClient())
+    for _ in range(4):
+        print(f"   -> {stub_service.translate_text('I have fever', 'hi')}")
+    print(f"   Breaker: {stub_service.get_metrics()['google_breaker']['state']}")
+    print("✅ Circuit breaker test completed")
\ No newline at end of file
@@ -0,0 +1,141 @@
+import os
+import time
+import uuid
+import random
+import logging
+import threading
+from types import SimpleNamespace
+from urllib.parse import urlsplit, urlunsplit
+
+try:
+    from requests.adapters import HTTPAdapter
+    from urllib3.util.retry import Retry
+    from twilio.rest import Client
+    from twilio.http.http_client import TwilioHttpClient
+    TWILIO_AVAILABLE = True
+except ImportError:
+    TWILIO_AVAILABLE = False
+    print("⚠️  Twilio not installed. WhatsApp/SMS features disabled.")
+
+# 'twilio' talks to the Twilio REST API (or TWILIO_API_BASE_URL); 'fake' never leaves the process
+MESSAGING_BACKEND = os.environ.get('MESSAGING_BACKEND', 'twilio').lower()
+
+
+class FakeMessagingClient:
+    """In-process stand-in for twilio.rest.Client (``client.messages.create``)
+
+    Used for load tests and local runs: sleeps ``latency`` seconds per message and
+    fails a ``error_rate`` fraction of sends. Nothing leaves the process.
+    """
+
+    def __init__(self, latency: float = 0.0, error_rate: float = 0.0, seed: int = None):
+        self.latency = latency
+        self.error_rate = error_rate
+        self.messages = self
+        self.sent = []
+        self._random = random.Random(seed)
+        self._lock = threading.Lock()
+
+    def create(self, body, to, from_=None, media_url=None, **kwargs):
+        if self.latency:
+            time.sleep(self.latency)
+        with self._lock:
+            failed = self._random.random() < self.error_rate
+            if not failed:
+                self.sent.append({'to': to, 'from': from_, 'body': body})
+        if failed:
+            raise RuntimeError("Fake provider error")
+        return SimpleNamespace(sid=f"SM{uuid.uuid4().hex}", status='queued')
+
+
+if TWILIO_AVAILABLE:
+    class PooledTwilioHttpClient(TwilioHttpClient):
+        """TwilioHttpClient with a sized keep-alive pool and an optional base URL
+
+        One ``requests.Session`` is shared by every thread; its adapter keeps up to
+        ``pool_size`` connections open so concurrent fan-out workers reuse TLS
+        sessions instead of reconnecting. Message creation is not idempotent, so
+        only connection failures (where nothing reached Twilio) are retried.
+        ``base_url`` rewrites every Twilio host, letting a local fake server stand
+        in for the API during load tests.
+        """
+
+        def __init__(self, pool_size: int = 20, connect_timeout: float = 5.0, read_timeout: float = 15.0,
+                     max_retries: int = 2, base_url: str = None):
+            super().__init__(pool_connections=True)
+            self.timeout = (connect_timeout, read_timeout)
+            self.pool_size = pool_size
+            self.base_url = base_url.rstrip('/') if base_url else None
+            retry = Retry(total=max_retries, connect=max_retries, read=0, status=0,
+                          backoff_factor=0.2, raise_on_status=False)
+            adapter = HTTPAdapter(pool_connections=4, pool_maxsize=pool_size, max_retries=retry)
+            self.session.mount('https://', adapter)
+            self.session.mount('http://', adapter)
+
+        def request(self, method, url, *args, **kwargs):
+            if self.base_url:
+                base = urlsplit(self.base_url)
+                parts = urlsplit(url)
+                url = urlunsplit((base.scheme, base.netloc, base.path + parts.path, parts.query, parts.fragment))
+            return super().request(method, url, *args, **kwargs)
+
+
+def build_messaging_client(backend: str = None):
+    """Create a messaging client for ``backend`` (defaults to MESSAGING_BACKEND)
+
+    Returns None when the backend cannot be used (Twilio missing or unconfigured).
+    """
+    backend = (backend or MESSAGING_BACKEND).lower()
+    if backend == 'fake':
+        return FakeMessagingClient(latency=float(os.environ.get('FAKE_MESSAGING_LATENCY', '0')),
+                                   error_rate=float(os.environ.get('FAKE_MESSAGING_ERROR_RATE', '0')))
+    if backend != 'twilio':
+        logging.error(f"Unknown MESSAGING_BACKEND '{backend}'")
+        return None
+    if not TWILIO_AVAILABLE:
+        return None
+
+    account_sid = os.environ.get('TWILIO_ACCOUNT_SID')
+    auth_token = os.environ.get('TWILIO_AUTH_TOKEN')
+    if not (account_sid and auth_token):
+        return None
+    http_client = PooledTwilioHttpClient(
+        pool_size=int(os.environ.get('TWILIO_POOL_SIZE', '20')),
+        connect_timeout=float(os.environ.get('TWILIO_CONNECT_TIMEOUT', '5')),
+        read_timeout=float(os.environ.get('TWILIO_READ_TIMEOUT', '15')),
+        max_retries=int(os.environ.get('TWILIO_MAX_RETRIES', '2')),
+        base_url=os.environ.get('TWILIO_API_BASE_URL'))
+    return Client(account_sid, auth_token, http_client=http_client)
+
+
+_client = None
+_checked = False
+_lock = threading.Lock()
+
+
+def get_messaging_client():
+    """Return the process-wide messaging client shared by WhatsApp and SMS handlers"""
+    global _client, _checked
+    if _checked:
+        return _client
+    with _lock:
+        if _checked:
+            return _client
+        try:
+            _client = build_messaging_client()
+        except Exception as e:
+            logging.error(f"Messaging client initialization error: {e}")
+            _client = None
+        _checked = True
+        return _client
+
+
+def get_transport_stats() -> dict:
+    http_client = getattr(_client, 'http_client', None)
+    return {
+        'backend': MESSAGING_BACKEND,
+        'configured': _client is not None,
+        'pool_size': getattr(http_client, 'pool_size', None),
+        'timeout': getattr(http_client, 'timeout', None),
+        'base_url': getattr(http_client, 'base_url', None)
+    }
@@ -1,35 +1,22 @@
 import os
-import logging
 from datetime import datetime
 
-try:
-    from twilio.rest import Client
-    TWILIO_AVAILABLE = True
-except ImportError:
-    TWILIO_AVAILABLE = False
-    print("⚠️  Twilio not installed. WhatsApp/SMS features disabled.")
+from twilio_transport import TWILIO_AVAILABLE, get_messaging_client
 
 class WhatsAppHandler:
     """Handle WhatsApp messages via Twilio"""
 
-    def __init__(self):
-        if TWILIO_AVAILABLE:
-            self.account_sid = os.environ.get('TWILIO_ACCOUNT_SID')
-            self.auth_token = os.environ.get('TWILIO_AUTH_TOKEN')
-            self.whatsapp_number = os.environ.get('WHATSAPP_NUMBER')
-
-            if self.account_sid and self.auth_token:
-                try:
-                    self.client = Client(self.account_sid, self.auth_token)
-                    print("✅ WhatsApp handler initialized")
-                except Exception as e:
-                    print(f"⚠️  WhatsApp initialization error: {e}")
-                    self.client = None
-            else:
-                print("⚠️  WhatsApp credentials not configured")
-                self.client = None
+    def __init__(self, client=None):
+        self.whatsapp_number = os.environ.get('WHATSAPP_NUMBER')
+        if client is not None:
+            self.client = client
         else:
-            self.client = None
+            # All handlers in the process share one pooled transport
+            self.client = get_messaging_client()
+            if self.client is not None:
+                print("✅ WhatsApp handler initialized")
+            elif TWILIO_AVAILABLE:
+                print("⚠️  WhatsApp credentials not configured")
 
     def send_message(self, to_number, message, media_url=None):
         """Send WhatsApp message to user"""
@@ -105,24 +92,17 @@ class WhatsAppHandler:
 class SMSHandler:
     """Handle SMS messages via Twilio"""
 
-    def __init__(self):
-        if TWILIO_AVAILABLE:
-            self.account_sid = os.environ.get('TWILIO_ACCOUNT_SID')
-            self.auth_token = os.environ.get('TWILIO_AUTH_TOKEN')
-            self.phone_number = os.environ.get('TWILIO_PHONE_NUMBER')
-
-            if self.account_sid and self.auth_token:
-                try:
-                    self.client = Client(self.account_sid, self.auth_token)
-                    print("✅ SMS handler initialized")
-                except Exception as e:
-                    print(f"⚠️  SMS initialization error: {e}")
-                    self.client = None
-            else:
-                print("⚠️  SMS credentials not configured")
-                self.client = None
+    def __init__(self, client=None):
+        self.phone_number = os.environ.get('TWILIO_PHONE_NUMBER')
+        if client is not None:
+            self.client = client
         else:
-            self.client = None
+            # All handlers in the process share one pooled transport
+            self.client = get_messaging_client()
+            if self.client is not None:
+                print("✅ SMS handler initialized")
+            elif TWILIO_AVAILABLE:
+                print("⚠️  SMS credentials not configured")
 
     def send_sms(self, to_number, message):
         """Send SMS message to user"""